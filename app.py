@@ -5,24 +5,36 @@ Remember to create .streamlit folder with secrets.toml file with an api_key valu
 import streamlit as st
 from uxr_app.database import (
     init_db,
-    get_db,
+    session_scope,
     create_user,
     get_user_by_email,
     create_project,
     get_project_by_uuid,
     create_persona_archetype,
+    create_persona_archetypes_bulk,
     get_archetypes_by_project,
     create_persona,
+    create_personas_bulk,
     get_personas_by_project,
     create_uxr_researcher,
+    get_or_create_uxr_researcher,
     get_uxr_researcher_by_project,
     create_interview,
     get_interviews_by_project,
+    iter_user_turns,
     update_project,
     update_persona,
     update_persona_archetype,
     update_uxr_researcher,
     get_existing_persona_names,
+    apply_updates_bulk,
+    load_project_snapshot,
+    delete_project,
+    get_interview_status,
+    get_token_usage_by_task,
+    get_analysis_result,
+    get_latest_analysis,
+    GUEST_EMAIL_DOMAIN,
     Persona,
     UXRResearcher,
     Project,
@@ -31,30 +43,30 @@ from uxr_app.database import (
 )
 from utils.prompt_templates import (
     get_project_name_prompt,
-    get_persona_archetypes_prompt,
-    get_specific_persona_prompt,
-    parse_persona_response,
-    get_exec_summary_prompt,
-    get_recommendations_prompt,
-    get_findings_prompt,
-    get_demographics_prompt
 )
 from uxr_app.auth import (logout_user, verify_password)
+from uxr_app.writer import run_write
+from uxr_app.cache import get_project_snapshot
+from uxr_app.report import generate_uxr_report
+from uxr_app.jobs import submit_interview_batch, get_batch, get_interview_jobs, average_turn_seconds
+from uxr_app.pipeline import submit_analysis
+from config import PROGRESS_REFRESH_SECONDS, MODEL_WARMUP, PERSONAS_PER_ARCHETYPE
 import json
 from utils.interview_utils import get_researcher_persona, simulate_interview
-from utils.convo_analysis import call_llm, cluster_sentences, summarize_each_cluster
+from utils.persona_utils import generate_archetypes, generate_personas
+from utils.convo_analysis import call_llm, start_model_warmup
+from utils.concurrency import get_limiter_stats
+from utils.telemetry import telemetry_context, get_recent_spans, summarize_spans
+from utils.app_config import TELEMETRY_PATH
+from utils.token_budget import get_budget_status, forget_spent
+from uxr_app.ledger import install_token_ledger
 import time
-from datetime import datetime
 import uuid
+from datetime import datetime
 import re
 import asyncio
-import threading
-from concurrent.futures import ThreadPoolExecutor
-import torch
 import logging
 
-torch.classes.__path__ = []  # to support sentence-transformers
-
 # Set up logging with script name, line number, and timestamp
 logging.basicConfig(
     level=logging.INFO,
@@ -92,154 +104,174 @@ def reset_session_state():
         del st.session_state['cluster_summaries']
     if 'uxr_report' in st.session_state:
         del st.session_state['uxr_report']
+    for key in ('analysis_uuid', 'loaded_analysis_uuid', 'analysis_running'):
+        st.session_state.pop(key, None)
 
 # Set page configuration to wide mode
 st.set_page_config(layout="wide")
 
 # Initialize the database
 init_db()
+install_token_ledger()
 
 # --- Session State Management ---
 initialize_session_state()
 
 # Add a function to handle guest user creation
-def create_guest_user():
+def create_guest_user(db):
     """Create a temporary guest user and return the user_id"""
-    db = next(get_db())
-    guest_email = f"guest_{uuid.uuid4().hex[:8]}@temp.uxr"
+    guest_email = f"guest_{uuid.uuid4().hex[:8]}{GUEST_EMAIL_DOMAIN}"
     temp_password = uuid.uuid4().hex
     user = create_user(db, guest_email, temp_password)
-    db.close()
     return user.user_id, guest_email, temp_password
 
 # --- Helper function for simulating interviews ---
 def run_interview_simulation(persona_uuid, uxr_persona_uuid, project_uuid):
     """Simulates running an interview and updates the database."""
-    db = next(get_db())
-    interview_uuid = f"interview-{persona_uuid}-{uxr_persona_uuid}-{time.time()}"
-    st.session_state['interview_status'][interview_uuid] = "in-progress"
-    persona = db.query(Persona).filter(Persona.persona_uuid == persona_uuid).first()
-    uxr_persona = db.query(UXRResearcher).filter(UXRResearcher.uxr_persona_uuid == uxr_persona_uuid).first()
-
-    transcript = simulate_interview(uxr_persona.uxr_persona_name, uxr_persona.uxr_persona_desc, 
-                                      persona.persona_name, persona.persona_desc, 
-                                      st.session_state.product_desc,
-                                      st.secrets["api_key"],
-                                      model_name=st.secrets[model_key])
-
-    create_interview(db, persona_uuid, uxr_persona_uuid, project_uuid, json.dumps(transcript))
-    st.session_state['interview_status'][interview_uuid] = "complete"
-    db.close()
-
-def run_interview_in_background(persona_uuid, uxr_persona_uuid, project_uuid):
-    """Runs an interview simulation in a background thread and updates the database directly."""
-    try:
-        # Set up thread-specific logging
-        thread_id = threading.current_thread().name
-        logging.info(f"[{thread_id}] Starting interview for persona UUID: {persona_uuid}")
-        
-        # Create a new database session for this thread
-        from sqlalchemy.orm import sessionmaker
-        from uxr_app.database import engine
-        
-        SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-        db = SessionLocal()
-        
-        try:
-            # Get the necessary data
-            persona = db.query(Persona).filter(Persona.persona_uuid == persona_uuid).first()
-            uxr_persona = db.query(UXRResearcher).filter(UXRResearcher.uxr_persona_uuid == uxr_persona_uuid).first()
-            project = db.query(Project).filter(Project.project_uuid == project_uuid).first()
-            
-            if not persona or not uxr_persona or not project:
-                logging.error(f"[{thread_id}] Could not find required data: persona={bool(persona)}, uxr_persona={bool(uxr_persona)}, project={bool(project)}")
-                return
-            
-            logging.info(f"[{thread_id}] Retrieved data for persona: {persona.persona_name}")
-            
-            # Run the interview simulation
-            logging.info(f"[{thread_id}] Starting interview simulation for persona: {persona.persona_name}")
-            
-            # Import secrets directly in this thread
-            import json
-            from utils.interview_utils import simulate_interview
-            
-            # Get API key and model name from secrets.toml
-            import toml
-            import os
-            
-            # Determine the path to secrets.toml
-            secrets_path = os.path.join(os.path.dirname(__file__), '.streamlit', 'secrets.toml')
-            
-            try:
-                with open(secrets_path, 'r') as f:
-                    secrets = toml.load(f)
-                    api_key = secrets.get("api_key")
-                    model_name = secrets.get("model_name")
-                    
-                    if not api_key:
-                        logging.error(f"[{thread_id}] API key not found in secrets.toml")
-                        return
-                        
-                    logging.info(f"[{thread_id}] Successfully loaded API key and model name")
-                    
-                    # Run the interview simulation
-                    transcript = simulate_interview(
-                        uxr_persona.uxr_persona_name, 
-                        uxr_persona.uxr_persona_desc, 
-                        persona.persona_name, 
-                        persona.persona_desc, 
-                        project.product_desc,
-                        api_key,
-                        model_name=model_name
-                    )
-                    
-                    logging.info(f"[{thread_id}] Interview simulation completed for persona: {persona.persona_name}")
-                    
-                    # Check if an interview already exists
-                    existing_interview = db.query(Interview).filter(
-                        Interview.persona_uuid == persona_uuid,
-                        Interview.uxr_persona_uuid == uxr_persona_uuid,
-                        Interview.project_uuid == project_uuid
-                    ).first()
-                    
-                    if existing_interview:
-                        logging.info(f"[{thread_id}] Interview already exists for persona {persona.persona_name}, skipping save")
-                    else:
-                        # Save the interview to the database
-                        logging.info(f"[{thread_id}] Saving interview to database for persona: {persona.persona_name}")
-                        
-                        # Create interview with transcript
-                        interview_uuid = f"{persona_uuid}-{uxr_persona_uuid}-{project_uuid}"
-                        new_interview = Interview(
-                            persona_uuid=persona_uuid,
-                            uxr_persona_uuid=uxr_persona_uuid,
-                            project_uuid=project_uuid,
-                            interview_transcript=json.dumps(transcript),
-                            interview_uuid=interview_uuid
-                        )
-                        
-                        db.add(new_interview)
-                        db.commit()
-                        logging.info(f"[{thread_id}] Successfully saved interview for persona: {persona.persona_name}")
-                    
-            except Exception as e:
-                logging.error(f"[{thread_id}] Error loading secrets or running interview: {str(e)}")
-                raise
-                
-        finally:
-            # Close the database session
-            db.close()
-            logging.info(f"[{thread_id}] Database session closed")
-            
-    except Exception as e:
-        logging.error(f"[{thread_id}] Unhandled error in interview thread: {str(e)}", exc_info=True)
+    with session_scope() as db:
+        interview_uuid = f"interview-{persona_uuid}-{uxr_persona_uuid}-{time.time()}"
+        st.session_state['interview_status'][interview_uuid] = "in-progress"
+        persona = db.query(Persona).filter(Persona.persona_uuid == persona_uuid).first()
+        uxr_persona = db.query(UXRResearcher).filter(UXRResearcher.uxr_persona_uuid == uxr_persona_uuid).first()
+
+        transcript = simulate_interview(uxr_persona.uxr_persona_name, uxr_persona.uxr_persona_desc, 
+                                          persona.persona_name, persona.persona_desc, 
+                                          st.session_state.product_desc,
+                                          st.secrets["api_key"],
+                                          model_name=st.secrets[model_key])
+
+        create_interview(db, persona_uuid, uxr_persona_uuid, project_uuid, json.dumps(transcript))
+        st.session_state['interview_status'][interview_uuid] = "complete"
+
+def _format_seconds(seconds):
+    minutes, seconds = divmod(int(round(seconds)), 60)
+    return f"{minutes}m {seconds:02d}s" if minutes else f"{seconds}s"
+
+def interview_status_panel(project_uuid, uxr_persona_uuid, personas):
+    """
+    Per-persona interview status with Run/View actions. Rendered as a fragment, so while interviews
+    are running it polls only interview status and job progress instead of rerunning the whole page.
+    """
+    with session_scope() as db:
+        completed = get_interview_status(db, project_uuid, uxr_persona_uuid)
+        # Interviews cut off part way, with the number of turns already stored
+        checkpoints = {persona_uuid: turn_count for persona_uuid, (_, turn_count)
+                       in get_interview_status(db, project_uuid, uxr_persona_uuid, status="in_progress").items()}
+    jobs = {job.persona_uuid: job for job in get_interview_jobs(project_uuid)}
+    active_jobs = [job for job in jobs.values() if job.active and job.persona_uuid not in completed]
+    default_turn_seconds = average_turn_seconds()
+
+    st.progress(len(completed) / len(personas), text=f"{len(completed)} of {len(personas)} interviews complete")
+    if active_jobs:
+        etas = [job.eta(default_turn_seconds) for job in active_jobs]
+        running = sum(1 for job in active_jobs if job.state == "running")
+        if None not in etas:
+            st.caption(f"{len(active_jobs)} interviews in progress, about {_format_seconds(sum(etas) / max(1, running))} remaining")
+
+    for persona in personas:
+        job = jobs.get(persona.persona_uuid)
+        status = completed.get(persona.persona_uuid)
+        col1, col2 = st.columns([3, 1])
+
+        with col1:
+            if status:
+                _, turn_count = status
+                turns_text = f", {turn_count} turns" if turn_count else ""
+                st.info(f"Interview with {persona.persona_name} (Completed{turns_text})")
+            elif job and job.state == "running":
+                eta = job.eta(default_turn_seconds)
+                eta_text = f", about {_format_seconds(eta)} left" if eta is not None else ""
+                st.warning(f"Interview with {persona.persona_name} running: turn {job.turns_done} of {job.turns_total}{eta_text}")
+            elif job and job.state == "queued":
+                st.text(f"Interview with {persona.persona_name} queued")
+            elif job and job.state == "failed":
+                saved_text = f" ({checkpoints[persona.persona_uuid]} turns saved)" if persona.persona_uuid in checkpoints else ""
+                st.error(f"Interview with {persona.persona_name} failed{saved_text}: {job.error}")
+            elif job and job.state == "cancelled":
+                st.text(f"Interview with {persona.persona_name} cancelled")
+            elif job and job.state == "skipped":
+                st.text(f"Interview with {persona.persona_name} skipped, {job.error}")
+            elif persona.persona_uuid in checkpoints:
+                st.text(f"Interview with {persona.persona_name} interrupted, {checkpoints[persona.persona_uuid]} turns saved")
+            else:
+                st.text(f"Interview with {persona.persona_name} not started")
+
+        with col2:
+            button_key = f"interview_button_{persona.persona_uuid}"
+            if status:
+                if st.button("View", key=button_key):
+                    st.session_state['selected_interview'] = status[0]
+                    st.rerun()
+            elif not (job and job.active):
+                # An interrupted interview carries on from its checkpointed turns
+                if st.button("Resume" if persona.persona_uuid in checkpoints else "Run", key=button_key):
+                    # Queued on the shared interview pool; the panel follows it from here
+                    submit_interview_batch(project_uuid, uxr_persona_uuid, [persona])
+                    st.rerun()
+
+    batch = get_batch(st.session_state.get('interview_batch_id'))
+    if batch and batch.active:
+        counts = batch.counts()
+        st.caption(f"Batch: {counts['complete']} complete, {counts['running']} running, {counts['queued']} queued")
+        if st.button("Cancel Remaining Interviews"):
+            batch.cancel()
+            st.rerun()
+
+    # When the last running interview lands, rerun the whole page so the rest of it catches up
+    if st.session_state.get('interviews_running') and not active_jobs:
+        st.session_state['interviews_running'] = False
+        st.rerun()
+    st.session_state['interviews_running'] = bool(active_jobs)
+
+def analysis_status_panel(project_uuid):
+    """Status of the project's latest analysis, polled while the worker pool runs it."""
+    with session_scope() as db:
+        analysis = get_analysis_result(db, st.session_state.get('analysis_uuid'))
+        if analysis is None or analysis.project_uuid != project_uuid:
+            return
+        if analysis.status in ("queued", "running"):
+            started = analysis.started_at or analysis.created_at
+            st.info(f"Analysis {analysis.status} ({(datetime.utcnow() - started).seconds}s). "
+                    "You can keep working or leave this page; results are saved with the project.")
+            return
+        if analysis.status == "failed":
+            st.error(f"Analysis failed: {analysis.error}")
+        elif st.session_state.get('loaded_analysis_uuid') != analysis.analysis_uuid:
+            # Finished since the last poll: hand the summaries to the report section and refresh the whole page
+            st.session_state['cluster_summaries'] = analysis.summaries
+            st.session_state['loaded_analysis_uuid'] = analysis.analysis_uuid
+            forget_spent(project_uuid, st.session_state['user_id'])
+            st.rerun()
+    # Stop polling once the analysis is done
+    if st.session_state.get('analysis_running'):
+        st.session_state['analysis_running'] = False
+        st.rerun()
 
 # --- Helper function for displaying interviews ---
-def display_interview(interview_transcript: str):
+def performance_panel(db, project_uuid):
+    """Sidebar summary of where this project's time and tokens went."""
+    with st.sidebar.expander("Performance"):
+        budget = get_budget_status(project_uuid, st.session_state['user_id'], st.session_state['guest_mode'])
+        for scope in ("project", "user"):
+            if budget.get(scope, {}).get("limit"):
+                st.write(f"**{scope.title()} tokens:** {budget[scope]['spent']:,} of {budget[scope]['limit']:,}")
+        if budget["level"] != "ok":
+            st.warning(f"Token budget {budget['level']}: LLM calls now use a smaller model and shorter prompts.")
+        usage = get_token_usage_by_task(db, project_uuid)
+        if usage:
+            st.table([{"task": task or "other", "calls": calls, "input_tokens": input_tokens, "output_tokens": output_tokens}
+                      for task, calls, input_tokens, output_tokens in usage])
+        rows = summarize_spans(get_recent_spans(project_uuid))
+        if not rows:
+            st.caption("No timings recorded for this project yet.")
+            return
+        st.table(rows)
+        st.caption(f"Full spans are written to {TELEMETRY_PATH or 'memory only'}")
+
+def display_interview(interview):
     try:
-        # Parse the JSON string into a Python object
-        conversation = json.loads(interview_transcript)
+        # Read the turns (or the legacy JSON blob) as a list of researcher/user dicts
+        conversation = interview.conversation
         
         # Create a container for the conversation
         conversation_container = st.container()
@@ -256,18 +288,16 @@ def display_interview(interview_transcript: str):
     except json.JSONDecodeError:
         # Fallback to original display if JSON parsing fails
         st.write("Could not parse conversation format. Displaying raw transcript:")
-        st.write(interview_transcript)
+        st.write(interview.interview_transcript)
 
 # --- UI Components ---
 
-def login_page():
+def login_page(db):
     st.title("Login")
     email = st.text_input("Email")
     password = st.text_input("Password", type="password")
     if st.button("Login"):
-        db = next(get_db())
         user = get_user_by_email(db, email)
-        db.close()
         if user and verify_password(user.password, password):
             st.session_state['logged_in'] = True
             st.session_state['user_id'] = user.user_id
@@ -276,7 +306,7 @@ def login_page():
         else:
             st.error("Invalid credentials.")
 
-def signup_page():
+def signup_page(db):
     st.title("Create Account")
     email = st.text_input("Email")
     password = st.text_input("Password", type="password")
@@ -285,26 +315,21 @@ def signup_page():
         if password != confirm_password:
             st.error("Passwords do not match.")
             return
-        db = next(get_db())
         if get_user_by_email(db, email):
             st.error("Email already exists.")
-            db.close()
             return
 
         create_user(db, email, password)  # Hash the password!
-        db.close()
         st.success("Account created successfully! Please log in.")
         st.rerun() #rerun to clear fields.
 
-def create_project_page():
+def create_project_page(db):
     st.title("Create New Project")
 
     # Check user's project count
-    db = next(get_db())
     # Get all projects for the user, ordered by creation date
     user_projects = db.query(Project).filter(Project.user_id == st.session_state['user_id']).order_by(Project.creation_date).all()
     project_count = len(user_projects)
-    db.close()
     
     # Display warning if at project limit
     if project_count >= 5:
@@ -322,43 +347,18 @@ def create_project_page():
     product_desc = st.text_area("General Product Category/Type", placeholder="Example: A mobile app for collaborative note-taking")
 
     if st.button("Create Project"):
-        db = next(get_db())
-
         # Delete oldest project if at the limit
         if project_count >= 5:
-            oldest_project_id = user_projects[0].project_uuid
-            
-            # Delete associated records first (cascade delete isn't automatic)
-            # Delete interviews
-            interviews = db.query(Interview).filter(Interview.project_uuid == oldest_project_id).all()
-            for interview in interviews:
-                db.delete(interview)
-            
-            # Delete personas
-            personas = db.query(Persona).filter(Persona.project_uuid == oldest_project_id).all()
-            for persona in personas:
-                db.delete(persona)
-                
-            # Delete UX researchers
-            researchers = db.query(UXRResearcher).filter(UXRResearcher.project_uuid == oldest_project_id).all()
-            for researcher in researchers:
-                db.delete(researcher)
-                
-            # Delete persona archetypes
-            archetypes = db.query(PersonaArchetype).filter(PersonaArchetype.project_uuid == oldest_project_id).all()
-            for archetype in archetypes:
-                db.delete(archetype)
-            
-            # Delete the project itself
-            db.delete(oldest_project)
-            
-            db.commit()
+            run_write(delete_project, oldest_project.project_uuid, commit=False)
+            # Analysis results in the session belong to whichever project was open before
+            for key in ('cluster_summaries', 'uxr_report', 'selected_interview', 'analysis_uuid', 'loaded_analysis_uuid'):
+                st.session_state.pop(key, None)
             st.success(f"Project '{oldest_project.project_name}' has been deleted to make room for your new project.")
 
         with st.spinner("Creating project... Please wait."):
             # LLM generated project name.
             prompt = get_project_name_prompt(user_group_desc, product_desc)
-            project_name = call_llm(prompt, st.secrets["api_key"], st.secrets[model_key])
+            project_name = call_llm(prompt, st.secrets["api_key"], st.secrets[model_key], task="project_name")
         project = create_project(db, st.session_state['user_id'], user_group_desc, product_desc, project_name)
         st.session_state['current_project_uuid'] = project.project_uuid
         st.session_state['project_name'] = project.project_name
@@ -371,135 +371,19 @@ def create_project_page():
                 st.session_state['guest_projects'] = []
             st.session_state['guest_projects'].append(project.project_uuid)
 
-        db.close()
         st.success(f"Project '{project_name}' created!")
         st.rerun()
 
-def generate_uxr_report(project, personas, interviews, cluster_summaries, report_options, api_key, model_name):
-    """
-    Generate a UX research report based on the provided data and selected sections.
-    
-    Args:
-        project: The project object containing project details
-        personas: List of persona objects
-        interviews: List of interview objects
-        cluster_summaries: Dictionary of cluster summaries
-        report_options: Dictionary with boolean flags for which sections to include and report title
-        api_key: API key for LLM calls
-        
-    Returns:
-        dict: The generated report content by section
-        str: The compiled full report
-    """
-    report_content = {}
-    
-    # Executive Summary
-    if report_options.get('include_exec_summary', False):
-        themes = [summary['theme'] for _, summary in cluster_summaries.items()]
-        exec_summary_prompt = get_exec_summary_prompt(project.product_desc, 
-                                                    project.user_group_desc,
-                                                    themes)
-        report_content['executive_summary'] = call_llm(exec_summary_prompt, api_key, model_name)
-    
-    # Research Background
-    if report_options.get('include_background', False):
-        report_content['research_background'] = f"""
-        ## Research Background
-        
-        **Project:** {project.project_name}
-        
-        **Product Description:** {project.product_desc}
-        
-        **Target User Group:** {project.user_group_desc}
-        
-        **Research Methodology:** This research was conducted using simulated interviews with AI-generated personas 
-        representing the target user group. The interviews were designed to explore user needs, pain points, 
-        and potential value propositions related to the product. Since personas were AI-generated, there may be 
-        biases and caveats to the research. Please use these results as directional guidance for product development
-        and validate all findings with customer interviews and product stakeholders.
-        
-        **Research Period:** {datetime.now().strftime("%B %Y")}
-        """
-    
-    # Participant Demographics
-    if report_options.get('include_demographics', False):
-        demographics_text = "## Participant Demographics\n\n"
-        for i, persona in enumerate(personas, 1):
-            demographics_text += f"### Participant {i}: {persona.persona_name}\n\n"
-            
-            # Extract key demographic information from persona description
-            demo_prompt = get_demographics_prompt(persona.persona_desc)
-            demo_summary = call_llm(demo_prompt, api_key, model_name)
-            demographics_text += f"{demo_summary}\n\n"
-        
-        report_content['demographics'] = demographics_text
-    
-    # Key Findings
-    if report_options.get('include_key_findings', False):
-        findings_prompt = get_findings_prompt(json.dumps([summary for _, summary in cluster_summaries.items()]))
-        report_content['key_findings'] = "## Key Findings\n\n" + call_llm(findings_prompt, api_key, model_name)
-    
-    # Detailed Analysis
-    if report_options.get('include_detailed_analysis', False):
-        detailed_analysis = "## Detailed Analysis\n\n"
-        for i, (_, summary) in enumerate(cluster_summaries.items(), 1):
-            detailed_analysis += f"### Theme {i}: {summary['theme']}\n\n"
-            detailed_analysis += f"{summary['description']}\n\n"
-            detailed_analysis += "**Supporting Evidence:**\n\n"
-            detailed_analysis += f"{summary['sample_sentences']}\n\n"
-        
-        report_content['detailed_analysis'] = detailed_analysis
-    
-    # Recommendations
-    if report_options.get('include_recommendations', False):
-        recommendations_prompt = get_recommendations_prompt(
-            project.product_desc,
-            project.user_group_desc,
-            json.dumps([summary for _, summary in cluster_summaries.items()])
-        )
-        report_content['recommendations'] = "## Recommendations\n\n" + call_llm(recommendations_prompt, api_key, model_name)
-    
-    # Appendix
-    if report_options.get('include_appendix', False):
-        appendix = "## Appendix: Raw Interview Data\n\n"
-        for i, interview in enumerate(interviews, 1):
-            persona = next((p for p in personas if p.persona_uuid == interview.persona_uuid), None)
-            if persona:
-                appendix += f"### Interview {i}: Conversation with {persona.persona_name}\n\n"
-                
-                conversation = json.loads(interview.interview_transcript)
-                for j, turn in enumerate(conversation, 1):
-                    appendix += f"**Researcher:** {turn['researcher']}\n\n"
-                    appendix += f"**{persona.persona_name}:** {turn['user']}\n\n"
-                
-                appendix += "---\n\n"
-        
-        report_content['appendix'] = appendix
-    
-    # Compile full report
-    full_report = f"# {report_options.get('report_title', 'UXR Report')}\n\n"
-    
-    if report_options.get('include_exec_summary', False):
-        full_report += "## Executive Summary\n\n"
-        full_report += report_content['executive_summary'] + "\n\n"
-    
-    for section in ['research_background', 'demographics', 'key_findings', 
-                'detailed_analysis', 'recommendations', 'appendix']:
-        if section in report_content:
-            full_report += report_content[section] + "\n\n"
-    
-    return report_content, full_report
-
-def project_main_page(project_uuid):
-    db = next(get_db())
-    project = get_project_by_uuid(db, project_uuid)
+def project_main_page(db, project_uuid):
+    snapshot = get_project_snapshot(project_uuid)
+    project = snapshot.project
 
     st.title(f"Project: {project.project_name}")
     #make project name editable
     new_project_name = st.text_input("Edit Project Name", project.project_name)
     if new_project_name != project.project_name:
         project.project_name = new_project_name
-        update_project(db, project_uuid, {'project_name':new_project_name})
+        run_write(apply_updates_bulk, Project, 'project_uuid', {project_uuid: {'project_name': new_project_name}}, commit=False)
         st.rerun()
 
 
@@ -511,87 +395,76 @@ def project_main_page(project_uuid):
     if st.button("Generate Persona Archetypes"):
         st.write("Create persona archetypes based on user group and product description.")
         with st.spinner("Generating persona archetypes... This might take a few moments."):
-            prompt = get_persona_archetypes_prompt(project.user_group_desc, project.product_desc)
-            response = call_llm(prompt, st.secrets["api_key"], st.secrets[model_key])
-        archetypes_data = response.split("<archetype-")
-        db = next(get_db()) #re-establish since call_llm closes it.
-        for archetype_str in archetypes_data:
-            if len(archetype_str) > 5:
-                archetype_str = archetype_str.split(">")[1]
-                archetype_str = archetype_str.split("</archetype-")[0]
-                if archetype_str.strip():
-                    try:
-                        name, desc = archetype_str.split("Description:", 1)
-                        name = name.replace("Name: ", "").strip()
-                        desc = desc.strip()
-                        create_persona_archetype(db, project_uuid, name, desc)
-                    except ValueError:
-                        st.error(f"Error parsing archetype: {archetype_str}")
-        db.close()
-        st.rerun()
+            new_archetypes = generate_archetypes(project.user_group_desc, project.product_desc,
+                                                 st.secrets["api_key"], st.secrets[model_key])
+        if not new_archetypes:
+            st.error("Could not parse any archetypes from the model's response. Please try again.")
+        else:
+            run_write(create_persona_archetypes_bulk, project_uuid, new_archetypes, commit=False)
+            st.rerun()
 
     #display, edit, add archetypes.
-    db = next(get_db()) #re-establish since call_llm closes it.
-    archetypes = get_archetypes_by_project(db, project_uuid)
-    for archetype in archetypes:
+    archetype_updates = {}
+    for archetype in snapshot.archetypes:
         with st.expander(archetype.persona_archetype_name, expanded=True):
             new_name = st.text_input("Name", archetype.persona_archetype_name, key=f"name_{archetype.persona_arch_uuid}")
             new_desc = st.text_area("Description", archetype.persona_archetype_desc, key=f"desc_{archetype.persona_arch_uuid}")
             if new_name != archetype.persona_archetype_name or new_desc != archetype.persona_archetype_desc:
-                update_persona_archetype(db, archetype.persona_arch_uuid, {'persona_archetype_name': new_name, 'persona_archetype_desc': new_desc})
+                archetype_updates[archetype.persona_arch_uuid] = {'persona_archetype_name': new_name, 'persona_archetype_desc': new_desc}
+    if archetype_updates:
+        # Fire and forget: the widgets already show the edit, nothing on this run reads it back
+        run_write(apply_updates_bulk, PersonaArchetype, 'persona_arch_uuid', archetype_updates, commit=False, wait=False)
 
     #allow adding new
     with st.expander("Add New Archetype"):
         new_arch_name = st.text_input("Archetype Name")
         new_arch_desc = st.text_area("Archetype Description")
         if st.button("Add Archetype", key = "add_new_archetype"):
-            create_persona_archetype(db, project_uuid, new_arch_name, new_arch_desc)
+            run_write(create_persona_archetype, project_uuid, new_arch_name, new_arch_desc, commit=False)
             st.rerun()
 
 
     # --- Specific Personas ---
     st.header("Specific Personas")
+    per_archetype = st.number_input("Personas per archetype", min_value=1, max_value=20, value=PERSONAS_PER_ARCHETYPE)
     if st.button("Generate Personas"):
         st.write("Create specific personas based on archetypes.")
-        archetypes = get_archetypes_by_project(db, project_uuid)
-        existing_names = get_existing_persona_names(db, project_uuid)
         with st.spinner("Generating specific personas for each archetype... This will take a few moments, please do not navigate away..."):
-            for archetype in archetypes:
-                prompt = get_specific_persona_prompt(archetype.persona_archetype_name, 
-                                                     archetype.persona_archetype_desc,
-                                                     existing_names,
-                                                     project.product_desc)
-                response = call_llm(prompt, st.secrets["api_key"], st.secrets[model_key])
-                try:
-                    persona_dict = parse_persona_response(response)
-                    name = str(persona_dict['name'])
-                    desc = str(persona_dict['description'])
-                    create_persona(db, project_uuid, archetype.persona_arch_uuid, name, desc)
-                    existing_names.append(name)
-                except ValueError:
-                    st.error(f"Error parsing persona from response: {response}")
+            new_personas = generate_personas(snapshot.archetypes, project.product_desc, snapshot.existing_persona_names(),
+                                             st.secrets["api_key"], st.secrets[model_key], per_archetype=per_archetype)
+            expected = len(snapshot.archetypes) * per_archetype
+            if len(new_personas) < expected:
+                # Shown after the rerun below, which would otherwise clear it straight away
+                st.session_state['persona_generation_error'] = f"Could not generate or parse {expected - len(new_personas)} of the requested personas."
+            run_write(create_personas_bulk, project_uuid, new_personas, commit=False)
         st.rerun()
+    if 'persona_generation_error' in st.session_state:
+        st.error(st.session_state.pop('persona_generation_error'))
     #Display, edit, add personas.
-    personas = get_personas_by_project(db, project_uuid)
+    personas = snapshot.personas
+    persona_updates = {}
     for persona in personas:
-        archetype = db.query(PersonaArchetype).filter(PersonaArchetype.persona_arch_uuid == persona.persona_arch_uuids).first()
+        archetype = snapshot.archetype_for(persona)
         with st.expander(f"{persona.persona_name} (Archetype: {archetype.persona_archetype_name})", expanded=True):
             new_name = st.text_input("Name", persona.persona_name, key=f"pname_{persona.persona_uuid}")
             new_desc = st.text_area("Description\n", persona.persona_desc, key=f"pdesc_{persona.persona_uuid}")
             st.info(f"Associated Archetype: {archetype.persona_archetype_name}")
             st.text(archetype.persona_archetype_desc)
             if new_name != persona.persona_name or new_desc != persona.persona_desc:
-                update_persona(db, persona.persona_uuid, {'persona_name': new_name, 'persona_desc': new_desc})
+                persona_updates[persona.persona_uuid] = {'persona_name': new_name, 'persona_desc': new_desc}
+    if persona_updates:
+        run_write(apply_updates_bulk, Persona, 'persona_uuid', persona_updates, commit=False, wait=False)
 
     # Add new persona manually
     with st.expander("Add New Persona"):
         new_persona_name = st.text_input("New Persona Name")
         new_persona_desc = st.text_area("New Persona Description")
-        archetype_options = {arch.persona_archetype_name: arch.persona_arch_uuid for arch in get_archetypes_by_project(db, project_uuid)}
+        archetype_options = {arch.persona_archetype_name: arch.persona_arch_uuid for arch in snapshot.archetypes}
         selected_archetype = st.selectbox("Select Associated Archetype", list(archetype_options.keys()))
         if st.button("Add Persona"):
             if new_persona_name and new_persona_desc and selected_archetype:
-                create_persona(db, project_uuid, archetype_options[selected_archetype], new_persona_name, new_persona_desc)
+                run_write(create_persona, project_uuid, archetype_options[selected_archetype], new_persona_name,
+                          new_persona_desc, commit=False)
                 st.success(f"New persona '{new_persona_name}' added successfully!")
                 st.rerun()
             else:
@@ -600,128 +473,73 @@ def project_main_page(project_uuid):
     
     # --- UXR Researcher Persona ---
     st.header("UX Researcher Persona")
-    name, desc = get_researcher_persona()
-    create_uxr_researcher(db, project_uuid, name, desc)
-
-    researcher = get_uxr_researcher_by_project(db, project_uuid)
+    researcher = snapshot.researcher
+    if researcher is None:
+        name, desc = get_researcher_persona()
+        researcher = run_write(get_or_create_uxr_researcher, project_uuid, name, desc, commit=False)
     if researcher:
         with st.expander(researcher.uxr_persona_name, expanded=True):
           new_name = st.text_input("Name", researcher.uxr_persona_name, key=f"rname_{researcher.uxr_persona_uuid}")
           new_desc = st.text_area("Description", researcher.uxr_persona_desc, key=f"rdesc_{researcher.uxr_persona_uuid}")
           if new_name != researcher.uxr_persona_name or new_desc != researcher.uxr_persona_desc:
-              update_uxr_researcher(db, researcher.uxr_persona_uuid, {'uxr_persona_name': new_name, 'uxr_persona_desc': new_desc})
+              run_write(apply_updates_bulk, UXRResearcher, 'uxr_persona_uuid',
+                        {researcher.uxr_persona_uuid: {'uxr_persona_name': new_name, 'uxr_persona_desc': new_desc}}, commit=False,
+                        wait=False)
 
     # --- Simulate Interviews ---
     st.header("Simulate Interviews")
 
-    personas = get_personas_by_project(db, project_uuid)
-    researcher = get_uxr_researcher_by_project(db, project_uuid)
-
     if not researcher:
         st.error("Please generate the UXR Researcher Persona first.")
     elif not personas:
         st.error("Please generate Specific Personas first.")
     else:
-        # Instead of relying on session state for interview status,
-        # check the database directly for each persona
-        for persona in personas:
-            # Check if interview exists in database
-            interview = db.query(Interview).filter(
-                Interview.persona_uuid == persona.persona_uuid,
-                Interview.uxr_persona_uuid == researcher.uxr_persona_uuid,
-                Interview.project_uuid == project_uuid
-            ).first()
-
-            col1, col2 = st.columns([3, 1])
-            
-            with col1:
-                if interview:
-                    st.info(f"Interview with {persona.persona_name} (Completed)")
-                else:
-                    st.text(f"Interview with {persona.persona_name} not started")
-
-            with col2:
-                button_key = f"interview_button_{persona.persona_uuid}"
-                if interview:
-                    if st.button("View", key=button_key):
-                        st.session_state['selected_interview'] = interview.interview_uuid
-                        st.rerun()
-                else:
-                    if st.button("Run", key=button_key):
-                        # Start interview in background thread
-                        thread = threading.Thread(
-                            target=run_interview_in_background,
-                            args=(persona.persona_uuid, researcher.uxr_persona_uuid, project_uuid)
-                        )
-                        thread.daemon = True
-                        thread.start()
-                        st.info(f"Interview with {persona.persona_name} started in background. Refresh the page in a minute to see results.")
-                        st.rerun()
+        # Status is re-queried by the fragment itself; it only polls while interviews are running
+        interviews_active = any(job.active for job in get_interview_jobs(project_uuid))
+        st.fragment(run_every=PROGRESS_REFRESH_SECONDS if interviews_active else None)(interview_status_panel)(
+            project_uuid, researcher.uxr_persona_uuid, personas)
 
-                # Run all interviews button
+        # Run all interviews button
         if st.button("Run All Remaining Interviews"):
-            remaining_personas = [p for p in personas if not db.query(Interview).filter(
-                Interview.persona_uuid == p.persona_uuid,
-                Interview.uxr_persona_uuid == researcher.uxr_persona_uuid,
-                Interview.project_uuid == project_uuid
-            ).first()]
+            active_personas = {job.persona_uuid for job in get_interview_jobs(project_uuid) if job.active}
+            remaining_personas = [p for p in snapshot.remaining_personas() if p.persona_uuid not in active_personas]
             
             if not remaining_personas:
                 st.info("All interviews have already been completed.")
             else:
-                # Log the start of batch interview process
+                # Returns as soon as the interviews are queued; the status panel tracks the batch from here
                 logging.info(f"Starting batch interview process for {len(remaining_personas)} personas")
-                st.info(f"Starting interviews for {len(remaining_personas)} personas. This will run in the background. Please do not close this page.")
-                
-                # Create a thread pool to run interviews concurrently
-                max_workers = min(3, len(remaining_personas))  # Don't create more threads than needed
-                logging.info(f"Creating ThreadPoolExecutor with max_workers={max_workers}")
-                
-                with ThreadPoolExecutor(max_workers=max_workers) as executor:
-                    futures = []
-                    for persona in remaining_personas:
-                        logging.info(f"Submitting interview task for persona: {persona.persona_name} (UUID: {persona.persona_uuid})")
-                        future = executor.submit(
-                            run_interview_in_background,
-                            persona.persona_uuid,
-                            researcher.uxr_persona_uuid,
-                            project_uuid
-                        )
-                        futures.append(future)
-                    
-                    logging.info(f"All {len(futures)} interview tasks have been submitted to the executor")
-                
-                logging.info("ThreadPoolExecutor has completed all tasks")
-                st.success("All interviews have been processed. Refresh the page to see results.")
-                time.sleep(2)  # Give a moment for the user to see the message
+                batch = submit_interview_batch(project_uuid, researcher.uxr_persona_uuid, remaining_personas,
+                                               skip_near_duplicates=True)
+                st.session_state['interview_batch_id'] = batch.batch_id
                 st.rerun()
 
         # Display interviews
         if 'selected_interview' in st.session_state:
             interview = db.query(Interview).filter(Interview.interview_uuid == st.session_state['selected_interview']).first()
             if interview:
-                persona = db.query(Persona).filter(Persona.persona_uuid == interview.persona_uuid).first()
+                persona = snapshot.personas_by_uuid.get(interview.persona_uuid)
                 with st.expander(f"Interview with {persona.persona_name}", expanded=True):
-                    display_interview(interview.interview_transcript)
+                    display_interview(interview)
 
     # --- Analyze Interviews ---
     st.header("Analyze Interviews")
-    if st.button("Analyze"):
-        with st.spinner("Analyzing Interviews... This may take a few minutes, feel free to get a coffee but do NOT close this page or you will lose the analysis."):
-            interviews = get_interviews_by_project(db, project_uuid)
-            all_conversations = []
-            for interview in interviews:
-                all_conversations.extend(json.loads(interview.interview_transcript)) 
-            clusters = cluster_sentences(all_conversations, st.secrets["api_key"], use_local=True)
-            cluster_summaries = summarize_each_cluster(clusters, st.session_state.product_desc, 
-                                                    st.session_state.user_group_desc,
-                                                    st.secrets["api_key"],
-                                                    st.secrets[model_key])
-            st.session_state['cluster_summaries'] = cluster_summaries
-        for _, summary in cluster_summaries.items():
-            with st.expander(f"Theme: {summary['theme']}"):
-                st.write(f"Description: {summary['description']}")
-                st.write(f"Sample sentences:\n{summary['sample_sentences']}")
+    analysis = get_analysis_result(db, st.session_state.get('analysis_uuid'))
+    if analysis is None or analysis.project_uuid != project_uuid:
+        # Pick up this project's last analysis, e.g. after a page reload
+        analysis = get_latest_analysis(db, project_uuid)
+        st.session_state['analysis_uuid'] = analysis.analysis_uuid if analysis else None
+    analysis_active = analysis is not None and analysis.status in ("queued", "running")
+    st.session_state['analysis_running'] = analysis_active
+    if st.button("Analyze", disabled=analysis_active):
+        # Runs on the analysis worker pool; the status panel picks the results up from the database
+        st.session_state['analysis_uuid'] = submit_analysis(project_uuid, st.secrets["api_key"], st.secrets[model_key])
+        st.rerun()
+    st.fragment(run_every=PROGRESS_REFRESH_SECONDS if analysis_active else None)(analysis_status_panel)(project_uuid)
+    for _, summary in st.session_state.get('cluster_summaries', {}).items():
+        with st.expander(f"Theme: {summary['theme']}"):
+            st.write(f"Description: {summary['description']}")
+            st.write(f"Sample sentences:\n{summary['sample_sentences']}")
     
     # --- UXR Report ---
     st.header("UXR Report")
@@ -745,8 +563,7 @@ def project_main_page(project_uuid):
             if st.button("Generate Report"):
                 with st.spinner("Generating comprehensive UXR report... This may take a few minutes."):
                     # Get necessary data
-                    personas = get_personas_by_project(db, project_uuid)
-                    interviews = get_interviews_by_project(db, project_uuid)
+                    interviews = get_interviews_by_project(db, project_uuid, with_turns=True)
                     cluster_summaries = st.session_state['cluster_summaries']
                     
                     # Configure report options
@@ -793,110 +610,119 @@ def project_main_page(project_uuid):
                 st.info("Please generate a report first.")
     else:
         st.info("Please analyze interviews first to generate a report.")
-    
-    db.close()
 
 # --- Main App Logic ---
 
-if not st.session_state['logged_in'] and not st.session_state['guest_mode']:
-    # Change the default selection to "Continue as Guest" instead of "Login"
-    choice = st.sidebar.selectbox("Navigation", ["Continue as Guest", "Login", "Create Account"])
+# One database session per script run, shared by every page function below.
+with session_scope() as db:
+
+    if not st.session_state['logged_in'] and not st.session_state['guest_mode']:
+        # Change the default selection to "Continue as Guest" instead of "Login"
+        choice = st.sidebar.selectbox("Navigation", ["Continue as Guest", "Login", "Create Account"])
     
-    if choice == "Login":
-        login_page()
-    elif choice == "Create Account":
-        signup_page()
-    else:  # Continue as Guest (now the default option)
-        st.session_state['guest_mode'] = True
-        st.session_state['guest_user_id'], guest_email, guest_password = create_guest_user()
-        st.session_state['user_id'] = st.session_state['guest_user_id']
-        st.session_state['guest_email'] = guest_email
-        st.session_state['guest_password'] = guest_password
-        st.rerun()
-else:
-    if st.session_state['guest_mode']:
-        st.sidebar.write("📝 Guest Mode")
-        st.sidebar.info("To save your work, please create an account before leaving")
-        if st.sidebar.button("Log in / Create Account"):
-            st.session_state['show_auth_modal'] = True
+        if choice == "Login":
+            login_page(db)
+        elif choice == "Create Account":
+            signup_page(db)
+        else:  # Continue as Guest (now the default option)
+            st.session_state['guest_mode'] = True
+            st.session_state['guest_user_id'], guest_email, guest_password = create_guest_user(db)
+            st.session_state['user_id'] = st.session_state['guest_user_id']
+            st.session_state['guest_email'] = guest_email
+            st.session_state['guest_password'] = guest_password
+            st.rerun()
     else:
-        st.sidebar.write(f"Logged in as: {st.session_state['user_id']}")
+        if st.session_state['guest_mode']:
+            st.sidebar.write("📝 Guest Mode")
+            st.sidebar.info("To save your work, please create an account before leaving")
+            if st.sidebar.button("Log in / Create Account"):
+                st.session_state['show_auth_modal'] = True
+        else:
+            st.sidebar.write(f"Logged in as: {st.session_state['user_id']}")
 
-    if st.sidebar.button("Logout"):
-        logout_user()
-        reset_session_state()
-        st.rerun()
+        with st.sidebar.expander("LLM concurrency"):
+            for stats in get_limiter_stats():
+                st.write(f"**{stats['name']}**: {stats['in_flight']} in flight, limit {stats['limit']} of {stats['max_limit']}")
+                st.caption(f"{stats['calls']} calls, {stats['errors']} errors, {stats['throttled']} throttled, "
+                           f"median latency {stats['p50_latency'] or 0:.1f}s")
 
-    if st.session_state['current_project_uuid'] is None:
-        create_project_page()
-    else:
-        project_main_page(st.session_state['current_project_uuid'])
+        if st.sidebar.button("Logout"):
+            logout_user()
+            reset_session_state()
+            st.rerun()
 
-# Add authentication modal for guest users when needed
-if st.session_state.get('show_auth_modal', False):
-    with st.sidebar.expander("Authentication Required", expanded=True):
-        auth_tab1, auth_tab2 = st.tabs(["Login", "Create Account"])
-        
-        with auth_tab1:
-            email = st.text_input("Email", key="login_email")
-            password = st.text_input("Password", type="password", key="login_password")
-            if st.button("Login", key="login_button"):
-                db = next(get_db())
-                user = get_user_by_email(db, email)
-                
-                if user and verify_password(user.password, password):
-                    # Transfer guest data to logged in user
-                    if st.session_state['guest_user_id']:
-                        # Update projects to belong to the logged in user
-                        for project_uuid in st.session_state.get('guest_projects', []):
-                            project = get_project_by_uuid(db, project_uuid)
-                            if project:
-                                update_project(db, project_uuid, {'user_id': user.user_id})
-                    
-                    st.session_state['logged_in'] = True
-                    st.session_state['guest_mode'] = False
-                    st.session_state['user_id'] = user.user_id
-                    st.session_state['show_auth_modal'] = False
-                    st.success("Logged in successfully!")
-                    db.close()
-                    st.rerun()
-                else:
-                    db.close()
-                    st.error("Invalid credentials.")
+        # Spans and token spend recorded below are charged to this user (and project, once one is open)
+        with telemetry_context(user_id=st.session_state['user_id'], guest=st.session_state['guest_mode']):
+            if st.session_state['current_project_uuid'] is None:
+                create_project_page(db)
+            else:
+                with telemetry_context(project_uuid=st.session_state['current_project_uuid']):
+                    project_main_page(db, st.session_state['current_project_uuid'])
+                performance_panel(db, st.session_state['current_project_uuid'])
+
+    # Add authentication modal for guest users when needed
+    if st.session_state.get('show_auth_modal', False):
+        with st.sidebar.expander("Authentication Required", expanded=True):
+            auth_tab1, auth_tab2 = st.tabs(["Login", "Create Account"])
         
-        with auth_tab2:
-            email = st.text_input("Email", key="signup_email")
-            password = st.text_input("Password", type="password", key="signup_password")
-            confirm_password = st.text_input("Confirm Password", type="password", key="signup_confirm")
-            if st.button("Create Account", key="signup_button"):
-                error_occurred = False
-                if password != confirm_password:
-                    st.error("Passwords do not match.")
-                    error_occurred = True
-                if not re.match(r"[^@]+@[^@]+\.[^@]+", email):
-                    st.error("Please enter a valid email address.")
-                    error_occurred = True
+            with auth_tab1:
+                email = st.text_input("Email", key="login_email")
+                password = st.text_input("Password", type="password", key="login_password")
+                if st.button("Login", key="login_button"):
+                    user = get_user_by_email(db, email)
                 
-                if not error_occurred:
-                    db = next(get_db())
-                    if get_user_by_email(db, email):
-                        st.error("Email already exists.")
-                        db.close()
-                    else:
-                        new_user = create_user(db, email, password)
-                        
-                        # Transfer guest data to new user
+                    if user and verify_password(user.password, password):
+                        # Transfer guest data to logged in user
                         if st.session_state['guest_user_id']:
-                            # Update projects to belong to the new user
+                            # Update projects to belong to the logged in user
                             for project_uuid in st.session_state.get('guest_projects', []):
                                 project = get_project_by_uuid(db, project_uuid)
                                 if project:
-                                    update_project(db, project_uuid, {'user_id': new_user.user_id})
-                        
+                                    update_project(db, project_uuid, {'user_id': user.user_id})
+                    
                         st.session_state['logged_in'] = True
                         st.session_state['guest_mode'] = False
-                        st.session_state['user_id'] = new_user.user_id
+                        st.session_state['user_id'] = user.user_id
                         st.session_state['show_auth_modal'] = False
-                        st.success("Account created successfully! Your work has been transferred to your new account.")
-                        db.close()
+                        st.success("Logged in successfully!")
                         st.rerun()
+                    else:
+                        st.error("Invalid credentials.")
+        
+            with auth_tab2:
+                email = st.text_input("Email", key="signup_email")
+                password = st.text_input("Password", type="password", key="signup_password")
+                confirm_password = st.text_input("Confirm Password", type="password", key="signup_confirm")
+                if st.button("Create Account", key="signup_button"):
+                    error_occurred = False
+                    if password != confirm_password:
+                        st.error("Passwords do not match.")
+                        error_occurred = True
+                    if not re.match(r"[^@]+@[^@]+\.[^@]+", email):
+                        st.error("Please enter a valid email address.")
+                        error_occurred = True
+                
+                    if not error_occurred:
+                        if get_user_by_email(db, email):
+                            st.error("Email already exists.")
+                        else:
+                            new_user = create_user(db, email, password)
+                        
+                            # Transfer guest data to new user
+                            if st.session_state['guest_user_id']:
+                                # Update projects to belong to the new user
+                                for project_uuid in st.session_state.get('guest_projects', []):
+                                    project = get_project_by_uuid(db, project_uuid)
+                                    if project:
+                                        update_project(db, project_uuid, {'user_id': new_user.user_id})
+                        
+                            st.session_state['logged_in'] = True
+                            st.session_state['guest_mode'] = False
+                            st.session_state['user_id'] = new_user.user_id
+                            st.session_state['show_auth_modal'] = False
+                            st.success("Account created successfully! Your work has been transferred to your new account.")
+                            st.rerun()
+
+# The page is on screen by now; load the analysis models in the background so Analyze doesn't wait for them
+if MODEL_WARMUP:
+    start_model_warmup()
@@ -0,0 +1,50 @@
+"""Synthetic interview transcripts for benchmarks, shaped like what simulate_interview produces."""
+import random
+from types import SimpleNamespace
+
+SUBJECTS = ["I", "We", "My teammates", "Most of my friends", "My clients", "People in my office", "My kids", "A lot of us"]
+VERBS = ["struggle with", "really care about", "keep forgetting", "spend too long on", "would pay extra for",
+         "get frustrated by", "rely on", "have given up on", "compare options for", "ask around about"]
+OBJECTS = ["the monthly price", "setting everything up", "syncing between devices", "constant notifications",
+           "keeping my data private", "how slow the app loads", "getting a real person on support",
+           "sharing work with colleagues", "the onboarding checklist", "exporting reports", "the mobile layout",
+           "offline access", "search that actually works", "calendar integration", "dark mode"]
+TAILS = ["every single week", "when I'm in a hurry", "before I commit to anything", "more than I'd like to admit",
+         "especially on my phone", "at the end of the day", "and it drives me crazy", "if I'm being honest",
+         "", "", ""]
+QUESTIONS = ["Can you tell me about the last time that happened?", "What do you do today instead?",
+             "How does that affect your week?", "What would make that easier?", "Why does that matter to you?"]
+
+PRODUCT_DESC = "A scheduling and task app for small teams"
+USER_GROUP_DESC = "Busy professionals coordinating work across a small team"
+
+
+def make_sentence(rng: random.Random) -> str:
+    tail = rng.choice(TAILS)
+    return f"{rng.choice(SUBJECTS)} {rng.choice(VERBS)} {rng.choice(OBJECTS)}{' ' + tail if tail else ''}."
+
+def make_corpus(num_sentences: int, turns: int=5, seed: int=0) -> SimpleNamespace:
+    """
+    Personas and interviews holding about `num_sentences` user sentences, 2-4 per answer, `turns` answers per
+    interview. Returns a namespace with project, personas, interviews and user_responses.
+    """
+    rng = random.Random(seed)
+    personas, interviews, user_responses = [], [], []
+    produced = 0
+    while produced < num_sentences:
+        persona_uuid = f"persona-{len(personas)}"
+        personas.append(SimpleNamespace(persona_uuid=persona_uuid, persona_name=f"Participant {len(personas) + 1}",
+                                        persona_desc=f"{rng.randint(22, 67)} years old. " + make_sentence(rng)))
+        conversation = []
+        for _ in range(turns):
+            if produced >= num_sentences:
+                break
+            count = min(rng.randint(2, 4), num_sentences - produced)
+            answer = " ".join(make_sentence(rng) for _ in range(count))
+            produced += count
+            conversation.append({"researcher": rng.choice(QUESTIONS), "user": answer})
+            user_responses.append(answer)
+        interviews.append(SimpleNamespace(persona_uuid=persona_uuid, conversation=conversation))
+    project = SimpleNamespace(project_name="Benchmark Project", product_desc=PRODUCT_DESC,
+                              user_group_desc=USER_GROUP_DESC)
+    return SimpleNamespace(project=project, personas=personas, interviews=interviews, user_responses=user_responses)
@@ -0,0 +1,234 @@
+"""
+End-to-end analysis pipeline benchmark on synthetic transcripts, with LLM stages on the offline stub.
+
+    python -m benchmarks.pipeline --sizes 10 1000 10000
+    python -m benchmarks.pipeline --sizes 1000 --compare      # run, then flag regressions against the last run
+    python -m benchmarks.pipeline --compare-last              # compare the two most recent recorded runs
+
+Each stage records wall time, peak RSS while it ran and the number of LLM calls it made. Runs are appended to
+a JSON history file.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import resource
+import subprocess
+import threading
+from timeit import default_timer as timer
+
+HISTORY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results", "history.json")
+STAGES = ["startup_import", "extract_sentences", "embed", "cluster", "cluster_optimize", "summarize", "report"]
+PIPELINE_STAGES = STAGES[1:]
+DEFAULT_SIZES = [10, 100, 1000, 10000]
+REGRESSION_THRESHOLD = 0.2  # 20% slower or larger than the baseline
+# Differences below these are noise, not regressions
+MIN_SECONDS_DELTA = 0.05
+MIN_RSS_MB_DELTA = 16
+
+
+def _current_rss_mb() -> float:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:
+        # No procfs (macOS): fall back to the process high-water mark, reported in bytes there
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return maxrss / 2**20 if sys.platform == "darwin" else maxrss / 2**10
+
+
+class RSSSampler:
+    """Samples resident memory on a background thread to find the peak during a stage."""
+
+    def __init__(self, interval: float=0.01):
+        self.interval = interval
+        self.peak_mb = 0.0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak_mb = max(self.peak_mb, _current_rss_mb())
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self.peak_mb = _current_rss_mb()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak_mb = max(self.peak_mb, _current_rss_mb())
+
+
+def _llm_calls() -> int:
+    from utils.concurrency import get_limiter_stats
+    return sum(stats["calls"] for stats in get_limiter_stats())
+
+def measure(stage: str, size: int, fn):
+    """Run fn(), returning its result and the stage's measurements."""
+    calls_before = _llm_calls()
+    with RSSSampler() as sampler:
+        start = timer()
+        result = fn()
+        wall = timer() - start
+    row = {"size": size, "stage": stage, "wall_s": round(wall, 4), "peak_rss_mb": round(sampler.peak_mb, 1),
+           "llm_calls": _llm_calls() - calls_before}
+    print(f"  {stage:<18} {row['wall_s']:>9.3f}s  {row['peak_rss_mb']:>8.1f} MB  {row['llm_calls']:>5} LLM calls",
+          flush=True)
+    return result, row
+
+
+def run_size(size: int, stages: list[str], seed: int=0) -> list[dict]:
+    from benchmarks.corpus import make_corpus
+    from utils.convo_analysis import extract_user_sentences, EmbedSentences, ClusterSentences, summarize_each_cluster
+    from uxr_app.report import generate_uxr_report
+
+    corpus = make_corpus(size, seed=seed)
+    project = corpus.project
+    print(f"{size} sentences, {len(corpus.interviews)} interviews", flush=True)
+    rows = []
+    # Later stages need earlier outputs, so those run (unmeasured) even when not selected
+    sentences, row = measure("extract_sentences", size, lambda: extract_user_sentences(corpus.user_responses))
+    if "extract_sentences" in stages:
+        rows.append(row)
+    embed_needed = any(stage in stages for stage in PIPELINE_STAGES[1:])
+    if embed_needed:
+        embeddings, row = measure("embed", size, lambda: EmbedSentences(None, use_local=True).run(sentences))
+        if "embed" in stages:
+            rows.append(row)
+    clusters = None
+    if any(stage in stages for stage in ("cluster", "summarize", "report")):
+        clusters, row = measure("cluster", size, lambda: ClusterSentences(sentences, embeddings).run())
+        if "cluster" in stages:
+            rows.append(row)
+    if "cluster_optimize" in stages:
+        _, row = measure("cluster_optimize", size, lambda: ClusterSentences(sentences, embeddings, optimize=True).run())
+        rows.append(row)
+    summaries = None
+    if "summarize" in stages or "report" in stages:
+        summaries, row = measure("summarize", size, lambda: summarize_each_cluster(
+            clusters, project.product_desc, project.user_group_desc, "offline", None))
+        if "summarize" in stages:
+            rows.append(row)
+    if "report" in stages:
+        report_options = {"report_title": "Benchmark Report", "include_exec_summary": True,
+                          "include_background": True, "include_demographics": True, "include_key_findings": True,
+                          "include_detailed_analysis": True, "include_recommendations": True,
+                          "include_appendix": True}
+        _, row = measure("report", size, lambda: generate_uxr_report(
+            project, corpus.personas, corpus.interviews, summaries, report_options, "offline", None))
+        rows.append(row)
+    return rows
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def load_history(path: str) -> list[dict]:
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return json.load(f)
+
+def save_run(path: str, run: dict) -> None:
+    history = load_history(path)
+    history.append(run)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(history, f, indent=2)
+
+def compare_runs(baseline: dict, current: dict, threshold: float=REGRESSION_THRESHOLD) -> list[str]:
+    """Stages present in both runs whose wall time or peak RSS grew by more than `threshold`."""
+    baseline_rows = {(row["size"], row["stage"]): row for row in baseline["results"]}
+    regressions = []
+    print(f"Comparing {current.get('commit')} ({current['timestamp']}) "
+          f"against {baseline.get('commit')} ({baseline['timestamp']})")
+    for row in current["results"]:
+        base = baseline_rows.get((row["size"], row["stage"]))
+        if base is None:
+            continue
+        for metric, min_delta in (("wall_s", MIN_SECONDS_DELTA), ("peak_rss_mb", MIN_RSS_MB_DELTA)):
+            before, after = base[metric], row[metric]
+            change = (after - before) / before if before else 0.0
+            flag = ""
+            if change > threshold and after - before > min_delta:
+                flag = "  REGRESSION"
+                regressions.append(f"{row['stage']}@{row['size']} {metric}: {before} -> {after} ({change:+.0%})")
+            print(f"  {row['stage']:<18} {row['size']:>7} {metric:<12} {before:>10} -> {after:>10} ({change:+.0%}){flag}")
+        new_heavy = set(row.get("heavy_modules", ())) - set(base.get("heavy_modules", ()))
+        if new_heavy:
+            regressions.append(f"{row['stage']} now imports {', '.join(sorted(new_heavy))}")
+            print(f"  {row['stage']:<18} now imports {', '.join(sorted(new_heavy))}  REGRESSION")
+        if base["llm_calls"] != row["llm_calls"]:
+            print(f"  {row['stage']:<18} {row['size']:>7} llm_calls    {base['llm_calls']:>10} -> {row['llm_calls']:>10}")
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="user sentences per corpus")
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=STAGES)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="seconds the stub LLM sleeps per call")
+    parser.add_argument("--history", default=HISTORY_PATH)
+    parser.add_argument("--label", help="free-form note stored with the run")
+    parser.add_argument("--compare", action="store_true", help="compare this run with the previous recorded run")
+    parser.add_argument("--compare-last", action="store_true", help="only compare the two most recent runs")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD)
+    args = parser.parse_args(argv)
+
+    if args.compare_last:
+        history = load_history(args.history)
+        if len(history) < 2:
+            print(f"Need at least two runs in {args.history} to compare")
+            return 1
+        regressions = compare_runs(history[-2], history[-1], args.threshold)
+        return 1 if regressions else 0
+
+    # Must be set before utils.app_config is imported
+    os.environ["UXR_LLM_MODE"] = "stub"
+    os.environ["UXR_STUB_LATENCY"] = str(args.llm_latency)
+
+    results = []
+    if "startup_import" in args.stages:
+        # Measured first, in fresh interpreters, before this process has imported anything heavy
+        from benchmarks.startup import measure_startup
+        results.append(measure_startup())
+    pipeline_stages = [stage for stage in args.stages if stage in PIPELINE_STAGES]
+    if pipeline_stages:
+        for size in args.sizes:
+            results.extend(run_size(size, pipeline_stages, args.seed))
+    run = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": _git_commit(),
+        "label": args.label,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "llm_latency": args.llm_latency,
+        "results": results,
+    }
+    previous = load_history(args.history)
+    save_run(args.history, run)
+    print(f"Recorded run in {args.history}")
+    if args.compare:
+        if not previous:
+            print("No previous run to compare against")
+            return 0
+        regressions = compare_runs(previous[-1], run, args.threshold)
+        if regressions:
+            print("Regressions:\n  " + "\n  ".join(regressions))
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
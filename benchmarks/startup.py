@@ -0,0 +1,74 @@
+"""
+Cold import time of the modules app.py loads before the first page renders.
+
+    python -m benchmarks.startup
+
+Each sample imports STARTUP_MODULES in a fresh interpreter. The result also lists any HEAVY_MODULES that got
+loaded along the way; those should only ever load on first use or in the warm-up thread.
+"""
+import os
+import sys
+import json
+import argparse
+import resource
+import statistics
+import subprocess
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STARTUP_MODULES = [
+    "streamlit",
+    "uxr_app.database",
+    "uxr_app.writer",
+    "uxr_app.cache",
+    "uxr_app.jobs",
+    "uxr_app.report",
+    "uxr_app.ledger",
+    "utils.convo_analysis",
+    "utils.interview_utils",
+    "utils.prompt_templates",
+]
+HEAVY_MODULES = ["torch", "spacy", "sentence_transformers", "sklearn", "joblib", "numpy", "langchain_together",
+                 "langchain_openai"]
+
+_PROBE = """
+import importlib, json, sys, time
+start = time.perf_counter()
+for name in {modules!r}:
+    importlib.import_module(name)
+elapsed = time.perf_counter() - start
+print(json.dumps({{"seconds": elapsed, "heavy": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def measure_startup(repeats: int=5) -> dict:
+    """Median seconds to import the startup modules from cold, as a benchmark history row."""
+    probe = _PROBE.format(modules=STARTUP_MODULES, heavy=HEAVY_MODULES)
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, [REPO_ROOT, os.environ.get("PYTHONPATH")]))}
+    samples, heavy = [], []
+    for _ in range(repeats):
+        result = subprocess.run([sys.executable, "-c", probe], capture_output=True, text=True, cwd=REPO_ROOT, env=env)
+        if result.returncode != 0:
+            raise RuntimeError(f"Startup probe failed:\n{result.stderr}")
+        measured = json.loads(result.stdout.strip().splitlines()[-1])
+        samples.append(measured["seconds"])
+        heavy = measured["heavy"]
+    # ru_maxrss of children is the largest child so far, i.e. the biggest probe
+    maxrss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    row = {"size": 0, "stage": "startup_import", "wall_s": round(statistics.median(samples), 4),
+           "peak_rss_mb": round(maxrss / 2**20 if sys.platform == "darwin" else maxrss / 2**10, 1),
+           "llm_calls": 0, "heavy_modules": heavy}
+    print(f"  {'startup_import':<18} {row['wall_s']:>9.3f}s  {row['peak_rss_mb']:>8.1f} MB  "
+          f"heavy modules loaded: {', '.join(heavy) or 'none'}", flush=True)
+    return row
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args(argv)
+    row = measure_startup(args.repeats)
+    return 1 if row["heavy_modules"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
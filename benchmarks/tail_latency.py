@@ -0,0 +1,197 @@
+"""
+Interview completion times on the offline stub with injected slow outliers and failures, with and without hedging.
+
+    python -m benchmarks.tail_latency
+    python -m benchmarks.tail_latency --interviews 40 --tail-rate 0.05 --tail-latency 3 --failure-rate 0.02 --check
+
+Each interview is a serial chain of LLM calls, so one outlier stalls the whole interview. The same interviews run
+twice: first with hedging off (this also gives the latency trackers their samples), then with it on. Injected
+failures exercise the retries in both runs. Both runs draw outliers and failures from the same --seed, so they see
+the same faults and a run can be repeated.
+
+--check first runs deterministic checks of the resilience layer against seeded stub models that are always slow:
+timeouts and the number of retries, which errors are retryable, backoff bounds, which answer wins a hedge, and that
+abandoned requests keep their limiter slot until they finish and are still charged for their tokens. It then exits
+non-zero unless hedging lowered p99 completion time. It also fails if no interview in the unhedged
+run was stalled by an outlier, since then there was nothing for hedging to cut. p99 over fewer than 100 interviews
+is the slowest one, so a run needs enough calls to inject a few outliers: keep interviews x turns x 2 calls x
+--tail-rate at 5 or more (the defaults give about 6); 10 interviews of 5 turns at 2% often inject none.
+"""
+import os
+import sys
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from timeit import default_timer as timer
+
+
+def percentile(values: list[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+def run_interviews(count: int, turns: int, concurrency: int) -> dict:
+    from utils.interview_utils import simulate_interview, get_researcher_persona
+    from utils.llm_providers import get_chat_model
+    from utils.telemetry import get_recent_spans
+
+    # Fresh stub models restart the seeded fault draws, so every run sees the same outliers and failures
+    get_chat_model.cache_clear()
+    name, desc = get_researcher_persona()
+    spans_before = len(get_recent_spans())
+
+    def interview(i):
+        start = timer()
+        simulate_interview(name, desc, f"Persona {i}", f"Benchmark persona number {i}", "a budgeting app",
+                           "offline", turns=turns)
+        return timer() - start
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        durations = list(executor.map(interview, range(count)))
+    calls = [s for s in get_recent_spans()[spans_before:] if s["name"] == "llm.call"]
+    return {
+        "p50_s": percentile(durations, 0.5),
+        "p95_s": percentile(durations, 0.95),
+        "p99_s": percentile(durations, 0.99),
+        "max_s": max(durations),
+        "llm_calls": len(calls),
+        "hedged": sum(1 for s in calls if s["attributes"].get("hedged")),
+        "retries": sum(s["attributes"].get("retries") or 0 for s in calls),
+    }
+
+def check_resilience(seed: int) -> list[str]:
+    """Deterministic checks of utils/resilience.py and invoke_chat; returns a message per failed check."""
+    import time
+    from concurrent.futures import TimeoutError as FuturesTimeoutError
+    from utils.app_config import LLM_CALL_POLICIES, LLM_RETRY_BACKOFF
+    from utils.concurrency import get_limiter
+    from utils.interview_utils import invoke_chat
+    from utils.offline_llm import StubChatModel, StubOverloadedError
+    from utils.resilience import is_retryable, backoff_delay, call_with_deadline, LatencyTracker
+    from utils.telemetry import get_recent_spans, telemetry_context
+    from utils.token_budget import get_spent
+
+    failures = []
+    messages = [("human", "Tell me about your week.")]
+
+    class BadRequest(Exception):
+        status_code = 400
+
+    for error, expected in ((FuturesTimeoutError(), True), (StubOverloadedError(), True), (ConnectionError(), True),
+                            (BadRequest(), False), (ValueError(), False)):
+        if is_retryable(error) != expected:
+            failures.append(f"is_retryable({type(error).__name__}) should be {expected}")
+
+    for attempt in range(8):
+        cap = min(LLM_RETRY_BACKOFF["max"], LLM_RETRY_BACKOFF["base"] * 2 ** attempt)
+        if not all(0 <= backoff_delay(attempt) <= cap for _ in range(200)):
+            failures.append(f"backoff_delay({attempt}) went outside [0, {cap:g}]")
+
+    # Every call takes 1s against a 0.1s timeout: the first try and both retries time out
+    slow = StubChatModel("slow", tail_latency=1.0, tail_rate=1.0, seed=seed)
+    LLM_CALL_POLICIES["benchmark_timeout"] = {"timeout": 0.1, "retries": 2, "hedge": False}
+    limiter = get_limiter("benchmark-timeout")
+    spans_before = len(get_recent_spans())
+    start = timer()
+    try:
+        with telemetry_context(project_uuid="benchmark-timeout"):
+            invoke_chat(slow, messages, provider="benchmark-timeout", task="benchmark_timeout")
+        failures.append("invoke_chat against a slow model did not time out")
+    except FuturesTimeoutError:
+        pass
+    elapsed = timer() - start
+    calls = [s for s in get_recent_spans()[spans_before:] if s["name"] == "llm.call"]
+    if not calls or calls[-1]["attributes"].get("retries") != 2:
+        failures.append(f"expected 2 retries, got {calls[-1]['attributes'].get('retries') if calls else None}")
+    if elapsed >= 1.0:
+        failures.append(f"three 0.1s attempts took {elapsed:.2f}s; the timeout didn't cut them off")
+    if limiter.stats()["in_flight"] != 3:
+        failures.append(f"abandoned requests should still hold 3 limiter slots, not {limiter.stats()['in_flight']}")
+    time.sleep(1.5)
+    if limiter.stats()["in_flight"] != 0:
+        failures.append(f"{limiter.stats()['in_flight']} limiter slots still held after the abandoned requests finished")
+    one_call = StubChatModel("slow").invoke(messages).usage_metadata["total_tokens"]
+    if get_spent("project", "benchmark-timeout") != 3 * one_call:
+        failures.append(f"abandoned requests charged {get_spent('project', 'benchmark-timeout')} tokens, "
+                        f"expected {3 * one_call}")
+
+    # The first request stalls, the hedge sent after 0.05s answers at once and wins; the loser keeps its slot
+    fast = StubChatModel("fast", seed=seed)
+    models = iter([slow, fast])
+
+    def answer():
+        chat = next(models)
+        return chat.model_name, chat.invoke(messages)
+
+    limiter = get_limiter("benchmark-hedge")
+    limiter.acquire()
+    abandoned = []
+    (winner, _), hedged = call_with_deadline(answer, 2.0, LatencyTracker(), hedge_after=0.05, limiter=limiter,
+                                             on_abandoned=abandoned.append)
+    if not hedged or winner != "fast":
+        failures.append(f"the hedge should have won, got hedged={hedged} winner={winner}")
+    if limiter.stats()["in_flight"] != 1 or len(abandoned) != 0:
+        failures.append("the losing request should hold its slot until it finishes")
+    time.sleep(1.5)
+    if limiter.stats()["in_flight"] != 0 or len(abandoned) != 1:
+        failures.append("the losing request didn't release its slot or wasn't handed to on_abandoned")
+    return failures
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--interviews", type=int, default=30)
+    parser.add_argument("--turns", type=int, default=5)
+    parser.add_argument("--concurrency", type=int, default=2, help="interviews run at the same time")
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds a normal stub call takes")
+    parser.add_argument("--tail-latency", type=float, default=2.0, help="seconds a slow outlier takes")
+    parser.add_argument("--tail-rate", type=float, default=0.02, help="share of calls that are slow outliers")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="share of calls that fail with a 503")
+    parser.add_argument("--seed", type=int, default=0, help="seed for which calls are slow or fail")
+    parser.add_argument("--hedge-min-delay", type=float, default=0.1,
+                        help="floor on the hedge delay; the app's default is tuned for real providers")
+    parser.add_argument("--check", action="store_true", help="fail unless hedging lowered p99 completion time")
+    args = parser.parse_args(argv)
+
+    # Must be set before utils.app_config is imported
+    os.environ["UXR_LLM_MODE"] = "stub"
+    os.environ["UXR_TELEMETRY_FILE"] = ""  # spans stay in memory, where the hedge and retry counts are read
+    os.environ["UXR_STUB_LATENCY"] = str(args.latency)
+    os.environ["UXR_STUB_TAIL_LATENCY"] = str(args.tail_latency)
+    os.environ["UXR_STUB_TAIL_RATE"] = str(args.tail_rate)
+    os.environ["UXR_STUB_FAILURE_RATE"] = str(args.failure_rate)
+    os.environ["UXR_STUB_SEED"] = str(args.seed)
+    from utils.app_config import LLM_HEDGING, LLM_RETRY_BACKOFF
+    LLM_HEDGING["min_delay"] = args.hedge_min_delay
+    # Retry waits sized for real rate limits would swamp the stub's latencies
+    LLM_RETRY_BACKOFF.update(base=args.latency, max=args.latency * 10)
+
+    if args.check:
+        failures = check_resilience(args.seed)
+        for failure in failures:
+            print(f"  FAIL {failure}")
+        print(f"Resilience checks: {'failed' if failures else 'passed'}", flush=True)
+        if failures:
+            return 1
+
+    print(f"{args.interviews} interviews of {args.turns} turns, {args.concurrency} at a time; "
+          f"{args.tail_rate:.0%} of calls take {args.tail_latency}s, {args.failure_rate:.0%} fail", flush=True)
+    results = {}
+    for label, hedging in (("no hedging", False), ("hedging", True)):
+        LLM_HEDGING["enabled"] = hedging
+        results[label] = row = run_interviews(args.interviews, args.turns, args.concurrency)
+        print(f"  {label:<11} p50 {row['p50_s']:6.2f}s  p95 {row['p95_s']:6.2f}s  p99 {row['p99_s']:6.2f}s  "
+              f"max {row['max_s']:6.2f}s  {row['llm_calls']} calls, {row['hedged']} hedged, {row['retries']} retries",
+              flush=True)
+
+    if not args.check:
+        return 0
+    if results["no hedging"]["max_s"] < args.tail_latency:
+        print("No interview was stalled by an outlier; run more interviews or raise --tail-rate")
+        return 1
+    if results["hedging"]["p99_s"] >= results["no hedging"]["p99_s"]:
+        print("Hedging did not lower p99 completion time")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,3 +1,5 @@
+import os
+
 MAX_PROJECTS = 5
 REPORT_SECTIONS = [
     'executive_summary',
@@ -7,4 +9,48 @@ REPORT_SECTIONS = [
     'detailed_analysis',
     'recommendations',
     'appendix'
-]
\ No newline at end of file
+]
+
+# --- Personas ---
+PERSONAS_PER_ARCHETYPE = 1  # default for Generate Personas; more gives a wider spread within each archetype
+
+# --- Interviews ---
+INTERVIEW_TURNS = int(os.environ.get("UXR_INTERVIEW_TURNS", 5))  # turn budget per interview
+# End an interview early once the persona's replies stop adding new content (utils/novelty.py)
+INTERVIEW_SATURATION = {
+    'enabled': os.environ.get("UXR_INTERVIEW_SATURATION", "0") == "1",
+    'novelty_threshold': 0.15,  # a reply this close (1 - cosine similarity) to an earlier one counts as a repeat
+    'min_turns': 3,
+    'patience': 1,  # repeats in a row before stopping
+}
+# "Run All Remaining Interviews" skips personas at least this similar to one already interviewed or queued; 0 is off
+PERSONA_DEDUP_THRESHOLD = float(os.environ.get("UXR_PERSONA_DEDUP_THRESHOLD", 0))
+# Times a failed interview is retried from its last checkpointed turn before it's reported as failed
+INTERVIEW_RESUME_ATTEMPTS = int(os.environ.get("UXR_INTERVIEW_RESUME_ATTEMPTS", 2))
+INTERVIEW_MAX_WORKERS = 16  # ceiling only; the adaptive limiter in utils/concurrency.py decides how many LLM calls run
+PROGRESS_REFRESH_SECONDS = 2  # how often the live progress panel polls while work is running
+# Preload spaCy and the sentence-transformer on a background thread once the first page has rendered
+MODEL_WARMUP = os.environ.get("UXR_MODEL_WARMUP", "1") == "1"
+# Worker processes for Analyze (clustering and theme summaries); 0 runs analyses on a thread in the app process
+ANALYSIS_WORKERS = int(os.environ.get("UXR_ANALYSIS_WORKERS", 2))
+
+# --- Database ---
+# Any SQLAlchemy URL works; pool settings only apply to server databases.
+DATABASE_URL = os.environ.get("UXR_DATABASE_URL", "sqlite:///./uxr_app.db")
+DB_POOL_SIZE = int(os.environ.get("UXR_DB_POOL_SIZE", 5))
+DB_MAX_OVERFLOW = int(os.environ.get("UXR_DB_MAX_OVERFLOW", 10))
+DB_POOL_TIMEOUT = int(os.environ.get("UXR_DB_POOL_TIMEOUT", 30))
+DB_POOL_RECYCLE = int(os.environ.get("UXR_DB_POOL_RECYCLE", 1800))
+SQLITE_TIMEOUT = float(os.environ.get("UXR_SQLITE_TIMEOUT", 30))
+SQLITE_PRAGMAS = {
+    'foreign_keys': 'ON',  # enforce ON DELETE CASCADE
+    'journal_mode': 'WAL',  # readers don't block behind the writer
+    'synchronous': 'NORMAL',  # safe with WAL and avoids an fsync per commit
+    'busy_timeout': int(SQLITE_TIMEOUT * 1000),
+    'cache_size': -16000,  # 16MB page cache per connection
+    'temp_store': 'MEMORY',
+}
+# Route writes through a single background writer that group-commits them.
+DB_WRITER_ENABLED = os.environ.get("UXR_DB_WRITER", "1") == "1"
+DB_WRITER_BATCH_SIZE = int(os.environ.get("UXR_DB_WRITER_BATCH_SIZE", 50))
+DB_WRITER_MAX_DELAY = float(os.environ.get("UXR_DB_WRITER_MAX_DELAY", 0.05))
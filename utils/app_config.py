@@ -1,3 +1,5 @@
+import os
+
 CONFIG = {
     "route": "http://localhost:11434",
     "api_key": "null",
@@ -6,4 +8,101 @@ CONFIG = {
     "llama3.1": "llama3.1",
     "qwen2.5": "qwen2.5",
     "gemma2:9b": "gemma2",
-}
\ No newline at end of file
+}
+# Adaptive concurrency for LLM calls, see utils/concurrency.py
+LLM_CONCURRENCY = {
+    "initial": 3,
+    "min_limit": 1,
+    "max_limit": 16,
+    "latency_target": 60.0,  # seconds; slower calls count as congestion
+    "backoff": 0.5,
+}
+
+# LLM providers, see utils/llm_providers.py. Unless `type` says otherwise they are OpenAI-compatible endpoints.
+# `api_key` fixes the key (local servers ignore it); `api_key_env` reads it from the environment;
+# otherwise the api_key from secrets.toml is used.
+LLM_PROVIDERS = {
+    "together": {"base_url": "https://api.together.xyz/v1/"},
+    "openai": {"base_url": "https://api.openai.com/v1", "api_key_env": "OPENAI_API_KEY"},
+    "ollama": {"base_url": f"{CONFIG['route']}/v1", "api_key": "ollama"},
+    "vllm": {"base_url": "http://localhost:8000/v1", "api_key": "EMPTY"},
+    # Offline backends, see utils/offline_llm.py
+    "stub": {"type": "stub", "latency": float(os.environ.get("UXR_STUB_LATENCY", "0")),
+             # Slow outliers and failures for tail-latency tests: UXR_STUB_TAIL_RATE of calls take UXR_STUB_TAIL_LATENCY
+             "tail_latency": float(os.environ.get("UXR_STUB_TAIL_LATENCY", "0")),
+             "tail_rate": float(os.environ.get("UXR_STUB_TAIL_RATE", "0")),
+             "failure_rate": float(os.environ.get("UXR_STUB_FAILURE_RATE", "0")),
+             # Seeds those draws so a run can be repeated exactly; unset draws differently every time
+             "seed": int(os.environ["UXR_STUB_SEED"]) if os.environ.get("UXR_STUB_SEED") else None},
+    "record": {"type": "record", "cassette": os.environ.get("UXR_LLM_CASSETTE", "cassettes/llm.jsonl"),
+               "upstream": "together"},
+    "replay": {"type": "replay", "cassette": os.environ.get("UXR_LLM_CASSETTE", "cassettes/llm.jsonl"),
+               "latency_scale": float(os.environ.get("UXR_REPLAY_LATENCY_SCALE", "1.0")), "on_miss": "stub"},
+}
+DEFAULT_PROVIDER = "together"
+# Set UXR_LLM_MODE to stub, record or replay to send every task to that backend regardless of MODEL_ROUTES
+LLM_MODE = os.environ.get("UXR_LLM_MODE") or None
+SMALL_MODEL = "meta-llama/Llama-3.2-3B-Instruct-Turbo"
+
+# Which provider and model each task runs on. A missing or None model means the model_name
+# from secrets.toml; tasks not listed use "default".
+MODEL_ROUTES = {
+    "default": {"provider": DEFAULT_PROVIDER, "model": None},
+    "persona_archetypes": {"provider": DEFAULT_PROVIDER, "model": None},
+    "persona": {"provider": DEFAULT_PROVIDER, "model": None},
+    "interview": {"provider": DEFAULT_PROVIDER, "model": None},
+    "cluster_summary": {"provider": DEFAULT_PROVIDER, "model": None},
+    "key_findings": {"provider": DEFAULT_PROVIDER, "model": None},
+    "recommendations": {"provider": DEFAULT_PROVIDER, "model": None},
+    "executive_summary": {"provider": DEFAULT_PROVIDER, "model": None},
+    # Short, low-stakes outputs go to a small fast model
+    "project_name": {"provider": DEFAULT_PROVIDER, "model": SMALL_MODEL},
+    "keep_theme": {"provider": DEFAULT_PROVIDER, "model": SMALL_MODEL, "temperature": 0.0},
+    "demographics": {"provider": DEFAULT_PROVIDER, "model": SMALL_MODEL},
+    "persona_rename": {"provider": DEFAULT_PROVIDER, "model": SMALL_MODEL},
+    # Every task falls back to this once its project or user is close to its token budget
+    "degraded": {"provider": DEFAULT_PROVIDER, "model": SMALL_MODEL},
+}
+
+# Timeouts, retries and hedging per task, see utils/resilience.py; tasks not listed use "default". `timeout` is
+# seconds per attempt, `retries` the extra attempts after a timeout, rate limit, 5xx or dropped connection, and
+# `hedge` sends a duplicate request once a call runs past the task's p95 latency. Hedging is left off for the long
+# persona generations, where a duplicate costs the most tokens.
+LLM_CALL_POLICIES = {
+    "default": {"timeout": 120.0, "retries": 2, "hedge": False},
+    "persona_archetypes": {"timeout": 120.0, "retries": 2, "hedge": False},
+    "persona": {"timeout": 180.0, "retries": 2, "hedge": False},
+    "interview": {"timeout": 60.0, "retries": 2, "hedge": True},
+    "cluster_summary": {"timeout": 60.0, "retries": 2, "hedge": True},
+    "key_findings": {"timeout": 120.0, "retries": 2, "hedge": True},
+    "recommendations": {"timeout": 120.0, "retries": 2, "hedge": True},
+    "executive_summary": {"timeout": 120.0, "retries": 2, "hedge": True},
+    "project_name": {"timeout": 30.0, "retries": 2, "hedge": True},
+    "keep_theme": {"timeout": 30.0, "retries": 2, "hedge": True},
+    "demographics": {"timeout": 30.0, "retries": 2, "hedge": True},
+    "persona_rename": {"timeout": 30.0, "retries": 2, "hedge": True},
+}
+LLM_HEDGING = {
+    "enabled": os.environ.get("UXR_LLM_HEDGING", "1") == "1",
+    "percentile": 0.95,  # hedge calls slower than this share of the task's recent calls
+    "min_samples": 20,  # calls of a task seen before it's hedged at all
+    "min_delay": 2.0,  # seconds; never hedge sooner than this
+}
+LLM_RETRY_BACKOFF = {"base": 1.0, "max": 30.0}  # seconds; full-jitter exponential backoff between retries
+
+# Personas requested in one LLM call when generating several per archetype; larger batches risk truncated responses
+PERSONAS_PER_CALL = 5
+
+# Span telemetry, see utils/telemetry.py. Set UXR_TELEMETRY_FILE to "" to keep spans in memory only.
+TELEMETRY_PATH = os.environ.get("UXR_TELEMETRY_FILE", "telemetry/spans.jsonl")
+TELEMETRY_BUFFER_SIZE = 5000
+
+# Token budgets (prompt + completion tokens), see utils/token_budget.py. 0 means unlimited.
+TOKEN_BUDGETS = {
+    "project": int(os.environ.get("UXR_PROJECT_TOKEN_BUDGET", "3000000")),
+    "user": int(os.environ.get("UXR_USER_TOKEN_BUDGET", "0")),
+    "guest_user": int(os.environ.get("UXR_GUEST_TOKEN_BUDGET", "1000000")),
+    "degrade_at": 0.8,  # fraction of a budget after which calls use the "degraded" route
+    # Prompt size caps per budget level; "ok" only bounds runaway prompts
+    "max_prompt_tokens": {"ok": 24000, "degraded": 6000, "exhausted": 2000},
+}
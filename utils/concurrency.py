@@ -0,0 +1,164 @@
+import logging
+import threading
+import contextvars
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
+from contextlib import contextmanager
+from timeit import default_timer as timer
+from utils.app_config import LLM_CONCURRENCY
+
+logger = logging.getLogger(__name__)
+
+
+def is_overload_error(error: Exception) -> bool:
+    """Rate limits, provider overload and timeouts: the signals to back off on."""
+    if isinstance(error, (TimeoutError, FuturesTimeoutError)):
+        return True
+    status_code = getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+    if status_code in (429, 503, 504):
+        return True
+    name = type(error).__name__
+    return "RateLimit" in name or "Timeout" in name
+
+
+class AdaptiveLimiter:
+    """
+    AIMD limit on concurrent calls to an LLM provider.
+
+    After `limit` consecutive healthy calls made while every slot was in use (roughly one round
+    trip at full load) the limit grows by one. Rate limits, timeouts, a high recent error rate or
+    latency above `latency_target` cut it by `backoff`, at most once per round: calls that were
+    already in flight when the limit was cut don't cut it again. Callers wait in acquire() while
+    `limit` calls are in flight.
+    """
+
+    def __init__(self, name: str, initial: int=3, min_limit: int=1, max_limit: int=16,
+                 latency_target: float=60.0, backoff: float=0.5, max_error_rate: float=0.2, window: int=20):
+        self.name = name
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_target = latency_target
+        self.backoff = backoff
+        self.max_error_rate = max_error_rate
+        self._limit = float(initial)
+        self._in_flight = 0
+        self._healthy_streak = 0
+        self._last_decrease = 0.0
+        self._outcomes = deque(maxlen=window)  # True for errors
+        self._latencies = deque(maxlen=window)
+        self._calls = 0
+        self._errors = 0
+        self._throttled = 0
+        self._cond = threading.Condition()
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    def acquire(self) -> None:
+        with self._cond:
+            while self._in_flight >= int(self._limit):
+                self._cond.wait()
+            self._in_flight += 1
+
+    def try_acquire(self) -> bool:
+        """Take a slot only if one is free right now, e.g. for optional work like hedged requests."""
+        with self._cond:
+            if self._in_flight >= int(self._limit):
+                return False
+            self._in_flight += 1
+            return True
+
+    def release(self, latency: float, error: Exception=None, started: float=None) -> None:
+        with self._cond:
+            saturated = self._in_flight >= int(self._limit)
+            self._in_flight -= 1
+            self._calls += 1
+            self._outcomes.append(error is not None)
+            if error is None:
+                self._latencies.append(latency)
+            else:
+                self._errors += 1
+
+            error_rate = sum(self._outcomes) / len(self._outcomes)
+            # Calls already in flight when the limit was last cut saw the old load; don't count them twice
+            fresh = started is None or started >= self._last_decrease
+            if error is not None and is_overload_error(error):
+                self._throttled += 1
+                if fresh:
+                    self._decrease(f"{type(error).__name__}")
+            elif error is not None and len(self._outcomes) >= 5 and error_rate > self.max_error_rate:
+                if fresh:
+                    self._decrease(f"error rate {error_rate:.0%}")
+            elif error is None and latency > self.latency_target:
+                if fresh:
+                    self._decrease(f"latency {latency:.1f}s")
+            elif error is None and saturated:
+                self._healthy_streak += 1
+                if self._healthy_streak >= int(self._limit) and self._limit < self.max_limit:
+                    self._limit += 1
+                    self._healthy_streak = 0
+                    logger.info(f"[{self.name}] concurrency raised to {int(self._limit)}")
+            self._cond.notify_all()
+
+    def _decrease(self, reason: str) -> None:
+        self._limit = max(self.min_limit, self._limit * self.backoff)
+        self._healthy_streak = 0
+        self._last_decrease = timer()
+        logger.warning(f"[{self.name}] concurrency cut to {int(self._limit)} ({reason})")
+
+    @contextmanager
+    def slot(self):
+        """Hold one unit of concurrency for the duration of a call, reporting how it went."""
+        self.acquire()
+        start = timer()
+        try:
+            yield
+        except Exception as e:
+            self.release(timer() - start, error=e, started=start)
+            raise
+        self.release(timer() - start, started=start)
+
+    def stats(self) -> dict:
+        with self._cond:
+            latencies = sorted(self._latencies)
+            return {
+                "name": self.name,
+                "limit": int(self._limit),
+                "max_limit": self.max_limit,
+                "in_flight": self._in_flight,
+                "calls": self._calls,
+                "errors": self._errors,
+                "throttled": self._throttled,
+                "p50_latency": latencies[len(latencies) // 2] if latencies else None,
+            }
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+def get_limiter(name: str) -> AdaptiveLimiter:
+    """The process-wide limiter for provider `name`, shared by interviews, cluster summaries and reports."""
+    with _limiters_lock:
+        if name not in _limiters:
+            _limiters[name] = AdaptiveLimiter(name, **LLM_CONCURRENCY)
+        return _limiters[name]
+
+def get_limiter_stats() -> list[dict]:
+    with _limiters_lock:
+        limiters = list(_limiters.values())
+    return [limiter.stats() for limiter in limiters]
+
+def map_concurrently(fn, items, limiter: AdaptiveLimiter=None) -> list:
+    """
+    `[fn(item) for item in items]` on threads. Enough threads are started to reach the limiter's
+    ceiling; the limiter gating each LLM call inside `fn` decides how many actually run. Each call
+    runs in a copy of the caller's context, so telemetry spans nest under the caller's.
+    """
+    items = list(items)
+    if len(items) <= 1:
+        return [fn(item) for item in items]
+    max_workers = limiter.max_limit if limiter else LLM_CONCURRENCY["max_limit"]
+    with ThreadPoolExecutor(max_workers=min(len(items), max_workers)) as executor:
+        contexts = [contextvars.copy_context() for _ in items]
+        return list(executor.map(lambda context, item: context.run(fn, item), contexts, items))
@@ -1,18 +1,18 @@
-import spacy
-from langchain_together import TogetherEmbeddings
+# spaCy, sentence-transformers, scikit-learn, joblib, numpy and langchain_together are imported where they're
+# first used, so pages that never analyze interviews don't pay for loading them
 from utils.app_config import CONFIG
-from sklearn.cluster import DBSCAN, OPTICS
-from sklearn.preprocessing import normalize
-from joblib import Parallel, delayed
 from collections import defaultdict
-from utils.convo_utils import compute_silhoutte_score_for_cluster, run_kmeans
-from utils.interview_utils import get_chat_model
-from sentence_transformers import SentenceTransformer
-import numpy as np
+from utils.interview_utils import invoke_chat
+from utils.llm_providers import get_task_model
+from utils.telemetry import span
+from utils.concurrency import map_concurrently
+import math
 import logging
+import threading
 import asyncio
-from typing import List
+from typing import Iterable, List
 import os
+from functools import lru_cache
 
 # Set up logging with script name, line number, and timestamp
 logging.basicConfig(
@@ -22,24 +22,71 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
-def call_llm(prompt: str, api_key: str, model_name: str) -> str:
-    llm = get_chat_model(api_key, model_name)
-    response = llm.invoke(prompt).content
+def call_llm(prompt: str, api_key: str, model_name: str, task: str="default") -> str:
+    """`task` picks the provider and model from MODEL_ROUTES; `model_name` fills routes that don't name one."""
+    llm, provider = get_task_model(task, api_key, model_name)
+    response = invoke_chat(llm, prompt, provider, task=task).content
     return response
 
 def cluster_sentences(single_transcript: list[dict], api_key: str, use_local: bool=False) -> dict:
-    sentences = extract_sentences(single_transcript)
-    embeddings = EmbedSentences(api_key, use_local).run(sentences)
-    clusters = ClusterSentences(sentences, embeddings).run()
+    return cluster_user_responses((turn["user"] for turn in single_transcript), api_key, use_local)
+
+def cluster_user_responses(user_responses: Iterable[str], api_key: str, use_local: bool=False) -> dict:
+    with span("analysis.extract_sentences") as stage:
+        sentences = extract_user_sentences(user_responses)
+        stage.set(sentences=len(sentences))
+    with span("analysis.embed", local=use_local, sentences=len(sentences)):
+        embeddings = EmbedSentences(api_key, use_local).run(sentences)
+    with span("analysis.cluster", sentences=len(sentences)) as stage:
+        clusters = ClusterSentences(sentences, embeddings).run()
+        stage.set(clusters=len(clusters))
     return clusters
 
+@lru_cache(maxsize=None)
+def load_spacy_model(name: str="en_core_web_sm"):
+    """Load a spaCy pipeline once per process."""
+    import spacy
+    return spacy.load(name)
+
+@lru_cache(maxsize=None)
+def load_sentence_transformer(name: str='sentence-transformers/all-MiniLM-L6-v2'):
+    """Load a SentenceTransformer once per process."""
+    from sentence_transformers import SentenceTransformer
+    import torch
+    torch.classes.__path__ = []  # keeps Streamlit's file watcher from tripping over torch.classes
+    return SentenceTransformer(name)
+
+def warm_up_models() -> None:
+    """Load the analysis models now rather than on the first Analyze click."""
+    with span("warmup.models"):
+        load_spacy_model()
+        load_sentence_transformer()
+        import utils.convo_utils  # scikit-learn
+
+_warmup_thread = None
+_warmup_lock = threading.Lock()
+
+def start_model_warmup() -> threading.Thread:
+    """Run warm_up_models() once per process on a daemon thread; later calls return the same thread."""
+    global _warmup_thread
+    with _warmup_lock:
+        if _warmup_thread is None:
+            def warm_up():
+                try:
+                    warm_up_models()
+                except Exception as e:
+                    logger.warning(f"Model warm-up failed, models will load on first use: {e}")
+            _warmup_thread = threading.Thread(target=warm_up, name="uxr-model-warmup", daemon=True)
+            _warmup_thread.start()
+        return _warmup_thread
+
 class ExtractSentences:
     """
     Class to extract sentences from a given text.
     """
 
     def __init__(self):
-        self.nlp = spacy.load("en_core_web_sm")
+        self.nlp = load_spacy_model()
 
     def run(self, transcript: str, limit_char: int=10000) -> list[str]:
         if len(transcript) < limit_char:
@@ -55,10 +102,12 @@ class ExtractSentences:
 
 
 def extract_sentences(single_transcript: list[dict]) -> list[str]:
+    return extract_user_sentences(back_and_forth["user"] for back_and_forth in single_transcript)
+
+def extract_user_sentences(user_responses: Iterable[str]) -> list[str]:
     extractor = ExtractSentences()
     extracted_sentences = []
-    for i,back_and_forth in enumerate(single_transcript):
-        user_response = back_and_forth["user"]
+    for user_response in user_responses:
         user_sentences = extractor.run(user_response)
         extracted_sentences.extend(user_sentences)
     return extracted_sentences
@@ -72,12 +121,13 @@ class EmbedSentences:
     def __init__(self, api_key: str, use_local: bool=False):
         self._use_local = use_local
         if not use_local:
+            from langchain_together import TogetherEmbeddings
             self.model = TogetherEmbeddings(
                 model="togethercomputer/m2-bert-80M-32k-retrieval",
                 api_key=api_key,
             )
         else:
-            self.model = SentenceTransformer('sentence-transformers/all-MiniLM-L6-v2')
+            self.model = load_sentence_transformer()
 
     async def aembed(self, sentences: list[str]) -> list:
         """Async method to embed sentences with batching support."""
@@ -118,6 +168,8 @@ class ClusterSentences:
         self._optimize = optimize
     
     def normalize_embeddings(self, embeddings: list) -> None:
+        import numpy as np
+        from sklearn.preprocessing import normalize
         if len(embeddings) > 0:
             self._embeddings = normalize(np.array(embeddings), axis=1, norm='l2')  # normalize to make cosine similarity and euclidean distance directly similar
         else:
@@ -130,9 +182,9 @@ class ClusterSentences:
     
     def run(self) -> dict:
         if not self._optimize:
-            cluster_assignments = self.run_kmeans(num_clusters=int(np.sqrt(len(self._sentences))))
+            cluster_assignments = self.run_kmeans(num_clusters=int(math.sqrt(len(self._sentences))))
         else:
-            max_clusters = min(100, int(1.5*np.sqrt(len(self._sentences))))
+            max_clusters = min(100, int(1.5*math.sqrt(len(self._sentences))))
             logging.info(f"Optimizing clustering with max clusters {max_clusters}")
             num_clusters = self.find_optimal_cluster_number(max_clusters)
             logging.info(f"Optimized clustering with {num_clusters} clusters")
@@ -141,6 +193,7 @@ class ClusterSentences:
         return clusters
     
     def run_kmeans(self, num_clusters: int=2) -> list[int]:
+        from utils.convo_utils import run_kmeans
         return run_kmeans(num_clusters, self._sentences, self._embeddings)
 
     def find_optimal_cluster_number(self, max_clusters: int=10) -> int:
@@ -148,11 +201,13 @@ class ClusterSentences:
             return 0
         if len(self._embeddings) < 2:
             return 1
-        step_size = max(1, int(np.round((max_clusters - 2) / 16)))
+        step_size = max(1, int(round((max_clusters - 2) / 16)))
         silhouette_scores = self.get_silhouette_scores(range(2, max_clusters+1, step_size))
         return self.find_num_clusters(silhouette_scores)
     
     def get_silhouette_scores(self, cluster_range: range, n_jobs: int=4) -> dict:
+        from joblib import Parallel, delayed
+        from utils.convo_utils import compute_silhoutte_score_for_cluster
         results = Parallel(n_jobs=n_jobs)(
             delayed(compute_silhoutte_score_for_cluster)(n_clusters, self._sentences, self._embeddings)
             for n_clusters in cluster_range
@@ -175,18 +230,24 @@ class ClusterSentences:
 
 def summarize_each_cluster(clusters: dict, product_description: str,
                             user_description: str, api_key: str, model_name: str) -> dict:
-    summaries = {}
-    for cluster_id, sentences in clusters.items():
-        joined_sentences = "\n".join(sentences)
+    def summarize_cluster(cluster_id):
+        joined_sentences = "\n".join(clusters[cluster_id])
         theme, description, sample_sentences = summarize_sentences(joined_sentences, product_description,
                                       user_description, api_key, model_name)
         if keep_theme(theme, description, product_description, user_description, api_key, model_name):
-            summaries[cluster_id] = {
+            return {
                 "theme": theme,
                 "description": description,
                 "sample_sentences": sample_sentences,
             }
-    return summaries
+        return None
+
+    # Clusters are independent, so summarize them concurrently under the shared LLM limiter
+    cluster_ids = list(clusters)
+    with span("analysis.summarize_clusters", clusters=len(cluster_ids)) as stage:
+        results = map_concurrently(summarize_cluster, cluster_ids)
+        stage.set(themes_kept=sum(1 for summary in results if summary))
+    return {cluster_id: summary for cluster_id, summary in zip(cluster_ids, results) if summary}
     
 def summarize_sentences(sentences: str, product_description: str,
                         user_description: str, api_key: str, model_name: str) -> str:
@@ -214,7 +275,7 @@ def summarize_sentences(sentences: str, product_description: str,
     ...
     </sample_sentences>
     """
-    output = call_llm(prompt, api_key, model_name)
+    output = call_llm(prompt, api_key, model_name, task="cluster_summary")
     theme = output.split("<theme>")[1].split("</theme>")[0].strip()
     description = output.split("<description>")[1].split("</description>")[0].strip()
     sample_sentences = output.split("<sample_sentences>")[1].split("</sample_sentences>")[0].strip()
@@ -237,6 +298,6 @@ def keep_theme(theme: str, theme_desc: str, product_description: str, user_descr
     is irrelevant. For example, 
     
     <thinking>Your reasoning here...</thinking> TRUE/FALSE """
-    output = call_llm(prompt, api_key, model_name)
+    output = call_llm(prompt, api_key, model_name, task="keep_theme")
     response = output.split("</thinking>")[1].strip()
     return "TRUE" in response.upper()
@@ -1,8 +1,17 @@
-from langchain_openai import ChatOpenAI
 import json
 import glob
+import logging
+import time
 import datetime
 from timeit import default_timer as timer
+from utils.concurrency import get_limiter
+from utils.resilience import get_call_policy, get_latency_tracker, hedge_delay, call_with_deadline, is_retryable, backoff_delay
+from utils.app_config import DEFAULT_PROVIDER
+from utils.llm_providers import get_task_model
+from utils.telemetry import span, record_llm_usage, get_context
+from utils.token_budget import budget_level, max_prompt_tokens, estimate_prompt_tokens, truncate_messages, record_usage
+
+logger = logging.getLogger(__name__)
 
 def get_general_cot_prompt() -> str:
     prompt = """Before asking or answering questions, reason through the conversation so far and think about how you 
@@ -17,12 +26,18 @@ def get_general_cot_prompt() -> str:
     return prompt
 
 def parse_response(response: str) -> str:
-    print(f"UNPARSED RESPONSE: {response}")
     if "<response>" in response:
         response = response.split("<response>")[1].split("</response>")[0].strip()
-    print(f"PARSED RESPONSE: {response}")
     return response
 
+def get_token_count(message) -> int:
+    """Total tokens reported for an LLM call, or None if the provider didn't report usage."""
+    usage = getattr(message, "usage_metadata", None)
+    if usage:
+        return usage.get("total_tokens")
+    token_usage = (getattr(message, "response_metadata", None) or {}).get("token_usage") or {}
+    return token_usage.get("total_tokens")
+
 def get_researcher_persona():
     name = "Roxy Buttons"
     desc = """You are an experienced user researcher specializing in identifying user needs
@@ -31,17 +46,68 @@ def get_researcher_persona():
     for using a product or service."""
     return name, desc
 
-def get_chat_model(api_key: str, model_name: str="meta-llama/Llama-3.3-70B-Instruct-Turbo-Free") -> ChatOpenAI:
-    return ChatOpenAI(model=model_name,
-                    base_url="https://api.together.xyz/v1/",
-                    temperature=0.7,
-                    api_key=api_key)
+def invoke_chat(chat, messages, provider: str=DEFAULT_PROVIDER, task: str=None):
+    """
+    Every LLM call goes through here so the provider's adaptive limiter sees its latency and errors, each
+    call is traced as an llm.call span, and its tokens are charged to the current project and user.
+    Prompts are capped to the size allowed at the current budget level. Each attempt is bounded by the task's
+    timeout, retryable failures are retried with backoff and slow calls may be hedged (see utils/resilience.py).
+    """
+    context = get_context()
+    model = getattr(chat, "model_name", None)
+    with span("llm.call", provider=provider, model=model, task=task) as call_span:
+        level = budget_level(context.get("project_uuid"), context.get("user_id"), context.get("guest", False))
+        prompt_cap = max_prompt_tokens(level)
+        estimated = estimate_prompt_tokens(messages)
+        if prompt_cap and estimated > prompt_cap:
+            messages = truncate_messages(messages, prompt_cap)
+            call_span.set(truncated_from=estimated)
+        call_span.set(budget_level=level, estimated_tokens=estimated)
+        policy = get_call_policy(task)
+        limiter = get_limiter(provider)
+        tracker = get_latency_tracker(provider, task)
+        # Requests that lost a hedge or outlived their timeout still spend tokens once they finish
+        charge_abandoned = lambda future: _charge_abandoned_request(future, context, task, provider, model)
+        queue_s = 0.0
+        for attempt in range(policy["retries"] + 1):
+            queued = timer()
+            # The slot is released by the request itself, which may outlive this attempt (see call_with_deadline)
+            limiter.acquire()
+            queue_s += timer() - queued
+            try:
+                message, hedged = call_with_deadline(lambda: chat.invoke(messages), policy["timeout"], tracker,
+                                                     hedge_delay(policy, tracker), limiter, on_abandoned=charge_abandoned)
+                break
+            except Exception as e:
+                if attempt == policy["retries"] or not is_retryable(e):
+                    call_span.set(queue_s=round(queue_s, 4), retries=attempt)
+                    raise
+                delay = backoff_delay(attempt)
+                logger.warning(f"LLM call for {task or 'default'} failed ({type(e).__name__}: {e}), retrying in {delay:.1f}s")
+                time.sleep(delay)
+        call_span.set(queue_s=round(queue_s, 4), retries=attempt, hedged=hedged)
+        record_llm_usage(call_span, message)
+        attributes = call_span.attributes
+        record_usage(context.get("project_uuid"), context.get("user_id"), task, provider, model,
+                     attributes.get("input_tokens") or estimated, attributes.get("output_tokens") or 0)
+        return message
+
+def _charge_abandoned_request(future, context, task, provider, model):
+    if future.exception() is not None:
+        return
+    usage = getattr(future.result(), "usage_metadata", None) or {}
+    record_usage(context.get("project_uuid"), context.get("user_id"), task, provider, model,
+                 usage.get("input_tokens") or 0, usage.get("output_tokens") or 0)
 
 def simulate_interview(uxr_persona_name: str, uxr_persona_desc: str, persona_name: str, 
                        persona_desc: str, product_desc: str, api_key: str, turns: int=5,
-                       model_name: str="meta-llama/Llama-3.3-70B-Instruct-Turbo-Free"):
-    researcher_chat = get_chat_model(api_key, model_name)
-    user_chat = get_chat_model(api_key, model_name)
+                       model_name: str=None, on_turn=None, should_stop=None, resume_from=None):
+    """
+    Up to `turns` turns; should_stop (see simulate_conversation) can end the interview sooner. resume_from is the
+    turns an interrupted run already completed: the interview carries on after them and returns all turns.
+    """
+    researcher_chat, provider = get_task_model("interview", api_key, model_name)
+    user_chat = researcher_chat
 
     # Define the user researcher persona
     user_researcher_persona =f"""Your are the following persona:
@@ -77,31 +143,57 @@ You are interviewing someone right now."""
     ]
 
     # Simulate the conversation
-    conversation_history = simulate_conversation(researcher_chat, user_chat, conv_ux_perspective, conv_user_perspective, turns=5)
+    conversation_history = simulate_conversation(researcher_chat, user_chat, conv_ux_perspective, conv_user_perspective, turns=turns,
+                                                 on_turn=on_turn, provider=provider, should_stop=should_stop,
+                                                 history=resume_from)
     return conversation_history
 
 # Function to simulate the conversation between the two personas
-def simulate_conversation(researcher_chat, user_chat, conv_ux_perspective, conv_user_perspective, turns=5):
-    conversation_history = []
-    for _ in range(turns):
+def simulate_conversation(researcher_chat, user_chat, conv_ux_perspective, conv_user_perspective, turns=5, on_turn=None,
+                          provider: str=DEFAULT_PROVIDER, should_stop=None, history=None):
+    """
+    on_turn, if given, is called with (turn_index, turn) as soon as each turn completes. should_stop, if given,
+    is called the same way first and ends the conversation early by returning True. history is turns already
+    completed; both perspectives are rebuilt from them and only the remaining turns are run.
+    """
+    conversation_history = list(history or [])
+    for turn in conversation_history:
+        conv_ux_perspective.extend([("assistant", turn["researcher"]), ("human", turn["user"])])
+        conv_user_perspective.extend([("human", turn["researcher"]), ("assistant", turn["user"])])
+    for _ in range(turns - len(conversation_history)):
+        turn_start = timer()
         # Researcher asks a question
-        researcher_response = parse_response(researcher_chat.invoke(conv_ux_perspective).content)
-        print(f"Researcher: {researcher_response}\n")
+        researcher_message = invoke_chat(researcher_chat, conv_ux_perspective, provider, task="interview")
+        researcher_response = parse_response(researcher_message.content)
+        logger.debug(f"Researcher: {researcher_response}")
         conv_ux_perspective.append(("assistant", researcher_response))
 
         # add the researcher output to the user conversation perspective
         conv_user_perspective.append(("human", researcher_response))
         
         # User responds to the question
-        user_response = parse_response(user_chat.invoke(conv_user_perspective).content)
-        print(f"User: {user_response}\n")
+        user_message = invoke_chat(user_chat, conv_user_perspective, provider, task="interview")
+        user_response = parse_response(user_message.content)
+        logger.debug(f"User: {user_response}")
         conv_user_perspective.append(("assistant", user_response))
 
         # add the user output to the researcher conversation perspective
         conv_ux_perspective.append(("human", user_response))
 
-        # Add the conversation history for both personas
-        this_turn = {"researcher": researcher_response, "user": user_response}
+        # Add the conversation history for both personas, with per-turn usage for interview_turns
+        this_turn = {
+            "researcher": researcher_response,
+            "user": user_response,
+            "researcher_tokens": get_token_count(researcher_message),
+            "user_tokens": get_token_count(user_message),
+            "latency": timer() - turn_start,
+        }
         conversation_history.append(this_turn)
+        stop = should_stop(len(conversation_history) - 1, this_turn) if should_stop else False
+        if on_turn:
+            on_turn(len(conversation_history) - 1, this_turn)
+        if stop:
+            logger.info(f"Stopping interview after {len(conversation_history)} of {turns} turns, replies stopped adding new content")
+            break
     
     return conversation_history
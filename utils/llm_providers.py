@@ -0,0 +1,66 @@
+import os
+import logging
+from functools import lru_cache
+from utils.app_config import CONFIG, LLM_PROVIDERS, MODEL_ROUTES, DEFAULT_PROVIDER, LLM_MODE, LLM_CALL_POLICIES
+from utils.offline_llm import stub_chat_model, recording_chat_model, replay_chat_model
+from utils.telemetry import get_context
+from utils.token_budget import budget_level
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL = "meta-llama/Llama-3.3-70B-Instruct-Turbo-Free"
+
+
+def openai_compatible(model_name: str, api_key: str, temperature: float, base_url: str, **_):
+    from langchain_openai import ChatOpenAI  # imported on first use; it's slow to load
+    # invoke_chat retries and times out each call per task; the client timeout only ends requests it abandoned
+    return ChatOpenAI(model=model_name, base_url=base_url, temperature=temperature, api_key=api_key, max_retries=0,
+                      timeout=max(policy["timeout"] for policy in LLM_CALL_POLICIES.values()))
+
+# Provider type -> factory(model_name, api_key, temperature, **provider_config) returning a chat model
+PROVIDER_TYPES = {
+    "openai_compatible": openai_compatible,
+    "stub": stub_chat_model,
+    "record": recording_chat_model,
+    "replay": replay_chat_model,
+}
+# Provider name -> factory
+_factories = {name: PROVIDER_TYPES[config.get("type", "openai_compatible")] for name, config in LLM_PROVIDERS.items()}
+
+def register_provider(name: str, factory, **provider_config) -> None:
+    """Add or replace a provider. `provider_config` is passed to the factory on every call."""
+    LLM_PROVIDERS[name] = provider_config
+    _factories[name] = factory
+    get_chat_model.cache_clear()
+
+def resolve_route(task: str, model_name: str=None) -> tuple[str, str, float]:
+    """(provider, model, temperature) for `task`. `model_name` fills in routes without a model."""
+    route = MODEL_ROUTES.get(task) or MODEL_ROUTES["default"]
+    provider = LLM_MODE or route.get("provider", DEFAULT_PROVIDER)
+    model = route.get("model") or model_name or DEFAULT_MODEL
+    return provider, model, route.get("temperature", CONFIG["llm_temp"])
+
+@lru_cache(maxsize=32)
+def get_chat_model(api_key: str, model_name: str=DEFAULT_MODEL, provider: str=DEFAULT_PROVIDER,
+                   temperature: float=CONFIG["llm_temp"]):
+    # Clients are stateless between calls, so one per (key, model, provider) lets every caller share its connection pool
+    if provider not in _factories:
+        raise ValueError(f"Unknown LLM provider '{provider}', expected one of {sorted(_factories)}")
+    provider_config = dict(LLM_PROVIDERS[provider])
+    provider_config.pop("type", None)
+    fixed_key, key_env = provider_config.pop("api_key", None), provider_config.pop("api_key_env", None)
+    api_key = fixed_key or (key_env and os.environ.get(key_env)) or api_key
+    return _factories[provider](model_name, api_key=api_key, temperature=temperature, **provider_config)
+
+def get_task_model(task: str, api_key: str, model_name: str=None):
+    """
+    The chat model routed for `task`, and its provider name (which also names its concurrency limiter).
+    Projects and users close to their token budget get the "degraded" route instead.
+    """
+    context = get_context()
+    level = budget_level(context.get("project_uuid"), context.get("user_id"), context.get("guest", False))
+    if level != "ok":
+        logger.info(f"Token budget {level} for {context.get('project_uuid') or context.get('user_id')}, routing {task} to the degraded model")
+        task = "degraded"
+    provider, model, temperature = resolve_route(task, model_name)
+    return get_chat_model(api_key, model, provider, temperature), provider
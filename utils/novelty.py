@@ -0,0 +1,82 @@
+"""
+How much new content an interview reply or a persona adds, measured as 1 - its highest cosine similarity to what
+came before. Embeddings come from the local sentence-transformer used for analysis.
+"""
+import math
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def embed_texts(texts: list[str]) -> list[list[float]]:
+    from utils.convo_analysis import EmbedSentences
+    return EmbedSentences(None, use_local=True).run(texts)
+
+def cosine_similarity(a, b) -> float:
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norm if norm else 0.0
+
+def novelty(embedding, previous) -> float:
+    """1.0 for something unlike anything in `previous`, 0.0 for a repeat."""
+    if not previous:
+        return 1.0
+    return 1.0 - max(cosine_similarity(embedding, other) for other in previous)
+
+
+class SaturationDetector:
+    """
+    should_stop callback for simulate_conversation. Scores each user reply against the earlier ones and says
+    stop once `patience` replies in a row fall below `novelty_threshold`, but never before `min_turns` turns.
+    If the embedding model can't be loaded the interview simply runs its full turn budget.
+    """
+
+    def __init__(self, novelty_threshold: float=0.15, min_turns: int=3, patience: int=1, embed=None):
+        self.novelty_threshold = novelty_threshold
+        self.min_turns = min_turns
+        self.patience = patience
+        self._embed = embed or embed_texts
+        self._seen = []
+        self._stale = 0
+        self._disabled = False
+
+    def __call__(self, turn_index: int, turn: dict) -> bool:
+        if self._disabled:
+            return False
+        try:
+            embedding = self._embed([turn["user"]])[0]
+        except Exception as e:
+            logger.warning(f"Saturation detection off for this interview, could not embed replies: {e}")
+            self._disabled = True
+            return False
+        score = novelty(embedding, self._seen)
+        turn["novelty"] = round(score, 3)
+        self._seen.append(embedding)
+        self._stale = self._stale + 1 if score < self.novelty_threshold else 0
+        return turn_index + 1 >= self.min_turns and self._stale >= self.patience
+
+    def replay(self, turns: list[dict]) -> bool:
+        """Score turns completed before a resume, in order; True if the interview would already have stopped."""
+        stopped = False
+        for turn_index, turn in enumerate(turns):
+            stopped = self(turn_index, turn) or stopped
+        return stopped
+
+
+def near_duplicates(texts: list[str], reference_texts: list[str], threshold: float, embed=None) -> dict:
+    """
+    {index in `texts`: index of its match} for texts at least `threshold` similar to a reference text or to an
+    earlier text that was kept. Matches index into reference_texts + texts.
+    """
+    embeddings = (embed or embed_texts)(list(reference_texts) + list(texts))
+    kept = list(range(len(reference_texts)))
+    duplicates = {}
+    for i in range(len(texts)):
+        position = len(reference_texts) + i
+        similarities = [(cosine_similarity(embeddings[position], embeddings[other]), other) for other in kept]
+        best, match = max(similarities, default=(0.0, None))
+        if best >= threshold:
+            duplicates[i] = match
+        else:
+            kept.append(position)
+    return duplicates
@@ -0,0 +1,289 @@
+"""
+Offline chat models with the same invoke() interface as ChatOpenAI, for running, benchmarking and load
+testing the pipeline without network or cost.
+
+- stub: deterministic responses in the tagged formats the parsers expect, derived from a hash of the prompt
+- record: forwards calls to a real provider and appends each exchange to a cassette (JSON lines)
+- replay: serves responses from a cassette, sleeping for the recorded (or a fixed) latency
+"""
+import os
+import re
+import json
+import time
+import random
+import hashlib
+import logging
+import threading
+from collections import Counter
+from timeit import default_timer as timer
+from utils.token_budget import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+FIRST_NAMES = ["Avery", "Jordan", "Priya", "Mateo", "Keiko", "Olu", "Sofia", "Liam", "Amara", "Chen",
+               "Noor", "Diego", "Hana", "Tomasz", "Zainab", "Elliot", "Ines", "Kwame", "Yara", "Felix"]
+LAST_NAMES = ["Rivera", "Okafor", "Nakamura", "Schmidt", "Patel", "Haddad", "Johansson", "Mbeki",
+              "Costa", "Novak", "Kim", "Dubois", "Moreno", "Larsen", "Adeyemi", "Fischer"]
+TOPICS = {
+    "pricing": "Honestly the price is what makes me hesitate, I compare subscription costs before I commit to anything.",
+    "setup": "Getting set up took me far too long, the onboarding steps were confusing and I nearly gave up.",
+    "sync": "I need everything to sync across my phone and laptop, otherwise I end up with two versions of the truth.",
+    "notifications": "Too many notifications drive me crazy, I turn them off and then I miss the important reminders.",
+    "privacy": "I worry about where my data goes, so I read the privacy policy before I share anything personal.",
+    "speed": "If the app is slow to load I just switch back to my old spreadsheet because it is faster.",
+    "support": "When something breaks I want a real person to answer quickly, not a chatbot that loops forever.",
+    "collaboration": "Sharing with my team matters a lot, we hand work back and forth several times a day.",
+}
+STOPWORDS = {"the", "a", "an", "and", "or", "to", "of", "i", "my", "me", "it", "is", "in", "for", "that", "this",
+             "with", "we", "so", "be", "on", "if", "not", "just", "what", "before", "then", "when", "because",
+             "otherwise", "up", "too", "far", "took", "at", "are", "was", "do", "you", "they", "their"}
+
+
+def _normalize_messages(messages) -> list[tuple[str, str]]:
+    """ChatOpenAI accepts a string, (role, content) tuples or message objects; reduce them all to tuples."""
+    if isinstance(messages, str):
+        return [("human", messages)]
+    normalized = []
+    for message in messages:
+        if isinstance(message, (tuple, list)):
+            normalized.append((str(message[0]), str(message[1])))
+        else:
+            normalized.append((getattr(message, "type", "human"), str(getattr(message, "content", message))))
+    return normalized
+
+def cassette_key(model_name: str, messages) -> str:
+    payload = json.dumps([model_name, _normalize_messages(messages)], ensure_ascii=False)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class OfflineMessage:
+    """The parts of an AIMessage the pipeline reads: content and token usage."""
+
+    def __init__(self, content: str, input_tokens: int=0, output_tokens: int=0):
+        self.content = content
+        self.usage_metadata = {"input_tokens": input_tokens, "output_tokens": output_tokens,
+                               "total_tokens": input_tokens + output_tokens}
+        self.response_metadata = {}
+
+
+class StubOverloadedError(Exception):
+    """Injected provider failure, shaped like a 503 so it's retried like a real one."""
+    status_code = 503
+
+
+class StubChatModel:
+    """
+    Deterministic fake LLM. The same prompt always gets the same well-formed response.
+    For load and tail-latency tests, `tail_rate` of calls take `tail_latency` seconds instead of `latency`, and
+    `failure_rate` of calls raise StubOverloadedError. Those draws are random per call, not per prompt, so a
+    retried or hedged request can come back faster; pass `seed` to get the same sequence of draws on every run.
+    """
+
+    def __init__(self, model_name: str="stub", latency: float=0.0, tail_latency: float=0.0, tail_rate: float=0.0,
+                 failure_rate: float=0.0, seed: int=None):
+        self.model_name = model_name
+        self.latency = latency
+        self.tail_latency = tail_latency
+        self.tail_rate = tail_rate
+        self.failure_rate = failure_rate
+        self._faults = random.Random(seed)
+        self._faults_lock = threading.Lock()
+
+    def _draw(self, rate: float) -> bool:
+        if not rate:
+            return False
+        with self._faults_lock:
+            return self._faults.random() < rate
+
+    def invoke(self, messages) -> OfflineMessage:
+        normalized = _normalize_messages(messages)
+        prompt = "\n".join(content for _, content in normalized)
+        rng = random.Random(hashlib.sha256(prompt.encode()).hexdigest())
+        content = self.respond(normalized, prompt, rng)
+        # Both draws are taken up front so each call uses exactly two, however long it sleeps
+        slow, fail = self._draw(self.tail_rate), self._draw(self.failure_rate)
+        latency = self.tail_latency if slow else self.latency
+        if latency:
+            time.sleep(latency)
+        if fail:
+            raise StubOverloadedError("stub provider overloaded (injected failure)")
+        return OfflineMessage(content, estimate_tokens(prompt), estimate_tokens(content))
+
+    def respond(self, messages: list[tuple[str, str]], prompt: str, rng: random.Random) -> str:
+        system = messages[0][1] if messages[0][0] == "system" else ""
+        if "You are interviewing someone" in system:
+            return self._researcher_turn(messages, rng)
+        if "being interviewed" in system:
+            return self._user_turn(messages, rng)
+        if "<archetype-" in prompt:
+            return self._archetypes(rng)
+        if "<new_name>" in prompt:
+            return f"<new_name> {rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)} </new_name>"
+        if "<persona>" in prompt:
+            requested = re.search(r"Generate exactly (\d+)", prompt)
+            count = int(requested.group(1)) if requested else 1
+            return "\n".join(f"<persona>\n{self._persona(prompt, rng)}\n</persona>" for _ in range(count))
+        if "<delightful_moments>" in prompt:
+            return self._persona(prompt, rng)
+        if "<sample_sentences>" in prompt:
+            return self._cluster_summary(prompt, rng)
+        if "TRUE/FALSE" in prompt:
+            verdict = "FALSE" if rng.random() < 0.15 else "TRUE"
+            return f"<thinking>The theme describes a recurring user need tied to the product.</thinking> {verdict}"
+        if "Project name:" in prompt:
+            return f"Project {rng.choice(['Compass', 'Lumen', 'Harbor', 'Relay', 'Atlas', 'Beacon'])}"
+        return self._markdown(prompt, rng)
+
+    def _researcher_turn(self, messages, rng) -> str:
+        answered = sum(1 for role, _ in messages if role == "human") - 1
+        topic = rng.choice(list(TOPICS))
+        question = f"Thanks for sharing. Could you walk me through how {topic} affects your day-to-day work?" if answered \
+            else f"To start, can you tell me a little about yourself and how you handle {topic} today?"
+        return f"<thinking>I should explore {topic} with an open-ended question.</thinking>\n<response>{question}</response>"
+
+    def _user_turn(self, messages, rng) -> str:
+        topics = rng.sample(list(TOPICS), 2)
+        answer = " ".join(TOPICS[topic] for topic in topics)
+        return f"<thinking>I'll answer from my own experience.</thinking>\n<response>{answer}</response>"
+
+    def _archetypes(self, rng) -> str:
+        topics = rng.sample(list(TOPICS), rng.randint(3, 5))
+        return "\n".join(
+            f"<archetype-{i}>\nName: The {topic.title()}-Focused User\n"
+            f"Description: Someone whose choices are driven mostly by {topic}. {TOPICS[topic]}\n</archetype-{i}>"
+            for i, topic in enumerate(topics, 1)
+        )
+
+    def _persona(self, prompt: str, rng) -> str:
+        name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+        topic = rng.choice(list(TOPICS))
+        fields = {
+            "name": name, "age": str(rng.randint(22, 67)), "demographics": "Works full time, shares a household",
+            "location": rng.choice(["Toronto", "Lagos", "Osaka", "Berlin", "Austin", "Lisbon"]),
+            "motivations": f"Cares most about {topic}", "goals_needs": "Save time on routine tasks",
+            "values": "Reliability and honesty", "attitudes_beliefs": "Skeptical of new tools until proven",
+            "lifestyle": "Busy, mostly on the go", "daily_routine": "Checks tasks each morning and evening",
+            "devise_usage": "Phone first, laptop at work", "software_familiarity": "Comfortable with common apps",
+            "digital_literacy": rng.choice(["Low", "Medium", "High"]), "pain_points": TOPICS[topic],
+            "delightful_moments": "When something just works the first time",
+        }
+        return "\n".join(f"<{tag}> {value} </{tag}>" for tag, value in fields.items())
+
+    def _cluster_summary(self, prompt: str, rng) -> str:
+        sentences = prompt.split("SENTENCES:", 1)[-1].split("Provide only", 1)[0].strip().splitlines()
+        words = Counter(word for word in re.findall(r"[a-z]+", " ".join(sentences).lower())
+                        if word not in STOPWORDS and len(word) > 3)
+        keyword = words.most_common(1)[0][0] if words else "general"
+        samples = "\n".join(f"{i}. {sentence.strip()}" for i, sentence in enumerate(sentences[:3], 1))
+        return (f"<description> Users repeatedly bring up {keyword} when describing what helps or blocks them. </description>\n"
+                f"<theme> {keyword.title()} </theme>\n<sample_sentences>\n{samples}\n</sample_sentences>")
+
+    def _markdown(self, prompt: str, rng) -> str:
+        topics = rng.sample(list(TOPICS), 3)
+        return "\n\n".join(f"### {topic.title()}\n\n{TOPICS[topic]}" for topic in topics)
+
+
+class Cassette:
+    """Recorded exchanges in a JSON-lines file, keyed by model and messages. Safe to share across threads."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self._entries[entry["key"]] = entry
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> dict:
+        return self._entries.get(key)
+
+    def add(self, key: str, model_name: str, content: str, latency: float, usage: dict=None) -> None:
+        entry = {"key": key, "model": model_name, "content": content, "latency": latency, "usage": usage or {}}
+        with self._lock:
+            self._entries[key] = entry
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            with open(self.path, "a") as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+_cassettes = {}
+_cassettes_lock = threading.Lock()
+
+def get_cassette(path: str) -> Cassette:
+    with _cassettes_lock:
+        if path not in _cassettes:
+            _cassettes[path] = Cassette(path)
+        return _cassettes[path]
+
+
+class RecordingChatModel:
+    """Wraps a real chat model and appends every exchange to a cassette."""
+
+    def __init__(self, chat, model_name: str, cassette: Cassette):
+        self.chat = chat
+        self.model_name = model_name
+        self.cassette = cassette
+
+    def invoke(self, messages):
+        start = timer()
+        message = self.chat.invoke(messages)
+        self.cassette.add(cassette_key(self.model_name, messages), self.model_name, message.content,
+                          timer() - start, getattr(message, "usage_metadata", None))
+        return message
+
+
+class ReplayChatModel:
+    """
+    Serves responses from a cassette. Sleeps for `latency` seconds if given, otherwise for the recorded latency
+    times `latency_scale`. Unrecorded prompts fall back to the stub, or raise KeyError with on_miss="error".
+    """
+
+    def __init__(self, model_name: str, cassette: Cassette, latency: float=None, latency_scale: float=1.0,
+                 on_miss: str="stub"):
+        self.model_name = model_name
+        self.cassette = cassette
+        self.latency = latency
+        self.latency_scale = latency_scale
+        self.on_miss = on_miss
+        self._stub = StubChatModel(model_name)
+
+    def invoke(self, messages) -> OfflineMessage:
+        key = cassette_key(self.model_name, messages)
+        entry = self.cassette.get(key)
+        if entry is None:
+            if self.on_miss == "error":
+                raise KeyError(f"No recorded response for {self.model_name} prompt {key[:12]}")
+            logger.debug(f"Cassette miss for {self.model_name} prompt {key[:12]}, using stub")
+            message = self._stub.invoke(messages)
+            recorded_latency = 0.0
+        else:
+            usage = entry.get("usage") or {}
+            message = OfflineMessage(entry["content"], usage.get("input_tokens", 0), usage.get("output_tokens", 0))
+            message.response_metadata["cache_hit"] = True
+            recorded_latency = entry.get("latency", 0.0)
+        delay = self.latency if self.latency is not None else recorded_latency * self.latency_scale
+        if delay:
+            time.sleep(delay)
+        return message
+
+
+# Provider factories, called by utils.llm_providers.get_chat_model with the provider's config as keywords
+
+def stub_chat_model(model_name: str, api_key: str=None, temperature: float=None, latency: float=0.0,
+                    tail_latency: float=0.0, tail_rate: float=0.0, failure_rate: float=0.0, seed: int=None, **_):
+    return StubChatModel(model_name, latency=latency, tail_latency=tail_latency, tail_rate=tail_rate,
+                         failure_rate=failure_rate, seed=seed)
+
+def recording_chat_model(model_name: str, api_key: str=None, temperature: float=None, cassette: str=None,
+                         upstream: str=None, **_):
+    from utils.llm_providers import get_chat_model
+    return RecordingChatModel(get_chat_model(api_key, model_name, upstream, temperature), model_name, get_cassette(cassette))
+
+def replay_chat_model(model_name: str, api_key: str=None, temperature: float=None, cassette: str=None,
+                      latency: float=None, latency_scale: float=1.0, on_miss: str="stub", **_):
+    return ReplayChatModel(model_name, get_cassette(cassette), latency, latency_scale, on_miss)
@@ -0,0 +1,153 @@
+import re
+import logging
+from utils.convo_analysis import call_llm
+from utils.app_config import PERSONAS_PER_CALL
+from utils.concurrency import map_concurrently
+from utils.prompt_templates import (
+    get_persona_archetypes_prompt,
+    get_specific_persona_prompt,
+    get_specific_personas_prompt,
+    get_persona_rename_prompt,
+    parse_persona_response,
+    parse_persona_responses,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def parse_archetypes_response(response: str) -> list[tuple[str, str]]:
+    """(name, description) pairs from the <archetype-N> blocks of an archetypes response."""
+    archetypes = []
+    for archetype_str in response.split("<archetype-"):
+        if len(archetype_str) > 5:
+            archetype_str = archetype_str.split(">")[1]
+            archetype_str = archetype_str.split("</archetype-")[0]
+            if archetype_str.strip():
+                try:
+                    name, desc = archetype_str.split("Description:", 1)
+                    archetypes.append((name.replace("Name: ", "").strip(), desc.strip()))
+                except ValueError:
+                    logger.warning(f"Error parsing archetype: {archetype_str}")
+    return archetypes
+
+def generate_archetypes(user_group_desc: str, product_desc: str, api_key: str, model_name: str) -> list[tuple[str, str]]:
+    prompt = get_persona_archetypes_prompt(user_group_desc, product_desc)
+    return parse_archetypes_response(call_llm(prompt, api_key, model_name, task="persona_archetypes"))
+
+def generate_persona(archetype, product_desc: str, existing_names: list[str], api_key: str, model_name: str):
+    """A (persona_arch_uuid, name, description) tuple for one archetype, or None if the response can't be parsed."""
+    prompt = get_specific_persona_prompt(archetype.persona_archetype_name,
+                                         archetype.persona_archetype_desc,
+                                         existing_names,
+                                         product_desc)
+    response = call_llm(prompt, api_key, model_name, task="persona")
+    persona_dict = parse_persona_response(response)
+    if not persona_dict['name']:
+        logger.warning(f"Error parsing persona from response: {response}")
+        return None
+    return (archetype.persona_arch_uuid, str(persona_dict['name']), str(persona_dict['description']))
+
+def _numbered_name(name: str, taken_names: set[str]) -> str:
+    suffix = 2
+    while f"{name} ({suffix})".lower() in taken_names:
+        suffix += 1
+    return f"{name} ({suffix})"
+
+def rename_persona(name: str, desc: str, taken_names: set[str], api_key: str, model_name: str) -> str:
+    """A name not in `taken_names` (lowercased) for a persona whose name collided, from one small-model call."""
+    prompt = get_persona_rename_prompt(name, desc, sorted(taken_names))
+    response = call_llm(prompt, api_key, model_name, task="persona_rename")
+    new_name = response.split("<new_name>")[1].split("</new_name>")[0].strip() if "<new_name>" in response else ""
+    if new_name and new_name.lower() not in taken_names:
+        return new_name
+    # The model repeated a taken name; number this one instead of asking again
+    return _numbered_name(name, taken_names)
+
+def resolve_name_collisions(personas, existing_names: list[str], api_key: str, model_name: str):
+    """
+    Rename personas whose name matches an existing persona or an earlier one in `personas`, updating the name in
+    their description too. Personas are (persona_arch_uuid, name, description) tuples. The rename calls all go out
+    at once; a new name that clashes with another rename, or a rename call that fails, gets a numbered name instead.
+    """
+    taken_names = {name.lower() for name in existing_names}
+    colliding = []
+    for i, (_, name, _) in enumerate(personas):
+        if name.lower() in taken_names:
+            colliding.append(i)
+        taken_names.add(name.lower())
+
+    def rename(i):
+        _, name, desc = personas[i]
+        try:
+            return rename_persona(name, desc, taken_names, api_key, model_name)
+        except Exception as e:
+            logger.warning(f"Could not rename duplicate persona {name}: {e}")
+            return None
+
+    new_names = dict(zip(colliding, map_concurrently(rename, colliding)))
+    resolved = []
+    for i, (arch_uuid, name, desc) in enumerate(personas):
+        if i in new_names:
+            new_name = new_names[i]
+            if not new_name or new_name.lower() in taken_names:
+                new_name = _numbered_name(name, taken_names)
+            taken_names.add(new_name.lower())
+            logger.info(f"Renamed duplicate persona {name} to {new_name}")
+            # Whole words only, so renaming "Alex" leaves "Alexandria" alone
+            name, desc = new_name, re.sub(rf"\b{re.escape(name)}\b", lambda _: new_name, desc)
+        resolved.append((arch_uuid, name, desc))
+    return resolved
+
+def generate_persona_batch(archetype, count: int, product_desc: str, existing_names: list[str], api_key: str,
+                           model_name: str) -> list[tuple[str, str, str]]:
+    """
+    `count` personas for one archetype from a single call. Blocks that can't be parsed, and any the model left out,
+    are made up with one-persona calls.
+    """
+    if count == 1:
+        persona = generate_persona(archetype, product_desc, existing_names, api_key, model_name)
+        return [persona] if persona else []
+    prompt = get_specific_personas_prompt(archetype.persona_archetype_name,
+                                          archetype.persona_archetype_desc,
+                                          existing_names,
+                                          product_desc,
+                                          count)
+    response = call_llm(prompt, api_key, model_name, task="persona")
+    personas = [(archetype.persona_arch_uuid, str(persona_dict['name']), str(persona_dict['description']))
+                for persona_dict in parse_persona_responses(response) if persona_dict['name']][:count]
+    if len(personas) < count:
+        logger.warning(f"Got {len(personas)} of {count} personas for {archetype.persona_archetype_name}; "
+                       f"generating the rest one at a time")
+        for _ in range(count - len(personas)):
+            persona = generate_persona(archetype, product_desc, existing_names + [p[1] for p in personas],
+                                       api_key, model_name)
+            if persona:
+                personas.append(persona)
+    return personas
+
+def generate_personas(archetypes, product_desc: str, existing_names: list[str], api_key: str,
+                      model_name: str, per_archetype: int=1) -> list[tuple[str, str, str]]:
+    """
+    `per_archetype` personas for each archetype, as (persona_arch_uuid, name, description) tuples for
+    create_personas_bulk. Several personas for one archetype are asked for together, up to PERSONAS_PER_CALL per
+    call. All calls go out at once with the names taken before this call, so new personas can come back with the
+    same name; those are renamed afterwards. Unparseable responses are skipped, and so is a call that still fails
+    after its retries, so the personas from the other calls are kept.
+    """
+    calls = []
+    for archetype in archetypes:
+        remaining = per_archetype
+        while remaining > 0:
+            calls.append((archetype, min(remaining, PERSONAS_PER_CALL)))
+            remaining -= PERSONAS_PER_CALL
+    def generate(call):
+        archetype, count = call
+        try:
+            return generate_persona_batch(archetype, count, product_desc, existing_names, api_key, model_name)
+        except Exception as e:
+            logger.warning(f"Could not generate {count} personas for {archetype.persona_archetype_name}: {e}")
+            return []
+
+    generated = map_concurrently(generate, calls)
+    return resolve_name_collisions([persona for batch in generated for persona in batch], existing_names,
+                                   api_key, model_name)
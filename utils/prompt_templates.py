@@ -28,18 +28,8 @@ def get_persona_archetypes_prompt(user_group_desc, product_desc):
     </archetype-7>
     """
 
-def get_specific_persona_prompt(archetype_name, archetype_desc, existing_names, product_desc):
-    return f"""
-    Generate a specific user persona based on this archetype:
-    {archetype_name}: {archetype_desc}
-
-    For the following general product description:
-    {product_desc}
-
-    Create a clear, complete, and well-structured description of the persona with the following sections:
-    - Name: [Unique name of the persona. Ensure this name is not used for any other persona in this project. 
-         Existing persona names: {', '.join(existing_names)}].
-    - Age: [Age of the persona].
+# Shared by the one-persona and many-persona prompts
+PERSONA_SECTIONS = """    - Age: [Age of the persona].
     - Demographics: [Demographics of the persona (e.g., gender, race, ethnicity)].
     - Location: [The location of the persona].
     - Motivations: [The motivations of the persona].
@@ -52,10 +42,9 @@ def get_specific_persona_prompt(archetype_name, archetype_desc, existing_names,
     - Software familiarity: [Their level of comfort with specific software or platforms]
     - Digital literacy: [Confidence in navigating digital platforms and software]
     - Pain points: [The pain points and concerns of the persona].
-    - Delightful moments: [The moments and experiences that bring the persona joy and satisfaction].
+    - Delightful moments: [The moments and experiences that bring the persona joy and satisfaction]."""
 
-    Respond in the following format:
-    <name> [Persona name] </name>
+PERSONA_FORMAT = """    <name> [Persona name] </name>
     <age> [Age] </age>
     <demographics> [Demographics] </demographics>
     <location> [Location] </location>
@@ -70,8 +59,61 @@ def get_specific_persona_prompt(archetype_name, archetype_desc, existing_names,
     <digital_literacy> [Digital literacy] </digital_literacy>
     <pain_points> [Pain points] </pain_points>
     <delightful_moments> [Delightful moments] </delightful_moments>
+"""
+
+def get_specific_persona_prompt(archetype_name, archetype_desc, existing_names, product_desc):
+    return f"""
+    Generate a specific user persona based on this archetype:
+    {archetype_name}: {archetype_desc}
+
+    For the following general product description:
+    {product_desc}
+
+    Create a clear, complete, and well-structured description of the persona with the following sections:
+    - Name: [Unique name of the persona. Ensure this name is not used for any other persona in this project. 
+         Existing persona names: {', '.join(existing_names)}].
+{PERSONA_SECTIONS}
+
+    Respond in the following format:
+{PERSONA_FORMAT}    """
+
+def get_specific_personas_prompt(archetype_name, archetype_desc, existing_names, product_desc, count):
+    return f"""
+    Generate exactly {count} distinct user personas based on this archetype:
+    {archetype_name}: {archetype_desc}
+
+    For the following general product description:
+    {product_desc}
+
+    The personas should differ from each other in age, demographics, location and circumstances, while all fitting
+    the archetype. Create a clear, complete, and well-structured description of each persona with the following sections:
+    - Name: [Unique name of the persona. Ensure every name is different and not used for any other persona in this project.
+         Existing persona names: {', '.join(existing_names)}].
+{PERSONA_SECTIONS}
+
+    Respond with {count} <persona> blocks, each in the following format:
+    <persona>
+{PERSONA_FORMAT}    </persona>
+    """
+
+def get_persona_rename_prompt(persona_name, persona_desc, taken_names):
+    return f"""
+    The user persona below needs a new name because "{persona_name}" is already used in this project.
+    {persona_desc}
+
+    Suggest one new, realistic full name that fits the persona's location and demographics.
+    It must not be any of these names: {', '.join(taken_names)}.
+
+    Respond only in the following format:
+    <new_name> [New persona name] </new_name>
     """
 
+def parse_persona_responses(response):
+    """Every persona in a response of repeated <persona> blocks. A response without the blocks is read as one persona."""
+    if "<persona>" not in response:
+        return [parse_persona_response(response)]
+    return [parse_persona_response(block.split("</persona>")[0]) for block in response.split("<persona>")[1:]]
+
 def parse_persona_response(response):
     name = response.split("<name>")[1].split("</name>")[0].strip() if "<name>" in response else None
     age = response.split("<age>")[1].split("</age>")[0].strip() if "<age>" in response else None
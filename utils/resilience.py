@@ -0,0 +1,138 @@
+"""
+Timeouts, retries and hedging for LLM calls, configured per task in LLM_CALL_POLICIES.
+
+Each attempt runs on a worker thread so a hung request can be abandoned at its timeout; the request itself can't be
+interrupted and finishes in the background. A hedge is a duplicate request sent once the first has run past the
+task's observed p95 latency; whichever answers first is used. Hedges only go out while the provider's limiter has a
+free slot, so they never add load to a provider that is already congested, and every request holds its slot until it
+really finishes, so abandoned requests still count against the limit.
+"""
+import random
+import logging
+import threading
+import contextvars
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait, TimeoutError as FuturesTimeoutError
+from timeit import default_timer as timer
+from utils.app_config import LLM_CALL_POLICIES, LLM_HEDGING, LLM_RETRY_BACKOFF, LLM_CONCURRENCY
+from utils.concurrency import is_overload_error
+
+logger = logging.getLogger(__name__)
+
+# Room for every limiter slot plus hedges and timed-out requests still running in the background
+_executor = ThreadPoolExecutor(max_workers=LLM_CONCURRENCY["max_limit"] * 4, thread_name_prefix="uxr-llm")
+
+
+def get_call_policy(task: str) -> dict:
+    """The task's timeout, retries and hedge settings, filled in from "default"."""
+    return {**LLM_CALL_POLICIES["default"], **(LLM_CALL_POLICIES.get(task) or {})}
+
+def is_retryable(error: Exception) -> bool:
+    """Timeouts, rate limits, 5xx responses and dropped connections; bad requests and auth errors aren't."""
+    if is_overload_error(error):
+        return True
+    status_code = getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+    if status_code is not None:
+        return status_code >= 500
+    return isinstance(error, ConnectionError) or "Connection" in type(error).__name__
+
+def backoff_delay(attempt: int) -> float:
+    """Full-jitter exponential backoff before retry number `attempt` (0-based)."""
+    return random.uniform(0, min(LLM_RETRY_BACKOFF["max"], LLM_RETRY_BACKOFF["base"] * 2 ** attempt))
+
+
+class LatencyTracker:
+    """Recent latencies of single requests for one provider and task, for picking the hedge delay."""
+
+    def __init__(self, window: int=200):
+        self._latencies = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, latency: float) -> None:
+        with self._lock:
+            self._latencies.append(latency)
+
+    def percentile(self, q: float) -> float:
+        """The q-quantile of recent latencies, or None until LLM_HEDGING["min_samples"] have been seen."""
+        with self._lock:
+            latencies = sorted(self._latencies)
+        if len(latencies) < LLM_HEDGING["min_samples"]:
+            return None
+        return latencies[min(len(latencies) - 1, int(q * len(latencies)))]
+
+
+_trackers = {}
+_trackers_lock = threading.Lock()
+
+def get_latency_tracker(provider: str, task: str) -> LatencyTracker:
+    with _trackers_lock:
+        return _trackers.setdefault((provider, task), LatencyTracker())
+
+def hedge_delay(policy: dict, tracker: LatencyTracker) -> float:
+    """Seconds to wait before hedging a call, or None if it shouldn't be hedged."""
+    if not (LLM_HEDGING["enabled"] and policy.get("hedge")):
+        return None
+    p95 = tracker.percentile(LLM_HEDGING["percentile"])
+    return None if p95 is None else max(LLM_HEDGING["min_delay"], p95)
+
+
+def call_with_deadline(fn, timeout: float, tracker: LatencyTracker, hedge_after: float=None, limiter=None,
+                       on_abandoned=None):
+    """
+    fn() on a worker thread, raising TimeoutError after `timeout` seconds. With `hedge_after`, a second fn() is
+    started if the first hasn't answered by then and `limiter` has a free slot; the first successful answer wins,
+    and a failure only counts once both have failed. Returns (result, hedged).
+
+    The caller acquires one `limiter` slot for the first request before calling. Every request releases its own
+    slot when it actually finishes, so one abandoned at the timeout, or a losing hedge, keeps holding it and the
+    limiter keeps seeing the load on the provider. `on_abandoned` is added as a done callback to each request
+    still running when this returns or raises, so the caller can account for its usage.
+    """
+    def timed():
+        start = timer()
+        try:
+            result = fn()
+        except Exception as e:
+            if limiter is not None:
+                limiter.release(timer() - start, error=e, started=start)
+            raise
+        tracker.record(timer() - start)
+        if limiter is not None:
+            # A request that only answered after the deadline still tells the limiter the call timed out
+            late = FuturesTimeoutError(f"LLM call timed out after {timeout:g}s") if timer() > deadline else None
+            limiter.release(timer() - start, error=late, started=start)
+        return result
+
+    def abandon(futures):
+        if on_abandoned is not None:
+            for future in futures:
+                future.add_done_callback(on_abandoned)
+
+    deadline = timer() + timeout
+    context = contextvars.copy_context()
+    pending = {_executor.submit(context.copy().run, timed)}
+    hedged, error = False, None
+    while pending:
+        remaining = deadline - timer()
+        if remaining <= 0:
+            break
+        wait_for = min(remaining, hedge_after) if hedge_after is not None else remaining
+        done, pending = wait(pending, timeout=wait_for, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                abandon(pending)
+                return future.result(), hedged
+            error = future.exception()
+        if not done and hedge_after is not None:
+            # One hedge at most; with the limiter full the call just keeps waiting
+            if limiter is not None and limiter.try_acquire():
+                hedged = True
+                logger.info(f"LLM call still running after {hedge_after:.1f}s, sending a hedged request")
+                pending.add(_executor.submit(context.copy().run, timed))
+            hedge_after = None
+        if not pending and error is not None:
+            raise error
+    # Requests that outlived the deadline still finish in the background; count the timeout as a sample
+    tracker.record(timeout)
+    abandon(pending)
+    raise FuturesTimeoutError(f"LLM call timed out after {timeout:g}s")
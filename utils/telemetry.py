@@ -0,0 +1,149 @@
+"""
+Lightweight tracing for pipeline stages and LLM calls.
+
+Spans are written as JSON lines to TELEMETRY_PATH (one object per finished span) and kept in a bounded
+in-memory buffer for the app's performance panel. Attributes set with telemetry_context(), such as
+project_uuid, are attached to every span started inside it, including on threads started by
+map_concurrently.
+"""
+import os
+import json
+import uuid
+import functools
+import time
+import logging
+import threading
+import contextvars
+from collections import deque, defaultdict
+from contextlib import contextmanager
+from timeit import default_timer as timer
+from utils.app_config import TELEMETRY_PATH, TELEMETRY_BUFFER_SIZE
+
+logger = logging.getLogger(__name__)
+
+_context = contextvars.ContextVar("telemetry_context", default={})
+_current_span = contextvars.ContextVar("telemetry_span", default=None)
+_recent_spans = deque(maxlen=TELEMETRY_BUFFER_SIZE)
+_write_lock = threading.Lock()
+
+
+class Span:
+    def __init__(self, name: str, attributes: dict):
+        parent = _current_span.get()
+        self.name = name
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent.span_id if parent else None
+        self.trace_id = parent.trace_id if parent else uuid.uuid4().hex
+        self.attributes = {**_context.get(), **attributes}
+        self.start_time = time.time()
+        self.duration = None
+        self.status = "ok"
+        self._start = timer()
+
+    def set(self, **attributes) -> None:
+        self.attributes.update({key: value for key, value in attributes.items() if value is not None})
+
+    def to_dict(self) -> dict:
+        return {"name": self.name, "trace_id": self.trace_id, "span_id": self.span_id, "parent_id": self.parent_id,
+                "start_time": self.start_time, "duration": self.duration, "status": self.status,
+                "attributes": self.attributes}
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """Time the enclosed block as a span nested under the current one. Yields the Span so callers can add attributes."""
+    current = Span(name, attributes)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.status = "error"
+        current.set(error=f"{type(e).__name__}: {e}")
+        raise
+    finally:
+        current.duration = timer() - current._start
+        _current_span.reset(token)
+        _record(current)
+
+def traced(name: str):
+    """Decorator form of span() for a whole function."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+@contextmanager
+def telemetry_context(**attributes):
+    """Attach `attributes` (e.g. project_uuid) to every span started inside the block."""
+    token = _context.set({**_context.get(), **attributes})
+    try:
+        yield
+    finally:
+        _context.reset(token)
+
+def get_context() -> dict:
+    """Attributes set by the enclosing telemetry_context() blocks."""
+    return _context.get()
+
+def _record(finished: Span) -> None:
+    record = finished.to_dict()
+    _recent_spans.append(record)
+    logger.debug(f"span {finished.name} {finished.duration:.3f}s {finished.attributes}")
+    if not TELEMETRY_PATH:
+        return
+    try:
+        with _write_lock:
+            os.makedirs(os.path.dirname(os.path.abspath(TELEMETRY_PATH)), exist_ok=True)
+            with open(TELEMETRY_PATH, "a") as f:
+                f.write(json.dumps(record, default=str) + "\n")
+    except OSError as e:
+        logger.warning(f"Could not write telemetry to {TELEMETRY_PATH}: {e}")
+
+
+def record_llm_usage(current: Span, message) -> None:
+    """Copy token counts and cache hits from an LLM response onto its span."""
+    usage = getattr(message, "usage_metadata", None) or {}
+    metadata = getattr(message, "response_metadata", None) or {}
+    token_usage = metadata.get("token_usage") or {}
+    cached_tokens = (usage.get("input_token_details") or {}).get("cache_read")
+    current.set(
+        input_tokens=usage.get("input_tokens", token_usage.get("prompt_tokens")),
+        output_tokens=usage.get("output_tokens", token_usage.get("completion_tokens")),
+        cached_tokens=cached_tokens,
+        cache_hit=bool(metadata.get("cache_hit") or cached_tokens),
+    )
+
+def get_recent_spans(project_uuid: str=None) -> list[dict]:
+    spans = list(_recent_spans)
+    if project_uuid:
+        spans = [s for s in spans if s["attributes"].get("project_uuid") == project_uuid]
+    return spans
+
+def summarize_spans(spans: list[dict]) -> list[dict]:
+    """
+    One row per span name (LLM calls split by task): count, total and percentile durations, and LLM token
+    totals. Slowest total first.
+    """
+    by_name = defaultdict(list)
+    for s in spans:
+        task = s["attributes"].get("task")
+        by_name[f"{s['name']} ({task})" if task else s["name"]].append(s)
+    rows = []
+    for name, group in by_name.items():
+        durations = sorted(s["duration"] for s in group)
+        attributes = [s["attributes"] for s in group]
+        rows.append({
+            "stage": name,
+            "count": len(group),
+            "errors": sum(1 for s in group if s["status"] == "error"),
+            "total_s": round(sum(durations), 2),
+            "p50_s": round(durations[len(durations) // 2], 2),
+            "p95_s": round(durations[min(len(durations) - 1, int(len(durations) * 0.95))], 2),
+            "input_tokens": sum(a.get("input_tokens") or 0 for a in attributes),
+            "output_tokens": sum(a.get("output_tokens") or 0 for a in attributes),
+            "cache_hits": sum(1 for a in attributes if a.get("cache_hit")),
+        })
+    return sorted(rows, key=lambda row: row["total_s"], reverse=True)
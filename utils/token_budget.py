@@ -0,0 +1,131 @@
+"""
+Token estimates, running spend per project and user, and budget-driven degradation of LLM calls.
+
+Spend is counted in memory and, once set_ledger() is called, seeded from and persisted to the
+token ledger in the database. When a project or user passes the degrade_at fraction of its budget, calls
+switch to the "degraded" model route and their prompts are truncated; past the budget the truncation gets tighter. Calls are
+never refused.
+"""
+import threading
+import logging
+from utils.app_config import TOKEN_BUDGETS
+
+logger = logging.getLogger(__name__)
+
+CHARS_PER_TOKEN = 4
+TRUNCATION_MARKER = "\n[...]\n"
+
+_spent = {}  # ("project" | "user", key) -> tokens
+_spent_lock = threading.Lock()
+_ledger_loader = None
+_ledger_sink = None
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count for `text` (~4 characters per token for English with Llama/GPT tokenizers)."""
+    return max(1, len(text) // CHARS_PER_TOKEN)
+
+def estimate_prompt_tokens(messages) -> int:
+    """Pre-flight estimate for a prompt string or a list of (role, content) messages."""
+    if isinstance(messages, str):
+        return estimate_tokens(messages)
+    return sum(estimate_tokens(str(message[1] if isinstance(message, (tuple, list)) else getattr(message, "content", message)))
+               for message in messages)
+
+def truncate_text(text: str, max_tokens: int) -> str:
+    """Keep the start and end of `text` within about `max_tokens`, cutting from the middle."""
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return text
+    head = max_chars * 2 // 3
+    tail = max_chars - head
+    return text[:head] + TRUNCATION_MARKER + text[-tail:]
+
+def truncate_messages(messages, max_tokens: int):
+    """
+    Fit a prompt within about `max_tokens`. Strings are cut from the middle. Conversations keep their system
+    message and the most recent messages that fit, dropping the oldest exchanges first.
+    """
+    if isinstance(messages, str):
+        return truncate_text(messages, max_tokens)
+    if estimate_prompt_tokens(messages) <= max_tokens:
+        return messages
+    head = [messages[0]] if messages and isinstance(messages[0], (tuple, list)) and messages[0][0] == "system" else []
+    kept, used = [], estimate_prompt_tokens(head)
+    for message in reversed(messages[len(head):]):
+        cost = estimate_prompt_tokens([message])
+        if kept and used + cost > max_tokens:
+            break
+        kept.append(message)
+        used += cost
+    return head + list(reversed(kept))
+
+
+def set_ledger(loader, sink) -> None:
+    """
+    Connect the persistent ledger. `loader(scope, key)` returns tokens already spent by a project or user;
+    `sink(entry)` stores one call's usage.
+    """
+    global _ledger_loader, _ledger_sink
+    _ledger_loader, _ledger_sink = loader, sink
+    with _spent_lock:
+        _spent.clear()
+
+def get_spent(scope: str, key: str) -> int:
+    with _spent_lock:
+        if (scope, key) in _spent:
+            return _spent[(scope, key)]
+    spent = _ledger_loader(scope, key) if _ledger_loader else 0
+    with _spent_lock:
+        # Another thread may have recorded usage while the ledger was read
+        return _spent.setdefault((scope, key), spent)
+
+def forget_spent(project_uuid: str=None, user_id: str=None) -> None:
+    """Drop cached totals so the next read comes from the ledger, e.g. after another process spent tokens."""
+    with _spent_lock:
+        for scope, key in (("project", project_uuid), ("user", user_id)):
+            _spent.pop((scope, key), None)
+
+def record_usage(project_uuid: str=None, user_id: str=None, task: str=None, provider: str=None, model: str=None,
+                 input_tokens: int=0, output_tokens: int=0) -> None:
+    tokens = (input_tokens or 0) + (output_tokens or 0)
+    for scope, key in (("project", project_uuid), ("user", user_id)):
+        if key:
+            get_spent(scope, key)
+            with _spent_lock:
+                _spent[(scope, key)] += tokens
+    if _ledger_sink and (project_uuid or user_id):
+        try:
+            _ledger_sink({"project_uuid": project_uuid, "user_id": user_id, "task": task, "provider": provider,
+                          "model": model, "input_tokens": input_tokens or 0, "output_tokens": output_tokens or 0})
+        except Exception as e:
+            logger.warning(f"Could not record token usage: {e}")
+
+
+def budget_limit(scope: str, guest: bool=False) -> int:
+    return TOKEN_BUDGETS[f"guest_{scope}" if guest and scope == "user" else scope]
+
+def budget_level(project_uuid: str=None, user_id: str=None, guest: bool=False) -> str:
+    """"ok", "degraded" (past degrade_at of a budget) or "exhausted" (past a budget), whichever is worst."""
+    level = "ok"
+    for scope, key in (("project", project_uuid), ("user", user_id)):
+        limit = budget_limit(scope, guest)
+        if not key or not limit:
+            continue
+        spent = get_spent(scope, key)
+        if spent >= limit:
+            return "exhausted"
+        if spent >= limit * TOKEN_BUDGETS["degrade_at"]:
+            level = "degraded"
+    return level
+
+def max_prompt_tokens(level: str) -> int:
+    """Prompt size cap for a budget level, or None for no cap."""
+    return TOKEN_BUDGETS["max_prompt_tokens"].get(level)
+
+def get_budget_status(project_uuid: str=None, user_id: str=None, guest: bool=False) -> dict:
+    status = {"level": budget_level(project_uuid, user_id, guest)}
+    for scope, key in (("project", project_uuid), ("user", user_id)):
+        if key:
+            status[scope] = {"spent": get_spent(scope, key), "limit": budget_limit(scope, guest)}
+    return status
@@ -0,0 +1,321 @@
+"""
+JSON HTTP API over the same database and pipeline as the Streamlit app.
+
+    uvicorn uxr_app.api:app --port 8000
+    python -m uxr_app.api
+
+Requests authenticate with HTTP Basic using an existing account's email and password. Anything that calls an LLM
+returns 202 with a task, interview batch or analysis id to poll instead of holding the request open.
+"""
+import os
+import logging
+from contextlib import asynccontextmanager
+from typing import Optional
+from fastapi import FastAPI, Depends, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.security import HTTPBasic, HTTPBasicCredentials
+from pydantic import BaseModel
+from config import PERSONAS_PER_ARCHETYPE
+from uxr_app.database import (
+    init_db,
+    session_scope,
+    get_user_by_email,
+    verify_password,
+    create_project,
+    get_project_by_uuid,
+    create_persona_archetypes_bulk,
+    get_archetypes_by_project,
+    create_personas_bulk,
+    get_personas_by_project,
+    get_or_create_uxr_researcher,
+    get_uxr_researcher_by_project,
+    get_interviews_by_project,
+    get_interview_status,
+    get_analysis_result,
+    get_latest_analysis,
+    Project,
+    Interview,
+    User,
+)
+from uxr_app.writer import run_write
+from uxr_app.jobs import submit_interview_batch, get_batch, get_interview_jobs, submit_task, get_task
+from uxr_app.pipeline import submit_analysis
+from uxr_app.report import generate_uxr_report, DEFAULT_REPORT_OPTIONS
+from uxr_app.ledger import install_token_ledger
+from uxr_app.utils import get_credentials
+from utils.convo_analysis import call_llm
+from utils.interview_utils import get_researcher_persona
+from utils.persona_utils import generate_archetypes, generate_personas
+from utils.prompt_templates import get_project_name_prompt
+from utils.telemetry import telemetry_context
+from utils.token_budget import get_budget_status
+
+logger = logging.getLogger(__name__)
+
+@asynccontextmanager
+async def lifespan(app):
+    init_db()
+    install_token_ledger()
+    yield
+
+# Handlers that only touch the database are plain defs, which FastAPI runs on its threadpool: the scoped sessions
+# are per thread, so they must not run on the event loop thread, where concurrent requests would share one
+app = FastAPI(title="poormans-uxr", lifespan=lifespan)
+security = HTTPBasic()
+
+
+class ProjectIn(BaseModel):
+    user_group_desc: str
+    product_desc: str
+    project_name: Optional[str] = None
+
+class ReportIn(BaseModel):
+    report_title: Optional[str] = None
+    include_exec_summary: bool = True
+    include_background: bool = True
+    include_demographics: bool = True
+    include_key_findings: bool = True
+    include_detailed_analysis: bool = True
+    include_recommendations: bool = True
+    include_appendix: bool = False
+
+
+def current_user(credentials: HTTPBasicCredentials = Depends(security)) -> User:
+    with session_scope() as db:
+        user = get_user_by_email(db, credentials.username)
+        if user is None or not verify_password(user.password, credentials.password):
+            raise HTTPException(401, "Invalid credentials", headers={"WWW-Authenticate": "Basic"})
+        return user
+
+def owned_project(db, project_uuid, user) -> Project:
+    project = get_project_by_uuid(db, project_uuid)
+    if project is None or project.user_id != user.user_id:
+        raise HTTPException(404, "Project not found")
+    return project
+
+def budget_context(project_uuid, user):
+    """Tag spans and charge token spend to the project and the calling user, as the app does."""
+    return telemetry_context(project_uuid=project_uuid, user_id=user.user_id, guest=user.is_guest)
+
+
+def project_json(project) -> dict:
+    return {"project_uuid": project.project_uuid, "project_name": project.project_name,
+            "user_group_desc": project.user_group_desc, "product_desc": project.product_desc,
+            "creation_date": project.creation_date.isoformat() if project.creation_date else None}
+
+def archetype_json(archetype) -> dict:
+    return {"persona_arch_uuid": archetype.persona_arch_uuid, "name": archetype.persona_archetype_name,
+            "description": archetype.persona_archetype_desc}
+
+def persona_json(persona) -> dict:
+    return {"persona_uuid": persona.persona_uuid, "persona_arch_uuids": persona.persona_arch_uuids,
+            "name": persona.persona_name, "description": persona.persona_desc}
+
+def task_json(task) -> dict:
+    return {"task_id": task.task_id, "kind": task.kind, "project_uuid": task.project_uuid, "status": task.state,
+            "error": task.error, "result": task.result}
+
+def analysis_json(analysis) -> dict:
+    return {"analysis_uuid": analysis.analysis_uuid, "project_uuid": analysis.project_uuid, "status": analysis.status,
+            "error": analysis.error, "cluster_summaries": analysis.summaries,
+            "created_at": analysis.created_at.isoformat() if analysis.created_at else None,
+            "finished_at": analysis.finished_at.isoformat() if analysis.finished_at else None}
+
+
+# --- Projects ---
+@app.post("/projects", status_code=201)
+async def create_project_endpoint(body: ProjectIn, user: User = Depends(current_user)):
+    project_name = body.project_name
+    if not project_name:
+        api_key, model_name = get_credentials()
+        prompt = get_project_name_prompt(body.user_group_desc, body.product_desc)
+        with telemetry_context(user_id=user.user_id, guest=user.is_guest):
+            project_name = (await run_in_threadpool(call_llm, prompt, api_key, model_name, task="project_name")).strip()
+
+    def create():
+        with session_scope() as db:
+            return project_json(create_project(db, user.user_id, body.user_group_desc, body.product_desc, project_name))
+    return await run_in_threadpool(create)
+
+@app.get("/projects")
+def list_projects(user: User = Depends(current_user)):
+    with session_scope() as db:
+        projects = db.query(Project).filter(Project.user_id == user.user_id).order_by(Project.creation_date).all()
+        return [project_json(project) for project in projects]
+
+@app.get("/projects/{project_uuid}")
+def get_project(project_uuid: str, user: User = Depends(current_user)):
+    with session_scope() as db:
+        project = owned_project(db, project_uuid, user)
+        researcher = get_uxr_researcher_by_project(db, project_uuid)
+        interviewed = get_interview_status(db, project_uuid, researcher.uxr_persona_uuid) if researcher else {}
+        return {**project_json(project),
+                "archetypes": [archetype_json(a) for a in get_archetypes_by_project(db, project_uuid)],
+                "personas": [{**persona_json(p), "interview_uuid": interviewed.get(p.persona_uuid, (None,))[0]}
+                             for p in get_personas_by_project(db, project_uuid)],
+                "budget": get_budget_status(project_uuid, user.user_id, user.is_guest)}
+
+
+# --- Archetypes and personas ---
+# Tasks generate with no session open and store the results through the single writer
+def _generate_archetypes(project_uuid, user_group_desc, product_desc):
+    api_key, model_name = get_credentials()
+    new_archetypes = generate_archetypes(user_group_desc, product_desc, api_key, model_name)
+    created = run_write(create_persona_archetypes_bulk, project_uuid, new_archetypes, commit=False)
+    return [archetype_json(a) for a in created]
+
+def _generate_personas(project_uuid, product_desc, per_archetype):
+    api_key, model_name = get_credentials()
+    with session_scope() as db:
+        archetypes = get_archetypes_by_project(db, project_uuid)
+        existing_names = [persona.persona_name for persona in get_personas_by_project(db, project_uuid)]
+        db.close()
+    new_personas = generate_personas(archetypes, product_desc, existing_names, api_key, model_name, per_archetype)
+    created = run_write(create_personas_bulk, project_uuid, new_personas, commit=False)
+    return [persona_json(p) for p in created]
+
+@app.post("/projects/{project_uuid}/archetypes", status_code=202)
+def create_archetypes(project_uuid: str, user: User = Depends(current_user)):
+    with session_scope() as db:
+        project = owned_project(db, project_uuid, user)
+    with budget_context(project_uuid, user):
+        task = submit_task("archetypes", project_uuid, _generate_archetypes, project_uuid, project.user_group_desc,
+                           project.product_desc)
+    return task_json(task)
+
+@app.post("/projects/{project_uuid}/personas", status_code=202)
+def create_personas(project_uuid: str, per_archetype: int = Query(PERSONAS_PER_ARCHETYPE, ge=1, le=20),
+                    user: User = Depends(current_user)):
+    """`per_archetype` new personas for each archetype."""
+    with session_scope() as db:
+        project = owned_project(db, project_uuid, user)
+        if not get_archetypes_by_project(db, project_uuid):
+            raise HTTPException(409, "Generate archetypes first")
+    with budget_context(project_uuid, user):
+        task = submit_task("personas", project_uuid, _generate_personas, project_uuid, project.product_desc,
+                           per_archetype)
+    return task_json(task)
+
+@app.get("/tasks/{task_id}")
+def get_task_endpoint(task_id: str, user: User = Depends(current_user)):
+    task = get_task(task_id)
+    if task is None:
+        raise HTTPException(404, "Task not found")
+    with session_scope() as db:
+        owned_project(db, task.project_uuid, user)
+    return task_json(task)
+
+
+# --- Interviews ---
+@app.post("/projects/{project_uuid}/interviews", status_code=202)
+def run_interviews(project_uuid: str, user: User = Depends(current_user)):
+    """
+    Queue interviews for every persona that hasn't been interviewed or isn't already being interviewed. Personas
+    found to be near-duplicates are decided in the background and show up as "skipped" in the batch.
+    """
+    with session_scope() as db:
+        owned_project(db, project_uuid, user)
+        personas = get_personas_by_project(db, project_uuid)
+        db.close()
+    if not personas:
+        raise HTTPException(409, "Generate personas first")
+    name, desc = get_researcher_persona()
+    researcher = run_write(get_or_create_uxr_researcher, project_uuid, name, desc, commit=False)
+    with session_scope() as db:
+        interviewed = get_interview_status(db, project_uuid, researcher.uxr_persona_uuid)
+    active = {job.persona_uuid for job in get_interview_jobs(project_uuid) if job.active}
+    remaining = [p for p in personas if p.persona_uuid not in interviewed and p.persona_uuid not in active]
+    batch = submit_interview_batch(project_uuid, researcher.uxr_persona_uuid, remaining, skip_near_duplicates=True)
+    return {"batch_id": batch.batch_id, "queued": len(batch.jobs)}
+
+@app.get("/interview-batches/{batch_id}")
+def get_interview_batch(batch_id: str, user: User = Depends(current_user)):
+    batch = get_batch(batch_id)
+    if batch is None:
+        raise HTTPException(404, "Batch not found")
+    with session_scope() as db:
+        owned_project(db, batch.project_uuid, user)
+    return {"batch_id": batch.batch_id, "project_uuid": batch.project_uuid, "active": batch.active,
+            "counts": dict(batch.counts()),
+            "interviews": [{"persona_uuid": job.persona_uuid, "persona_name": job.persona_name, "status": job.state,
+                            "turns_done": job.turns_done, "turns_total": job.turns_total, "error": job.error,
+                            "eta_s": job.eta()} for job in batch.jobs]}
+
+@app.delete("/interview-batches/{batch_id}", status_code=202)
+def cancel_interview_batch(batch_id: str, user: User = Depends(current_user)):
+    batch = get_batch(batch_id)
+    if batch is None:
+        raise HTTPException(404, "Batch not found")
+    with session_scope() as db:
+        owned_project(db, batch.project_uuid, user)
+    batch.cancel()
+    return {"batch_id": batch.batch_id, "counts": dict(batch.counts())}
+
+@app.get("/projects/{project_uuid}/interviews")
+def list_interviews(project_uuid: str, include_transcripts: bool = False, user: User = Depends(current_user)):
+    with session_scope() as db:
+        owned_project(db, project_uuid, user)
+        interviews = get_interviews_by_project(db, project_uuid, with_turns=include_transcripts)
+        return [{"interview_uuid": interview.interview_uuid, "persona_uuid": interview.persona_uuid,
+                 "datetime": interview.datetime.isoformat() if interview.datetime else None,
+                 **({"conversation": interview.conversation} if include_transcripts else {})}
+                for interview in interviews]
+
+@app.get("/interviews/{interview_uuid}")
+def get_interview(interview_uuid: str, user: User = Depends(current_user)):
+    with session_scope() as db:
+        interview = db.query(Interview).filter(Interview.interview_uuid == interview_uuid).first()
+        if interview is None:
+            raise HTTPException(404, "Interview not found")
+        owned_project(db, interview.project_uuid, user)
+        return {"interview_uuid": interview.interview_uuid, "persona_uuid": interview.persona_uuid,
+                "conversation": interview.conversation}
+
+
+# --- Analysis and reports ---
+@app.post("/projects/{project_uuid}/analyses", status_code=202)
+def create_analysis(project_uuid: str, user: User = Depends(current_user)):
+    with session_scope() as db:
+        owned_project(db, project_uuid, user)
+    api_key, model_name = get_credentials()
+    return {"analysis_uuid": submit_analysis(project_uuid, api_key, model_name)}
+
+@app.get("/analyses/{analysis_uuid}")
+def get_analysis(analysis_uuid: str, user: User = Depends(current_user)):
+    with session_scope() as db:
+        analysis = get_analysis_result(db, analysis_uuid)
+        if analysis is None:
+            raise HTTPException(404, "Analysis not found")
+        owned_project(db, analysis.project_uuid, user)
+        return analysis_json(analysis)
+
+def _generate_report(project_uuid, cluster_summaries, report_options):
+    api_key, model_name = get_credentials()
+    with session_scope() as db:
+        project = get_project_by_uuid(db, project_uuid)
+        personas = get_personas_by_project(db, project_uuid)
+        interviews = get_interviews_by_project(db, project_uuid, with_turns=True)
+        db.close()
+    report_options = {**report_options, 'report_title': report_options.get('report_title') or f"UXR Report: {project.project_name}"}
+    sections, full_report = generate_uxr_report(project, personas, interviews, cluster_summaries, report_options,
+                                                api_key, model_name)
+    return {"sections": sections, "report": full_report}
+
+@app.post("/projects/{project_uuid}/reports", status_code=202)
+def create_report(project_uuid: str, body: ReportIn = None, user: User = Depends(current_user)):
+    """Generate a report from the project's latest complete analysis."""
+    with session_scope() as db:
+        owned_project(db, project_uuid, user)
+        analysis = get_latest_analysis(db, project_uuid, status="complete")
+        if analysis is None:
+            raise HTTPException(409, "Run an analysis first")
+        cluster_summaries = analysis.summaries
+    report_options = body.model_dump() if body else {**DEFAULT_REPORT_OPTIONS}
+    with budget_context(project_uuid, user):
+        task = submit_task("report", project_uuid, _generate_report, project_uuid, cluster_summaries, report_options)
+    return task_json(task)
+
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(app, host=os.environ.get("UXR_API_HOST", "127.0.0.1"), port=int(os.environ.get("UXR_API_PORT", 8000)))
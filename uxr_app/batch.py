@@ -0,0 +1,204 @@
+"""
+Run the whole research pipeline headlessly for a file of study specs.
+
+    python -m uxr_app.batch studies.jsonl --out reports/
+    UXR_LLM_MODE=stub python -m uxr_app.batch studies.csv --concurrency 8
+
+Each spec is a JSON line (or CSV row) with `user_group_desc` and `product_desc`, and optionally `project_name`.
+For each one the CLI creates a project owned by the batch user, then generates archetypes and personas, runs the
+interviews, analyzes them and writes a Markdown report to the output directory. Every step is stored as it finishes
+and skipped when its results already exist, so re-running the same command resumes an interrupted run.
+"""
+import os
+import re
+import csv
+import sys
+import json
+import uuid
+import logging
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from config import PERSONAS_PER_ARCHETYPE
+from uxr_app.database import (
+    init_db,
+    session_scope,
+    create_user,
+    get_user_by_email,
+    create_project,
+    find_project,
+    get_project_by_uuid,
+    create_persona_archetypes_bulk,
+    get_archetypes_by_project,
+    create_personas_bulk,
+    get_personas_by_project,
+    get_or_create_uxr_researcher,
+    get_interviews_by_project,
+    get_interview_status,
+    get_latest_analysis,
+)
+from uxr_app.writer import run_write, writer
+from uxr_app.jobs import run_interview_in_background, skip_near_duplicate_personas
+from uxr_app.pipeline import submit_analysis
+from uxr_app.report import generate_uxr_report, DEFAULT_REPORT_OPTIONS
+from uxr_app.ledger import install_token_ledger
+from uxr_app.utils import get_credentials
+from utils.convo_analysis import call_llm
+from utils.interview_utils import get_researcher_persona
+from utils.persona_utils import generate_archetypes, generate_personas
+from utils.prompt_templates import get_project_name_prompt
+from utils.concurrency import map_concurrently
+from utils.telemetry import span, telemetry_context
+
+logger = logging.getLogger(__name__)
+
+BATCH_USER_EMAIL = "batch@uxr.local"
+
+
+def load_specs(path):
+    """Study specs from a JSON lines or CSV file, skipping blank lines."""
+    with open(path, newline='') as f:
+        if path.endswith(".csv"):
+            specs = list(csv.DictReader(f))
+        else:
+            specs = [json.loads(line) for line in f if line.strip()]
+    for line_number, spec in enumerate(specs, 1):
+        if not spec.get("user_group_desc") or not spec.get("product_desc"):
+            raise ValueError(f"{path} spec {line_number} needs user_group_desc and product_desc")
+    return specs
+
+def get_batch_user(email):
+    with session_scope() as db:
+        user = get_user_by_email(db, email)
+        if user is None:
+            # Random password: the batch user only owns projects, nobody signs in as it
+            user = create_user(db, email, uuid.uuid4().hex)
+        return user.user_id
+
+def report_path(out_dir, project):
+    slug = re.sub(r"[^a-z0-9]+", "-", project.project_name.lower()).strip("-")[:60] or "project"
+    return os.path.join(out_dir, f"{slug}-{project.project_uuid[:8]}.md")
+
+
+def run_study(spec, user_id, api_key, model_name, out_dir, per_archetype=PERSONAS_PER_ARCHETYPE):
+    """Take one spec through every pipeline stage that hasn't finished yet. Returns the report path."""
+    user_group_desc, product_desc = spec["user_group_desc"], spec["product_desc"]
+    with session_scope() as db:
+        project = find_project(db, user_id, user_group_desc, product_desc)
+        if project is None:
+            project_name = spec.get("project_name")
+            if not project_name:
+                prompt = get_project_name_prompt(user_group_desc, product_desc)
+                project_name = call_llm(prompt, api_key, model_name, task="project_name").strip()
+            project = create_project(db, user_id, user_group_desc, product_desc, project_name)
+            logger.info(f"Created project '{project_name}' ({project.project_uuid})")
+        project_uuid = project.project_uuid
+
+    with telemetry_context(project_uuid=project_uuid), span("batch.study"):
+        # Generate with no session open, then store through the writer
+        with session_scope() as db:
+            archetypes = get_archetypes_by_project(db, project_uuid)
+            db.close()
+        if not archetypes:
+            new_archetypes = generate_archetypes(user_group_desc, product_desc, api_key, model_name)
+            archetypes = run_write(create_persona_archetypes_bulk, project_uuid, new_archetypes, commit=False)
+        with session_scope() as db:
+            personas = get_personas_by_project(db, project_uuid)
+            db.close()
+        if not personas:
+            new_personas = generate_personas(archetypes, product_desc, [], api_key, model_name, per_archetype=per_archetype)
+            run_write(create_personas_bulk, project_uuid, new_personas, commit=False)
+            with session_scope() as db:
+                personas = get_personas_by_project(db, project_uuid)
+                db.close()
+        if not personas:
+            raise ValueError(f"No personas could be generated for project {project_uuid}")
+
+        name, desc = get_researcher_persona()
+        researcher = run_write(get_or_create_uxr_researcher, project_uuid, name, desc, commit=False)
+        with session_scope() as db:
+            interviewed = get_interview_status(db, project_uuid, researcher.uxr_persona_uuid)
+        remaining = [persona for persona in personas if persona.persona_uuid not in interviewed]
+        remaining, skipped = skip_near_duplicate_personas(project_uuid, researcher.uxr_persona_uuid, remaining)
+        if skipped:
+            logger.info(f"Skipping {len(skipped)} near-duplicate personas for project {project_uuid}")
+        if remaining:
+            logger.info(f"Running {len(remaining)} interviews for project {project_uuid}")
+            map_concurrently(lambda persona: run_interview_in_background(
+                persona.persona_uuid, researcher.uxr_persona_uuid, project_uuid, api_key=api_key, model_name=model_name),
+                remaining)
+            with session_scope() as db:
+                done = get_interview_status(db, project_uuid, researcher.uxr_persona_uuid)
+            missing = sum(1 for persona in remaining if persona.persona_uuid not in done)
+            if missing:
+                raise RuntimeError(f"{missing} interviews failed for project {project_uuid}; re-run to retry them")
+
+        with session_scope() as db:
+            project = get_project_by_uuid(db, project_uuid)
+            path = report_path(out_dir, project)
+            if os.path.exists(path):
+                return path
+            analysis = get_latest_analysis(db, project_uuid, status="complete")
+            db.close()
+        if analysis is None:
+            analysis_uuid = submit_analysis(project_uuid, api_key, model_name, wait=True)
+            with session_scope() as db:
+                analysis = get_latest_analysis(db, project_uuid, status="complete")
+                db.close()
+            logger.info(f"Analysis {analysis_uuid} for project {project_uuid} found {len(analysis.summaries)} themes")
+
+        with session_scope() as db:
+            project = get_project_by_uuid(db, project_uuid)
+            personas = get_personas_by_project(db, project_uuid)
+            interviews = get_interviews_by_project(db, project_uuid, with_turns=True)
+            db.close()
+        report_options = {'report_title': f"UXR Report: {project.project_name}", **DEFAULT_REPORT_OPTIONS}
+        _, full_report = generate_uxr_report(project, personas, interviews, analysis.summaries, report_options,
+                                             api_key, model_name)
+        # Write then rename so a half-written report never counts as done on resume
+        with open(path + ".tmp", "w") as f:
+            f.write(full_report)
+        os.replace(path + ".tmp", path)
+        return path
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("specs", help="JSON lines or CSV file of study specs")
+    parser.add_argument("--out", default="reports", help="directory for the Markdown reports")
+    parser.add_argument("--concurrency", type=int, default=4, help="studies run at the same time")
+    parser.add_argument("--email", default=BATCH_USER_EMAIL, help="user that owns the batch projects")
+    parser.add_argument("--model", help="model name (defaults to model_name in secrets.toml)")
+    parser.add_argument("--personas-per-archetype", type=int, default=PERSONAS_PER_ARCHETYPE)
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    api_key, model_name = get_credentials(args.model)
+
+    specs = load_specs(args.specs)
+    os.makedirs(args.out, exist_ok=True)
+    init_db()
+    install_token_ledger()
+    user_id = get_batch_user(args.email)
+
+    def run(spec):
+        try:
+            with telemetry_context(user_id=user_id, guest=False):
+                return run_study(spec, user_id, api_key, model_name, args.out, args.personas_per_archetype), None
+        except Exception as e:
+            logger.error(f"Study for '{spec['product_desc']}' failed: {e}", exc_info=True)
+            return None, e
+
+    with ThreadPoolExecutor(max_workers=args.concurrency, thread_name_prefix="uxr-batch") as executor:
+        results = list(executor.map(run, specs))
+    writer.flush()
+
+    failed = 0
+    for spec, (path, error) in zip(specs, results):
+        print(f"{'FAILED' if error else 'ok':<7} {spec['product_desc'][:50]:<50} {error or path}")
+        failed += error is not None
+    print(f"{len(specs) - failed} of {len(specs)} studies complete; reports in {args.out}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,16 @@
+import streamlit as st
+from uxr_app.database import session_scope, load_project_snapshot, get_project_version
+
+
+@st.cache_data(show_spinner=False, max_entries=256)
+def _load_project_snapshot(project_uuid, version):
+    with session_scope() as db:
+        return load_project_snapshot(db, project_uuid)
+
+def get_project_snapshot(project_uuid):
+    """
+    The project page snapshot, served from cache until something writes to the project.
+    Writes from any process bump projects.data_version (see uxr_app.database), which changes the cache key;
+    reading it is one indexed lookup per rerun.
+    """
+    return _load_project_snapshot(project_uuid, get_project_version(project_uuid))
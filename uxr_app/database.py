@@ -1,13 +1,29 @@
 import sqlite3
 import hashlib
+import json
 import uuid
-from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime, ForeignKey, ARRAY
-from sqlalchemy.orm import sessionmaker, declarative_base, relationship
+import threading
+from itertools import chain
+from types import SimpleNamespace
+from contextlib import contextmanager
+from sqlalchemy import create_engine, event, func, select, update, inspect, text, Column, Integer, Float, String, Text, DateTime, ForeignKey, UniqueConstraint, ARRAY
+from sqlalchemy.orm import sessionmaker, scoped_session, declarative_base, relationship, selectinload
 from sqlalchemy.dialects.sqlite import BLOB  # Import BLOB
 from datetime import datetime
+from config import (
+    DATABASE_URL,
+    DB_POOL_SIZE,
+    DB_MAX_OVERFLOW,
+    DB_POOL_TIMEOUT,
+    DB_POOL_RECYCLE,
+    SQLITE_TIMEOUT,
+    SQLITE_PRAGMAS,
+)
 
 Base = declarative_base()
 
+GUEST_EMAIL_DOMAIN = "@temp.uxr"
+
 # --- User Table ---
 class User(Base):
     __tablename__ = "users"
@@ -18,6 +34,10 @@ class User(Base):
 
     projects = relationship("Project", back_populates="user")
 
+    @property
+    def is_guest(self):
+        return self.email.endswith(GUEST_EMAIL_DOMAIN)
+
 
 # --- Project Table ---
 class Project(Base):
@@ -29,12 +49,14 @@ class Project(Base):
     project_uuid = Column(String, unique=True)
     user_id = Column(String, ForeignKey("users.user_id"))
     creation_date = Column(DateTime, default=datetime.utcnow)
+    # Bumped in the same transaction as every write to the project's data, see _bump_touched_projects
+    data_version = Column(Integer, nullable=False, default=0, server_default="0")
 
     user = relationship("User", back_populates="projects")
-    persona_archetypes = relationship("PersonaArchetype", back_populates="project")
-    personas = relationship("Persona", back_populates="project")
-    uxr_researcher = relationship("UXRResearcher", back_populates="project", uselist=False)
-    interviews = relationship("Interview", back_populates="project")
+    persona_archetypes = relationship("PersonaArchetype", back_populates="project", cascade="all, delete-orphan", passive_deletes=True)
+    personas = relationship("Persona", back_populates="project", cascade="all, delete-orphan", passive_deletes=True)
+    uxr_researcher = relationship("UXRResearcher", back_populates="project", uselist=False, cascade="all, delete-orphan", passive_deletes=True)
+    interviews = relationship("Interview", back_populates="project", cascade="all, delete-orphan", passive_deletes=True)
 
 class Persona(Base):
     __tablename__ = "personas"
@@ -42,15 +64,15 @@ class Persona(Base):
     persona_name = Column(String)
     persona_desc = Column(Text)
     persona_arch_uuids = Column(Text)  # Store as comma-separated string; better would be a many-to-many
-    project_uuid = Column(String, ForeignKey("projects.project_uuid"))
+    project_uuid = Column(String, ForeignKey("projects.project_uuid", ondelete="CASCADE"))
     persona_uuid = Column(String, unique=True)
 
     project = relationship("Project", back_populates="personas")
-    interviews = relationship("Interview", back_populates="persona")
+    interviews = relationship("Interview", back_populates="persona", cascade="all, delete-orphan", passive_deletes=True)
 
 class PersonaArchetype(Base):
     __tablename__ = "persona_archetypes"
-    project_uuid = Column(String, ForeignKey("projects.project_uuid"))
+    project_uuid = Column(String, ForeignKey("projects.project_uuid", ondelete="CASCADE"))
     persona_archetype_name = Column(String)
     persona_archetype_desc = Column(Text)
     persona_arch_uuid = Column(String, primary_key=True)
@@ -63,31 +85,171 @@ class UXRResearcher(Base):
     id = Column(Integer, primary_key=True)
     uxr_persona_name = Column(String)
     uxr_persona_desc = Column(Text)
-    project_uuid = Column(String, ForeignKey("projects.project_uuid"))
+    project_uuid = Column(String, ForeignKey("projects.project_uuid", ondelete="CASCADE"), index=True, unique=True)  # one researcher per project
     uxr_persona_uuid = Column(String, unique=True)
 
     project = relationship("Project", back_populates="uxr_researcher")
-    interviews = relationship("Interview", back_populates="uxr_persona")
+    interviews = relationship("Interview", back_populates="uxr_persona", cascade="all, delete-orphan", passive_deletes=True)
 
 # --- Interview Table ---
 class Interview(Base):
     __tablename__ = "interviews"
     id = Column(Integer, primary_key=True)
-    persona_uuid = Column(String, ForeignKey("personas.persona_uuid"))
-    uxr_persona_uuid = Column(String, ForeignKey("uxr_researcher.uxr_persona_uuid"))
+    persona_uuid = Column(String, ForeignKey("personas.persona_uuid", ondelete="CASCADE"))
+    uxr_persona_uuid = Column(String, ForeignKey("uxr_researcher.uxr_persona_uuid", ondelete="CASCADE"))
     interview_transcript = Column(Text)
-    project_uuid = Column(String, ForeignKey("projects.project_uuid"))
+    project_uuid = Column(String, ForeignKey("projects.project_uuid", ondelete="CASCADE"))
     datetime = Column(DateTime, default=datetime.utcnow)
     interview_uuid = Column(String, unique=True)
+    # "in_progress" while turns are being checkpointed by run_interview_in_background, then "complete"
+    status = Column(String, nullable=False, default="complete", server_default="complete")
 
     persona = relationship("Persona", back_populates="interviews")
     uxr_persona = relationship("UXRResearcher", back_populates="interviews")
     project = relationship("Project", back_populates="interviews")
+    turns = relationship("InterviewTurn", back_populates="interview", order_by="InterviewTurn.turn_index",
+                         cascade="all, delete-orphan", passive_deletes=True)
+
+    @property
+    def conversation(self):
+        """The transcript as a list of {"researcher", "user"} dicts, read from interview_turns when present."""
+        if self.turns:
+            return [{"researcher": turn.researcher_text, "user": turn.user_text} for turn in self.turns]
+        return json.loads(self.interview_transcript) if self.interview_transcript else []
+
+# --- Interview Turn Table ---
+class InterviewTurn(Base):
+    __tablename__ = "interview_turns"
+    __table_args__ = (UniqueConstraint("interview_uuid", "turn_index"),)
+    id = Column(Integer, primary_key=True)
+    interview_uuid = Column(String, ForeignKey("interviews.interview_uuid", ondelete="CASCADE"), index=True, nullable=False)
+    turn_index = Column(Integer, nullable=False)
+    researcher_text = Column(Text)
+    user_text = Column(Text)
+    researcher_tokens = Column(Integer)  # prompt + completion tokens of the researcher call
+    user_tokens = Column(Integer)  # prompt + completion tokens of the user call
+    latency = Column(Float)  # seconds spent on both calls of this turn
+
+    interview = relationship("Interview", back_populates="turns")
+
+
+# --- Analysis Result Table ---
+class AnalysisResult(Base):
+    """One Analyze run, written by the analysis worker process and polled by the UI."""
+    __tablename__ = "analysis_results"
+    bumps_project_version = False  # status updates would otherwise invalidate the cached project view every poll
+    id = Column(Integer, primary_key=True)
+    analysis_uuid = Column(String, unique=True, nullable=False)
+    project_uuid = Column(String, ForeignKey("projects.project_uuid", ondelete="CASCADE"), index=True, nullable=False)
+    status = Column(String, nullable=False, default="queued")  # queued, running, complete or failed
+    cluster_summaries = Column(Text)  # JSON {cluster_id: {"theme", "description", "sample_sentences"}}
+    error = Column(Text)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime)
+    finished_at = Column(DateTime)
+
+    @property
+    def summaries(self):
+        return json.loads(self.cluster_summaries) if self.cluster_summaries else {}
+
+
+# --- Token Ledger Table ---
+class TokenUsage(Base):
+    """One row per LLM call. Kept when its project is deleted so user budgets still count the spend."""
+    __tablename__ = "token_usage"
+    bumps_project_version = False  # ledger writes don't change anything a cached project view shows
+    id = Column(Integer, primary_key=True)
+    project_uuid = Column(String, index=True)
+    user_id = Column(String, index=True)
+    task = Column(String)
+    provider = Column(String)
+    model = Column(String)
+    input_tokens = Column(Integer, default=0)
+    output_tokens = Column(Integer, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+def create_engine_from_settings(database_url=DATABASE_URL):
+    """Build the engine from config: SQLite gets pragmas and a busy timeout, server databases get a sized pool."""
+    if database_url.startswith("sqlite"):
+        engine = create_engine(database_url, connect_args={"check_same_thread": False, "timeout": SQLITE_TIMEOUT})
+
+        @event.listens_for(engine, "connect")
+        def _set_sqlite_pragmas(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            for pragma, value in SQLITE_PRAGMAS.items():
+                cursor.execute(f"PRAGMA {pragma}={value}")
+            cursor.close()
+
+        return engine
+    return create_engine(
+        database_url,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=True,
+    )
 
-
-DATABASE_URL = "sqlite:///./uxr_app.db"
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False}) #For SQLite
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+engine = create_engine_from_settings()
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
+ScopedSession = scoped_session(SessionLocal)
+_scope_depth = threading.local()
+
+@contextmanager
+def session_scope():
+    """
+    Yield the session for the current thread (one Streamlit script run or one worker).
+    Nested scopes share the outer session; the outermost scope closes and removes it.
+    """
+    depth = getattr(_scope_depth, "value", 0)
+    _scope_depth.value = depth + 1
+    db = ScopedSession()
+    try:
+        yield db
+    except BaseException:
+        db.rollback()
+        raise
+    finally:
+        _scope_depth.value = depth
+        if depth == 0:
+            ScopedSession.remove()
+
+# --- Project data versions ---
+# Every flush that writes a project's data bumps projects.data_version in the same transaction. Cached project
+# reads are keyed on (project_uuid, version), so a write from any process (the app, the API, the batch CLI or an
+# analysis worker) invalidates them once it commits, without explicit purges.
+def get_project_version(project_uuid):
+    """The project's committed data version, or None if it doesn't exist."""
+    with session_scope() as db:
+        return db.query(Project.data_version).filter(Project.project_uuid == project_uuid).scalar()
+
+@event.listens_for(SessionLocal, "before_flush")
+def _collect_touched_projects(session, flush_context, instances):
+    touched = session.info.setdefault("touched_projects", set())
+    for obj in chain(session.new, session.dirty, session.deleted):
+        project_uuid = getattr(obj, "project_uuid", None)
+        if project_uuid and getattr(obj, "bumps_project_version", True):
+            touched.add(project_uuid)
+
+@event.listens_for(SessionLocal, "after_flush")
+def _bump_touched_projects(session, flush_context):
+    touched = session.info.pop("touched_projects", None)
+    if touched:
+        projects = Project.__table__
+        session.connection().execute(update(projects).where(projects.c.project_uuid.in_(touched))
+                                     .values(data_version=projects.c.data_version + 1))
+
+@event.listens_for(SessionLocal, "after_commit")
+def _run_project_deleted_hooks(session):
+    for project_uuid in session.info.pop("deleted_projects", ()):
+        for hook in _project_deleted_hooks:
+            hook(project_uuid)
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _forget_touched_projects(session):
+    session.info.pop("touched_projects", None)
+    session.info.pop("deleted_projects", None)
 
 def get_db():
     db = SessionLocal()
@@ -96,8 +258,39 @@ def get_db():
     finally:
         db.close()
 
+_db_initialized = False
+
 def init_db():
+    """Create tables and run one-time data fixes. Safe to call on every Streamlit rerun; only the first call does work."""
+    global _db_initialized
+    if _db_initialized:
+        return
     Base.metadata.create_all(bind=engine)
+    _add_missing_columns()
+    with session_scope() as db:
+        compact_uxr_researchers(db)
+    # create_all only builds indexes along with new tables, so add the one-researcher-per-project index to older databases
+    for index in UXRResearcher.__table__.indexes:
+        index.create(bind=engine, checkfirst=True)
+    _db_initialized = True
+
+def _add_missing_columns():
+    """create_all doesn't alter existing tables, so add columns introduced since the database was created."""
+    inspector = inspect(engine)
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            ddl = f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(engine.dialect)}"
+            if column.server_default is not None:
+                ddl += f" DEFAULT '{column.server_default.arg}'"
+            if not column.nullable:
+                ddl += " NOT NULL"
+            with engine.begin() as conn:
+                conn.execute(text(ddl))
 
 # --- Helper DB Functions ---
 def create_user(db, email, password):
@@ -137,25 +330,62 @@ def create_project(db, user_id, user_group_desc, product_desc, project_name):
 def get_project_by_uuid(db, project_uuid):
     return db.query(Project).filter(Project.project_uuid == project_uuid).first()
 
-def create_persona_archetype(db, project_uuid, name, desc):
+def find_project(db, user_id, user_group_desc, product_desc):
+    """The user's earliest project for this user group and product, if any."""
+    return (db.query(Project)
+            .filter(Project.user_id == user_id, Project.user_group_desc == user_group_desc,
+                    Project.product_desc == product_desc)
+            .order_by(Project.id).first())
+
+def create_persona_archetype(db, project_uuid, name, desc, commit=True):
     persona_arch_uuid = hashlib.md5((project_uuid + name + desc).encode()).hexdigest()
     new_archetype = PersonaArchetype(project_uuid=project_uuid, persona_archetype_name=name, persona_archetype_desc=desc, persona_arch_uuid=persona_arch_uuid)
     db.add(new_archetype)
-    db.commit()
-    db.refresh(new_archetype)
+    if commit:
+        db.commit()
+        db.refresh(new_archetype)
     return new_archetype
 
+def create_persona_archetypes_bulk(db, project_uuid, archetypes, commit=True):
+    """Create many archetypes from (name, desc) pairs in a single transaction."""
+    new_archetypes = {}
+    for name, desc in archetypes:
+        persona_arch_uuid = hashlib.md5((project_uuid + name + desc).encode()).hexdigest()
+        new_archetypes[persona_arch_uuid] = PersonaArchetype(project_uuid=project_uuid, persona_archetype_name=name, persona_archetype_desc=desc, persona_arch_uuid=persona_arch_uuid)
+    existing = db.query(PersonaArchetype.persona_arch_uuid).filter(PersonaArchetype.persona_arch_uuid.in_(list(new_archetypes))).all()
+    for (persona_arch_uuid,) in existing:
+        new_archetypes.pop(persona_arch_uuid)
+    db.add_all(new_archetypes.values())
+    if commit:
+        db.commit()
+    return list(new_archetypes.values())
+
 def get_archetypes_by_project(db, project_uuid):
      return db.query(PersonaArchetype).filter(PersonaArchetype.project_uuid == project_uuid).all()
 
-def create_persona(db, project_uuid, arch_uuids, name, desc):
+def create_persona(db, project_uuid, arch_uuids, name, desc, commit=True):
     persona_uuid = hashlib.md5((name + desc).encode()).hexdigest()
     new_persona = Persona(project_uuid=project_uuid, persona_arch_uuids=arch_uuids, persona_name=name, persona_desc=desc, persona_uuid=persona_uuid)
     db.add(new_persona)
-    db.commit()
-    db.refresh(new_persona)
+    if commit:
+        db.commit()
+        db.refresh(new_persona)
     return new_persona
 
+def create_personas_bulk(db, project_uuid, personas, commit=True):
+    """Create many personas from (arch_uuids, name, desc) tuples in a single transaction."""
+    new_personas = {}
+    for arch_uuids, name, desc in personas:
+        persona_uuid = hashlib.md5((name + desc).encode()).hexdigest()
+        new_personas[persona_uuid] = Persona(project_uuid=project_uuid, persona_arch_uuids=arch_uuids, persona_name=name, persona_desc=desc, persona_uuid=persona_uuid)
+    existing = db.query(Persona.persona_uuid).filter(Persona.persona_uuid.in_(list(new_personas))).all()
+    for (persona_uuid,) in existing:
+        new_personas.pop(persona_uuid)
+    db.add_all(new_personas.values())
+    if commit:
+        db.commit()
+    return list(new_personas.values())
+
 def get_personas_by_project(db, project_uuid):
     return db.query(Persona).filter(Persona.project_uuid == project_uuid).all()
 
@@ -167,19 +397,180 @@ def create_uxr_researcher(db, project_uuid, name, desc):
     db.refresh(new_researcher)
     return new_researcher
 
+def get_or_create_uxr_researcher(db, project_uuid, name, desc, commit=True):
+    """Return the project's researcher, creating it with `name`/`desc` only if the project has none."""
+    researcher = get_uxr_researcher_by_project(db, project_uuid)
+    if researcher:
+        return researcher
+    researcher = UXRResearcher(project_uuid=project_uuid, uxr_persona_name=name, uxr_persona_desc=desc, uxr_persona_uuid=str(uuid.uuid4()))
+    db.add(researcher)
+    if commit:
+        db.commit()
+    return researcher
+
 def get_uxr_researcher_by_project(db, project_uuid):
-    return db.query(UXRResearcher).filter(UXRResearcher.project_uuid == project_uuid).first()
+    return db.query(UXRResearcher).filter(UXRResearcher.project_uuid == project_uuid).order_by(UXRResearcher.id).first()
+
+def compact_uxr_researchers(db):
+    """
+    Collapse duplicate researcher rows (left by older versions that inserted one per render) to the
+    oldest row per project, re-pointing their interviews first. Returns the number of rows removed.
+    """
+    duplicated = (
+        db.query(UXRResearcher.project_uuid, func.min(UXRResearcher.id))
+        .group_by(UXRResearcher.project_uuid)
+        .having(func.count(UXRResearcher.id) > 1)
+        .all()
+    )
+    removed = 0
+    for project_uuid, keep_id in duplicated:
+        keep_uuid = db.query(UXRResearcher.uxr_persona_uuid).filter(UXRResearcher.id == keep_id).scalar()
+        duplicate_uuids = (
+            select(UXRResearcher.uxr_persona_uuid)
+            .where(UXRResearcher.project_uuid == project_uuid, UXRResearcher.id != keep_id)
+            .scalar_subquery()
+        )
+        db.query(Interview).filter(Interview.uxr_persona_uuid.in_(duplicate_uuids)).update(
+            {Interview.uxr_persona_uuid: keep_uuid}, synchronize_session=False)
+        removed += db.query(UXRResearcher).filter(
+            UXRResearcher.project_uuid == project_uuid, UXRResearcher.id != keep_id).delete(synchronize_session=False)
+    if duplicated:
+        db.commit()
+    return removed
 
 def create_interview(db, persona_uuid, uxr_persona_uuid, project_uuid, transcript):
      interview_uuid = hashlib.md5((persona_uuid + uxr_persona_uuid + project_uuid + transcript).encode()).hexdigest()
      new_interview = Interview(persona_uuid=persona_uuid, uxr_persona_uuid=uxr_persona_uuid, project_uuid=project_uuid, interview_transcript=transcript, interview_uuid=interview_uuid)
      db.add(new_interview)
+     _add_interview_turns(db, interview_uuid, json.loads(transcript))
      db.commit()
      db.refresh(new_interview)
      return new_interview
 
-def get_interviews_by_project(db, project_uuid):
-    return db.query(Interview).filter(Interview.project_uuid == project_uuid).all()
+def append_interview_turn(db, interview_uuid, turn_index, researcher_text, user_text,
+                          researcher_tokens=None, user_tokens=None, latency=None):
+    """Append one turn to an interview. Does not commit."""
+    turn = InterviewTurn(interview_uuid=interview_uuid, turn_index=turn_index,
+                         researcher_text=researcher_text, user_text=user_text,
+                         researcher_tokens=researcher_tokens, user_tokens=user_tokens, latency=latency)
+    db.add(turn)
+    return turn
+
+def _add_interview_turns(db, interview_uuid, transcript):
+    for turn_index, turn in enumerate(transcript):
+        append_interview_turn(db, interview_uuid, turn_index, turn["researcher"], turn["user"],
+                              turn.get("researcher_tokens"), turn.get("user_tokens"), turn.get("latency"))
+
+def interview_uuid_for(persona_uuid, uxr_persona_uuid, project_uuid):
+    return f"{persona_uuid}-{uxr_persona_uuid}-{project_uuid}"
+
+def checkpoint_interview_turn(db, persona_uuid, uxr_persona_uuid, project_uuid, turn_index, turn):
+    """
+    Store one completed turn (a turn dict from simulate_conversation) of an interview that is still running. The
+    first turn creates the interview row with status "in_progress"; save_interview marks it complete. A turn that
+    is already stored is left alone. Does not commit.
+    """
+    interview_uuid = interview_uuid_for(persona_uuid, uxr_persona_uuid, project_uuid)
+    interview = db.query(Interview).filter(Interview.interview_uuid == interview_uuid).first()
+    if interview is None:
+        db.add(Interview(persona_uuid=persona_uuid, uxr_persona_uuid=uxr_persona_uuid, project_uuid=project_uuid,
+                         interview_uuid=interview_uuid, status="in_progress"))
+    elif interview.status != "in_progress" or db.query(InterviewTurn.id).filter(
+            InterviewTurn.interview_uuid == interview_uuid, InterviewTurn.turn_index == turn_index).first():
+        return None
+    return append_interview_turn(db, interview_uuid, turn_index, turn["researcher"], turn["user"],
+                                 turn.get("researcher_tokens"), turn.get("user_tokens"), turn.get("latency"))
+
+def get_unfinished_interview_turns(db, persona_uuid, uxr_persona_uuid, project_uuid):
+    """Turn dicts stored so far by an interview that hasn't finished, or [] if there's nothing to resume."""
+    rows = (db.query(InterviewTurn)
+            .join(Interview, Interview.interview_uuid == InterviewTurn.interview_uuid)
+            .filter(Interview.interview_uuid == interview_uuid_for(persona_uuid, uxr_persona_uuid, project_uuid),
+                    Interview.status == "in_progress")
+            .order_by(InterviewTurn.turn_index)
+            .all())
+    return [{"researcher": row.researcher_text, "user": row.user_text, "researcher_tokens": row.researcher_tokens,
+             "user_tokens": row.user_tokens, "latency": row.latency} for row in rows]
+
+def save_interview(db, persona_uuid, uxr_persona_uuid, project_uuid, transcript):
+    """
+    Add a finished interview, given as the list of turn dicts from simulate_interview, unless this
+    persona already has one with this researcher. Does not commit.
+    """
+    existing_interview = db.query(Interview).filter(
+        Interview.persona_uuid == persona_uuid,
+        Interview.uxr_persona_uuid == uxr_persona_uuid,
+        Interview.project_uuid == project_uuid
+    ).first()
+    transcript_json = json.dumps([{"researcher": turn["researcher"], "user": turn["user"]} for turn in transcript])
+    if existing_interview and existing_interview.status == "in_progress":
+        # Checkpointed turn by turn; store whatever turns haven't been yet and mark it complete
+        stored = db.query(InterviewTurn.turn_index).filter(InterviewTurn.interview_uuid == existing_interview.interview_uuid).all()
+        stored = {turn_index for (turn_index,) in stored}
+        for turn_index, turn in enumerate(transcript):
+            if turn_index not in stored:
+                append_interview_turn(db, existing_interview.interview_uuid, turn_index, turn["researcher"], turn["user"],
+                                      turn.get("researcher_tokens"), turn.get("user_tokens"), turn.get("latency"))
+        existing_interview.interview_transcript = transcript_json
+        existing_interview.status = "complete"
+        existing_interview.datetime = datetime.utcnow()
+        return existing_interview
+    if existing_interview:
+        return None
+    new_interview = Interview(
+        persona_uuid=persona_uuid,
+        uxr_persona_uuid=uxr_persona_uuid,
+        project_uuid=project_uuid,
+        # The JSON blob is kept for older readers; interview_turns is the source of truth
+        interview_transcript=transcript_json,
+        interview_uuid=interview_uuid_for(persona_uuid, uxr_persona_uuid, project_uuid)
+    )
+    db.add(new_interview)
+    _add_interview_turns(db, new_interview.interview_uuid, transcript)
+    return new_interview
+
+def get_interviews_by_project(db, project_uuid, with_turns=False):
+    """The project's finished interviews."""
+    query = db.query(Interview).filter(Interview.project_uuid == project_uuid, Interview.status == "complete")
+    if with_turns:
+        query = query.options(selectinload(Interview.turns))
+    return query.all()
+
+def get_interview_status(db, project_uuid, uxr_persona_uuid, status="complete"):
+    """
+    {persona_uuid: (interview_uuid, stored turn count)} for the project's interviews with this researcher, in one
+    query. status="in_progress" gives the interrupted interviews that can be resumed instead of the finished ones.
+    """
+    rows = (
+        db.query(Interview.persona_uuid, Interview.interview_uuid, func.count(InterviewTurn.id))
+        .outerjoin(InterviewTurn, InterviewTurn.interview_uuid == Interview.interview_uuid)
+        .filter(Interview.project_uuid == project_uuid, Interview.uxr_persona_uuid == uxr_persona_uuid,
+                Interview.status == status)
+        .group_by(Interview.persona_uuid, Interview.interview_uuid)
+        .all()
+    )
+    return {persona_uuid: (interview_uuid, turn_count) for persona_uuid, interview_uuid, turn_count in rows}
+
+def iter_user_turns(db, project_uuid, batch_size=500):
+    """Stream every user reply in a project from interview_turns, falling back to the JSON blob for older interviews."""
+    turns = (
+        db.query(InterviewTurn.user_text)
+        .join(Interview, Interview.interview_uuid == InterviewTurn.interview_uuid)
+        .filter(Interview.project_uuid == project_uuid, Interview.status == "complete")
+        .order_by(InterviewTurn.interview_uuid, InterviewTurn.turn_index)
+        .yield_per(batch_size)
+    )
+    for (user_text,) in turns:
+        yield user_text
+    legacy = (
+        db.query(Interview.interview_transcript)
+        .filter(Interview.project_uuid == project_uuid, ~Interview.turns.any(),
+                Interview.status == "complete")
+        .yield_per(batch_size)
+    )
+    for (transcript,) in legacy:
+        for turn in json.loads(transcript or "[]"):
+            yield turn["user"]
 
 def update_project(db, project_uuid, update_data):
     project = db.query(Project).filter(Project.project_uuid == project_uuid).first()
@@ -216,11 +607,158 @@ def update_uxr_researcher(db, uxr_persona_uuid, update_data):
         db.commit()
         db.refresh(researcher)
 
+def apply_updates_bulk(db, model, key_column, updates, commit=True):
+    """Apply {key_value: update_data} to rows of `model` matched on `key_column` and commit once."""
+    if not updates:
+        return []
+    column = getattr(model, key_column)
+    rows = db.query(model).filter(column.in_(list(updates))).all()
+    for row in rows:
+        for key, value in updates[getattr(row, key_column)].items():
+            setattr(row, key, value)
+    if commit:
+        db.commit()
+    return rows
+
+# Callables run with the project_uuid after a project's deletion commits, so owners of derived data
+# (caches, embeddings, analysis results) can drop what they hold for it.
+_project_deleted_hooks = []
+
+def on_project_deleted(hook):
+    _project_deleted_hooks.append(hook)
+    return hook
+
+def delete_project(db, project_uuid, commit=True):
+    """
+    Delete a project and everything it owns with set-based deletes in one transaction.
+    Child tables are cleared explicitly, children first, because databases created before
+    ON DELETE CASCADE was declared don't have it on their foreign keys.
+    """
+    interview_uuids = db.query(Interview.interview_uuid).filter(Interview.project_uuid == project_uuid).scalar_subquery()
+    db.query(InterviewTurn).filter(InterviewTurn.interview_uuid.in_(interview_uuids)).delete(synchronize_session=False)
+    for model in (AnalysisResult, Interview, Persona, UXRResearcher, PersonaArchetype, Project):
+        db.query(model).filter(model.project_uuid == project_uuid).delete(synchronize_session=False)
+    # The hooks run once this transaction commits, so nothing re-caches rows that are still visible until then
+    db.info.setdefault("deleted_projects", set()).add(project_uuid)
+    if commit:
+        db.commit()
+
+def create_analysis_result(db, project_uuid):
+    """Queue a new analysis run for a project. Doesn't commit; meant for the shared writer."""
+    analysis = AnalysisResult(analysis_uuid=str(uuid.uuid4()), project_uuid=project_uuid, status="queued")
+    db.add(analysis)
+    return analysis.analysis_uuid
+
+def update_analysis_result(db, analysis_uuid, status, cluster_summaries=None, error=None):
+    """Move an analysis to `status`, stamping start/finish times. Doesn't commit."""
+    update_data = {"status": status}
+    if status == "running":
+        update_data["started_at"] = datetime.utcnow()
+    if status in ("complete", "failed"):
+        update_data["finished_at"] = datetime.utcnow()
+    if cluster_summaries is not None:
+        update_data["cluster_summaries"] = json.dumps(cluster_summaries)
+    if error is not None:
+        update_data["error"] = error
+    db.query(AnalysisResult).filter(AnalysisResult.analysis_uuid == analysis_uuid).update(update_data, synchronize_session=False)
+
+def get_analysis_result(db, analysis_uuid):
+    if not analysis_uuid:
+        return None
+    return db.query(AnalysisResult).filter(AnalysisResult.analysis_uuid == analysis_uuid).first()
+
+def get_latest_analysis(db, project_uuid, status=None):
+    query = db.query(AnalysisResult).filter(AnalysisResult.project_uuid == project_uuid)
+    if status:
+        query = query.filter(AnalysisResult.status == status)
+    return query.order_by(AnalysisResult.id.desc()).first()
+
+def record_token_usage(db, project_uuid=None, user_id=None, task=None, provider=None, model=None,
+                       input_tokens=0, output_tokens=0):
+    """Add one LLM call to the token ledger. Doesn't commit; meant for the shared writer."""
+    db.add(TokenUsage(project_uuid=project_uuid, user_id=user_id, task=task, provider=provider, model=model,
+                      input_tokens=input_tokens, output_tokens=output_tokens))
+
+def get_tokens_spent(db, project_uuid=None, user_id=None):
+    """Total prompt + completion tokens in the ledger for a project and/or user."""
+    query = db.query(func.coalesce(func.sum(TokenUsage.input_tokens + TokenUsage.output_tokens), 0))
+    if project_uuid:
+        query = query.filter(TokenUsage.project_uuid == project_uuid)
+    if user_id:
+        query = query.filter(TokenUsage.user_id == user_id)
+    return query.scalar()
+
+def get_token_usage_by_task(db, project_uuid):
+    """[(task, calls, input_tokens, output_tokens)] for a project, largest spend first."""
+    total = func.sum(TokenUsage.input_tokens + TokenUsage.output_tokens)
+    return (db.query(TokenUsage.task, func.count(TokenUsage.id), func.sum(TokenUsage.input_tokens),
+                     func.sum(TokenUsage.output_tokens))
+            .filter(TokenUsage.project_uuid == project_uuid)
+            .group_by(TokenUsage.task)
+            .order_by(total.desc())
+            .all())
+
 def get_existing_persona_names(db, project_uuid):
     personas = get_personas_by_project(db, project_uuid)
     return [persona.persona_name for persona in personas]
 
 
+def _column_values(row):
+    """A row's column values as a plain object, with no session or lazy relationships behind it."""
+    return SimpleNamespace(**{attr.key: getattr(row, attr.key) for attr in inspect(row).mapper.column_attrs})
+
+
+class ProjectSnapshot:
+    """
+    Everything the project page needs, loaded up front so a render issues a fixed number of queries. Holds plain
+    copies of the rows rather than ORM objects, so it can be cached and pickled; load transcripts by interview_uuid.
+    """
+
+    def __init__(self, project, researcher):
+        self.project = _column_values(project)
+        self.archetypes = [_column_values(archetype) for archetype in project.persona_archetypes]
+        self.personas = [_column_values(persona) for persona in project.personas]
+        self.researcher = _column_values(researcher) if researcher else None
+        self.archetypes_by_uuid = {archetype.persona_arch_uuid: archetype for archetype in self.archetypes}
+        self.personas_by_uuid = {persona.persona_uuid: persona for persona in self.personas}
+        self.interviews_by_persona = {}  # persona_uuid -> interview_uuid
+        if researcher:
+            for interview in project.interviews:
+                if interview.uxr_persona_uuid == researcher.uxr_persona_uuid and interview.status == "complete":
+                    self.interviews_by_persona.setdefault(interview.persona_uuid, interview.interview_uuid)
+
+    def archetype_for(self, persona):
+        return self.archetypes_by_uuid.get(persona.persona_arch_uuids)
+
+    def interview_uuid_for(self, persona):
+        return self.interviews_by_persona.get(persona.persona_uuid)
+
+    def remaining_personas(self):
+        return [persona for persona in self.personas if persona.persona_uuid not in self.interviews_by_persona]
+
+    def existing_persona_names(self):
+        return [persona.persona_name for persona in self.personas]
+
+def load_project_snapshot(db, project_uuid):
+    """Load a project with its archetypes, personas, researcher and interview status in five queries."""
+    project = (
+        db.query(Project)
+        .options(
+            selectinload(Project.persona_archetypes),
+            selectinload(Project.personas),
+            # Transcripts are only needed when an interview is opened, so keep them out of the page load.
+            selectinload(Project.interviews).load_only(Interview.interview_uuid, Interview.persona_uuid,
+                                                       Interview.uxr_persona_uuid, Interview.status),
+        )
+        .filter(Project.project_uuid == project_uuid)
+        .first()
+    )
+    if project is None:
+        return None
+    researcher = get_uxr_researcher_by_project(db, project_uuid)
+    return ProjectSnapshot(project, researcher)
+
+
 class DatabaseManager:
     def __init__(self, db_session):
         self.db = db_session
@@ -0,0 +1,375 @@
+import logging
+import threading
+import time
+import uuid
+import contextvars
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from config import (INTERVIEW_TURNS, INTERVIEW_MAX_WORKERS, INTERVIEW_SATURATION, INTERVIEW_RESUME_ATTEMPTS,
+                    PERSONA_DEDUP_THRESHOLD)
+from uxr_app.database import (session_scope, save_interview, checkpoint_interview_turn, get_unfinished_interview_turns,
+                              get_interview_status, Persona, UXRResearcher, Project, User)
+from uxr_app.writer import run_write
+from uxr_app.utils import get_credentials
+from utils.interview_utils import simulate_interview
+from utils.telemetry import span, telemetry_context
+from utils.novelty import SaturationDetector, near_duplicates
+
+logger = logging.getLogger(__name__)
+
+# How long finished jobs stay visible in the progress panel
+FINISHED_JOB_TTL = 60 * 60
+
+_jobs = {}  # (project_uuid, persona_uuid) -> InterviewJob
+_batches = {}  # batch_id -> InterviewBatch
+_tasks = {}  # task_id -> Task
+_jobs_lock = threading.Lock()
+
+# Lives as long as the server process, so submitted work outlives the script run that queued it
+_executor = ThreadPoolExecutor(max_workers=INTERVIEW_MAX_WORKERS, thread_name_prefix="uxr-interview")
+
+
+class InterviewCancelled(Exception):
+    pass
+
+
+class InterviewJob:
+    """Live progress of one persona's interview, written by the worker thread and read by the UI."""
+
+    def __init__(self, project_uuid, persona_uuid, persona_name, turns_total):
+        self.project_uuid = project_uuid
+        self.persona_uuid = persona_uuid
+        self.persona_name = persona_name
+        self.turns_total = turns_total
+        self.turns_done = 0
+        self.turn_seconds = []
+        self.state = "queued"
+        self.error = None
+        self.cancel_requested = False
+        self.queued_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+
+    @property
+    def active(self) -> bool:
+        return self.state in ("queued", "running")
+
+    def start(self, turns_done: int=0) -> None:
+        """turns_done counts turns a resumed interview already has."""
+        with _jobs_lock:
+            self.state = "running"
+            self.started_at = time.time()
+            self.turns_done = turns_done
+
+    def record_turn(self, turn_index: int, turn: dict) -> None:
+        """Callback for simulate_interview's on_turn. Stops the interview if a cancel was requested."""
+        with _jobs_lock:
+            self.turns_done = turn_index + 1
+            if turn.get("latency") is not None:
+                self.turn_seconds.append(turn["latency"])
+        if self.cancel_requested:
+            raise InterviewCancelled()
+
+    def request_cancel(self) -> None:
+        self.cancel_requested = True
+
+    def skip(self, reason: str) -> None:
+        with _jobs_lock:
+            self.state = "skipped"
+            self.error = reason
+            self.finished_at = time.time()
+
+    def finish(self, error: str=None, cancelled: bool=False) -> None:
+        with _jobs_lock:
+            self.state = "cancelled" if cancelled else "failed" if error else "complete"
+            self.error = error
+            self.finished_at = time.time()
+
+    def eta(self, default_turn_seconds: float=None) -> float:
+        """Seconds until this interview should finish, or None without any timing to go on."""
+        if not self.active:
+            return 0.0
+        turn_seconds = sum(self.turn_seconds) / len(self.turn_seconds) if self.turn_seconds else default_turn_seconds
+        if turn_seconds is None:
+            return None
+        return turn_seconds * max(0, self.turns_total - self.turns_done)
+
+
+class InterviewBatch:
+    """Handle for a group of submitted interviews. Later reruns look it up by batch_id to poll or cancel it."""
+
+    def __init__(self, project_uuid, jobs):
+        self.batch_id = uuid.uuid4().hex
+        self.project_uuid = project_uuid
+        self.jobs = jobs
+        self.futures = {}  # persona_uuid -> Future, filled in as interviews are handed to the pool
+        self.submitted_at = time.time()
+
+    @property
+    def active(self) -> bool:
+        return any(job.active for job in self.jobs)
+
+    def counts(self) -> Counter:
+        return Counter(job.state for job in self.jobs)
+
+    def cancel(self) -> None:
+        """Drop interviews that haven't started and stop running ones after their current turn."""
+        for job in self.jobs:
+            future = self.futures.get(job.persona_uuid)
+            if future is not None and future.cancel():
+                job.finish(cancelled=True)
+            elif job.active:
+                job.request_cancel()
+                if future is None:
+                    # Still waiting on the near-duplicate check, which won't submit it now
+                    job.finish(cancelled=True)
+
+
+class Task:
+    """A one-off background call (persona generation, a report) whose result is collected by polling."""
+
+    def __init__(self, kind, project_uuid):
+        self.task_id = uuid.uuid4().hex
+        self.kind = kind
+        self.project_uuid = project_uuid
+        self.state = "queued"
+        self.result = None
+        self.error = None
+        self.queued_at = time.time()
+        self.finished_at = None
+
+    def _run(self, fn, args, kwargs) -> None:
+        self.state = "running"
+        try:
+            self.result = fn(*args, **kwargs)
+            self.state = "complete"
+        except Exception as e:
+            logger.error(f"{self.kind} task {self.task_id} failed: {e}", exc_info=True)
+            self.error = str(e)
+            self.state = "failed"
+        self.finished_at = time.time()
+
+
+def track_interview(project_uuid, persona_uuid, persona_name, turns_total) -> InterviewJob:
+    """Register a queued interview so the progress panel can follow it."""
+    job = InterviewJob(project_uuid, persona_uuid, persona_name, turns_total)
+    with _jobs_lock:
+        _prune_finished()
+        _jobs[(project_uuid, persona_uuid)] = job
+    return job
+
+def skip_near_duplicate_personas(project_uuid, uxr_persona_uuid, personas, threshold=PERSONA_DEDUP_THRESHOLD):
+    """
+    Split `personas` into (to_interview, {persona_uuid: reason}) so that none is at least `threshold` similar to
+    a persona already interviewed in the project or to one earlier in the list. A threshold of 0 keeps everyone.
+    """
+    if not threshold or not personas:
+        return list(personas), {}
+    with session_scope() as db:
+        interviewed_uuids = set(get_interview_status(db, project_uuid, uxr_persona_uuid))
+        interviewed = [p for p in db.query(Persona).filter(Persona.project_uuid == project_uuid).all()
+                       if p.persona_uuid in interviewed_uuids]
+        db.close()
+    try:
+        duplicates = near_duplicates([p.persona_desc for p in personas], [p.persona_desc for p in interviewed], threshold)
+    except Exception as e:
+        logger.warning(f"Could not compare personas, interviewing all of them: {e}")
+        return list(personas), {}
+    candidates = interviewed + list(personas)
+    skipped = {personas[i].persona_uuid: f"too similar to {candidates[match].persona_name}"
+               for i, match in duplicates.items()}
+    return [p for p in personas if p.persona_uuid not in skipped], skipped
+
+def submit_interview_batch(project_uuid, uxr_persona_uuid, personas, turns=INTERVIEW_TURNS,
+                           skip_near_duplicates=False) -> InterviewBatch:
+    """
+    Queue interviews for `personas` on the shared worker pool and return immediately. With skip_near_duplicates,
+    personas too similar to one already covered get a skipped job instead of an interview; that check loads the
+    embedding model, so it runs on the pool too, as the batch's first step.
+    """
+    jobs = [track_interview(project_uuid, persona.persona_uuid, persona.persona_name, turns) for persona in personas]
+    batch = InterviewBatch(project_uuid, jobs)
+    with _jobs_lock:
+        _batches[batch.batch_id] = batch
+    if skip_near_duplicates:
+        _executor.submit(_skip_near_duplicates_and_submit, batch, uxr_persona_uuid, list(personas), turns)
+    else:
+        _submit_interviews(batch, uxr_persona_uuid, personas, turns)
+    return batch
+
+def _submit_interviews(batch, uxr_persona_uuid, personas, turns) -> None:
+    jobs = {job.persona_uuid: job for job in batch.jobs}
+    for persona in personas:
+        job = jobs[persona.persona_uuid]
+        if job.cancel_requested:
+            continue
+        logger.info(f"Submitting interview task for persona: {persona.persona_name} (UUID: {persona.persona_uuid})")
+        batch.futures[persona.persona_uuid] = _executor.submit(run_interview_in_background, persona.persona_uuid,
+                                                               uxr_persona_uuid, batch.project_uuid, job, turns=turns)
+
+def _skip_near_duplicates_and_submit(batch, uxr_persona_uuid, personas, turns) -> None:
+    try:
+        personas, skipped = skip_near_duplicate_personas(batch.project_uuid, uxr_persona_uuid, personas)
+    except Exception as e:
+        logger.error(f"Near-duplicate check failed, interviewing every persona: {e}", exc_info=True)
+        skipped = {}
+    for job in batch.jobs:
+        if job.persona_uuid in skipped and not job.cancel_requested:
+            # Tracked so the status panel can say why; the Run button still interviews them on request
+            job.skip(skipped[job.persona_uuid])
+            logger.info(f"Skipping interview for persona {job.persona_name}: {job.error}")
+    _submit_interviews(batch, uxr_persona_uuid, personas, turns)
+
+def submit_task(kind, project_uuid, fn, *args, **kwargs) -> Task:
+    """Run `fn(*args, **kwargs)` on the shared pool, in the caller's telemetry context, and return its Task."""
+    task = Task(kind, project_uuid)
+    with _jobs_lock:
+        _prune_finished()
+        _tasks[task.task_id] = task
+    _executor.submit(contextvars.copy_context().run, task._run, fn, args, kwargs)
+    return task
+
+def get_task(task_id) -> Task:
+    with _jobs_lock:
+        return _tasks.get(task_id)
+
+def get_batch(batch_id) -> InterviewBatch:
+    with _jobs_lock:
+        return _batches.get(batch_id)
+
+def get_interview_jobs(project_uuid) -> list[InterviewJob]:
+    with _jobs_lock:
+        return [job for (job_project, _), job in _jobs.items() if job_project == project_uuid]
+
+def average_turn_seconds() -> float:
+    """Mean turn duration across every tracked interview, used to estimate ones that haven't started."""
+    with _jobs_lock:
+        turn_seconds = [seconds for job in _jobs.values() for seconds in job.turn_seconds]
+    return sum(turn_seconds) / len(turn_seconds) if turn_seconds else None
+
+def _prune_finished() -> None:
+    cutoff = time.time() - FINISHED_JOB_TTL
+    for key, job in list(_jobs.items()):
+        if job.finished_at and job.finished_at < cutoff:
+            del _jobs[key]
+    for batch_id, batch in list(_batches.items()):
+        if not batch.active and batch.submitted_at < cutoff:
+            del _batches[batch_id]
+    for task_id, task in list(_tasks.items()):
+        if task.finished_at and task.finished_at < cutoff:
+            del _tasks[task_id]
+
+
+def saturation_detector():
+    """A fresh should_stop callback per interview, or None when INTERVIEW_SATURATION is off."""
+    if not INTERVIEW_SATURATION['enabled']:
+        return None
+    return SaturationDetector(INTERVIEW_SATURATION['novelty_threshold'], INTERVIEW_SATURATION['min_turns'],
+                              INTERVIEW_SATURATION['patience'])
+
+def run_interview_in_background(persona_uuid, uxr_persona_uuid, project_uuid, job=None, api_key=None, model_name=None,
+                                turns=INTERVIEW_TURNS):
+    """
+    Runs an interview simulation in a background thread and updates the database directly.
+    `job` is the InterviewJob from track_interview, updated as the interview progresses.
+    Credentials default to secrets.toml.
+    Every completed turn is checkpointed, so an interview that fails part way is retried from its last good turn
+    (up to INTERVIEW_RESUME_ATTEMPTS times) and one interrupted by a restart picks up there when it's run again.
+    """
+    thread_id = threading.current_thread().name
+    try:
+        if job and job.cancel_requested:
+            job.finish(cancelled=True)
+            return
+        logger.info(f"[{thread_id}] Starting interview for persona UUID: {persona_uuid}")
+
+        # Each worker thread gets its own scoped session, removed when the block exits
+        with session_scope() as db:
+            persona = db.query(Persona).filter(Persona.persona_uuid == persona_uuid).first()
+            uxr_persona = db.query(UXRResearcher).filter(UXRResearcher.uxr_persona_uuid == uxr_persona_uuid).first()
+            project = db.query(Project).filter(Project.project_uuid == project_uuid).first()
+            owner = db.query(User).filter(User.user_id == project.user_id).first() if project else None
+            completed = get_unfinished_interview_turns(db, persona_uuid, uxr_persona_uuid, project_uuid)
+            # Hand the connection back to the pool while the LLM calls run
+            db.close()
+
+        if not persona or not uxr_persona or not project:
+            raise ValueError(f"Could not find required data: persona={bool(persona)}, uxr_persona={bool(uxr_persona)}, project={bool(project)}")
+        logger.info(f"[{thread_id}] Retrieved data for persona: {persona.persona_name}")
+
+        # Get API key and model name from secrets.toml; st.secrets isn't available off the script thread
+        if api_key is None:
+            api_key, model_name = get_credentials()
+        if not api_key:
+            raise ValueError("API key not found in UXR_API_KEY or secrets.toml")
+
+        if job:
+            job.start(turns_done=len(completed))
+        if completed:
+            logger.info(f"[{thread_id}] Resuming interview for persona {persona.persona_name} after turn {len(completed)}")
+        else:
+            logger.info(f"[{thread_id}] Starting interview simulation for persona: {persona.persona_name}")
+
+        def checkpoint_turn(turn_index, turn):
+            completed.append(turn)
+            # Fire and forget: the writer stores turns in order, ahead of the final save
+            run_write(checkpoint_interview_turn, persona_uuid, uxr_persona_uuid, project_uuid, turn_index, turn,
+                      wait=False)
+            if job:
+                job.record_turn(turn_index, turn)
+
+        # Tag spans and charge token spend to the project and its owner
+        budget_context = telemetry_context(project_uuid=project_uuid, user_id=project.user_id,
+                                           guest=bool(owner and owner.is_guest))
+        with budget_context, span("interview.simulate", persona_uuid=persona_uuid) as stage:
+            resumed_from = len(completed)
+            # One detector for every attempt, so it has seen each turn exactly once, including the resumed ones
+            should_stop = saturation_detector()
+            turn_budget = turns
+            if should_stop and completed and should_stop.replay(completed):
+                turn_budget = len(completed)
+                logger.info(f"[{thread_id}] Replies had already stopped adding new content, finishing interview for "
+                            f"persona {persona.persona_name} with the stored turns")
+            for attempt in range(INTERVIEW_RESUME_ATTEMPTS + 1):
+                try:
+                    transcript = simulate_interview(
+                        uxr_persona.uxr_persona_name,
+                        uxr_persona.uxr_persona_desc,
+                        persona.persona_name,
+                        persona.persona_desc,
+                        project.product_desc,
+                        api_key,
+                        turns=turn_budget,
+                        model_name=model_name,
+                        on_turn=checkpoint_turn,
+                        should_stop=should_stop,
+                        resume_from=list(completed),
+                    )
+                    break
+                except InterviewCancelled:
+                    raise
+                except Exception as e:
+                    if attempt == INTERVIEW_RESUME_ATTEMPTS:
+                        raise
+                    logger.warning(f"[{thread_id}] Interview for persona {persona.persona_name} failed after "
+                                   f"{len(completed)} turns, resuming: {e}")
+            stage.set(turns=len(transcript), turn_budget=turns, resumed_from=resumed_from, retries=attempt)
+        logger.info(f"[{thread_id}] Interview simulation completed for persona: {persona.persona_name}")
+
+        # Queue the save on the single writer so it never contends with other writes
+        with telemetry_context(project_uuid=project_uuid), span("interview.save", persona_uuid=persona_uuid):
+            saved = run_write(save_interview, persona_uuid, uxr_persona_uuid, project_uuid, transcript)
+        if saved:
+            logger.info(f"[{thread_id}] Successfully saved interview for persona: {persona.persona_name}")
+        else:
+            logger.info(f"[{thread_id}] Interview already exists for persona {persona.persona_name}, skipping save")
+        if job:
+            job.finish()
+
+    except InterviewCancelled:
+        logger.info(f"[{thread_id}] Interview for persona UUID {persona_uuid} cancelled")
+        job.finish(cancelled=True)
+    except Exception as e:
+        logger.error(f"[{thread_id}] Error running interview: {str(e)}", exc_info=True)
+        if job:
+            job.finish(error=str(e))
@@ -0,0 +1,26 @@
+import logging
+from uxr_app.database import session_scope, record_token_usage, get_tokens_spent
+from uxr_app.writer import run_write
+from utils.token_budget import set_ledger
+
+logger = logging.getLogger(__name__)
+
+_installed = False
+
+
+def _load_spent(scope, key):
+    with session_scope() as db:
+        if scope == "project":
+            return get_tokens_spent(db, project_uuid=key)
+        return get_tokens_spent(db, user_id=key)
+
+def _store_usage(entry):
+    # Fire and forget: the writer batches ledger rows with whatever else is queued
+    run_write(record_token_usage, wait=False, **entry)
+
+def install_token_ledger():
+    """Persist token usage in the token_usage table and seed budgets from it. Safe to call on every rerun."""
+    global _installed
+    if not _installed:
+        set_ledger(_load_spent, _store_usage)
+        _installed = True
@@ -0,0 +1,106 @@
+"""
+Interview analysis in a separate worker process pool.
+
+Sentence extraction, embedding and KMeans are CPU-heavy and hold the GIL for long stretches, so running them on
+the Streamlit server process slows every other session's reruns. submit_analysis() records a queued
+AnalysisResult and hands the work to a worker process, which writes its status and cluster summaries back to the
+database; the UI polls the row.
+"""
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from config import ANALYSIS_WORKERS, MODEL_WARMUP
+from uxr_app.database import (
+    session_scope,
+    create_analysis_result,
+    update_analysis_result,
+    iter_user_turns,
+    Project,
+    User,
+)
+from uxr_app.writer import run_write
+
+logger = logging.getLogger(__name__)
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _init_worker():
+    """Runs once in each worker process."""
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    from uxr_app.ledger import install_token_ledger
+    install_token_ledger()
+    if MODEL_WARMUP:
+        from utils.convo_analysis import start_model_warmup
+        start_model_warmup()
+
+def get_pool():
+    """
+    The shared analysis pool, created on first use. Workers are spawned rather than forked so they don't inherit
+    the server's threads and open connections. ANALYSIS_WORKERS=0 runs analyses on a thread in this process instead.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            if ANALYSIS_WORKERS > 0:
+                _pool = ProcessPoolExecutor(max_workers=ANALYSIS_WORKERS, mp_context=multiprocessing.get_context("spawn"),
+                                            initializer=_init_worker)
+            else:
+                _pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="uxr-analysis")
+        return _pool
+
+
+def run_analysis(analysis_uuid, project_uuid, api_key, model_name, use_local=True):
+    """Cluster every user reply in the project and summarize the clusters. Runs in a worker process."""
+    from utils.convo_analysis import cluster_user_responses, summarize_each_cluster
+    from utils.telemetry import span, telemetry_context
+
+    try:
+        run_write(update_analysis_result, analysis_uuid, "running")
+        with session_scope() as db:
+            project = db.query(Project).filter(Project.project_uuid == project_uuid).first()
+            if project is None:
+                raise ValueError(f"Project {project_uuid} not found")
+            owner = db.query(User).filter(User.user_id == project.user_id).first()
+            user_id, guest = project.user_id, bool(owner and owner.is_guest)
+            product_desc, user_group_desc = project.product_desc, project.user_group_desc
+            user_responses = list(iter_user_turns(db, project_uuid))
+
+        with telemetry_context(project_uuid=project_uuid, user_id=user_id, guest=guest), \
+                span("analysis.run", analysis_uuid=analysis_uuid, responses=len(user_responses)):
+            clusters = cluster_user_responses(user_responses, api_key, use_local=use_local)
+            cluster_summaries = summarize_each_cluster(clusters, product_desc, user_group_desc, api_key, model_name)
+    except Exception as e:
+        logger.error(f"Analysis {analysis_uuid} for project {project_uuid} failed: {e}", exc_info=True)
+        run_write(update_analysis_result, analysis_uuid, "failed", error=f"{type(e).__name__}: {e}")
+        raise
+    run_write(update_analysis_result, analysis_uuid, "complete", cluster_summaries=cluster_summaries)
+    logger.info(f"Analysis {analysis_uuid} for project {project_uuid} found {len(cluster_summaries)} themes")
+    return len(cluster_summaries)
+
+def _mark_failed_if_crashed(analysis_uuid, future):
+    # A worker that dies outright (out of memory, segfault) never gets to write its own failure; every other
+    # error is written by run_analysis itself
+    global _pool
+    error = future.exception()
+    if not isinstance(error, BrokenProcessPool):
+        return
+    with _pool_lock:
+        _pool = None  # a broken pool refuses new work; the next submit starts a fresh one
+    run_write(update_analysis_result, analysis_uuid, "failed", error=f"{type(error).__name__}: {error}", wait=False)
+
+def submit_analysis(project_uuid, api_key, model_name, use_local=True, wait=False):
+    """
+    Queue an analysis of the project's interviews and return its analysis_uuid without waiting. With wait=True,
+    block until it finishes (raising if it failed) and then return the analysis_uuid.
+    """
+    analysis_uuid = run_write(create_analysis_result, project_uuid)
+    future = get_pool().submit(run_analysis, analysis_uuid, project_uuid, api_key, model_name, use_local)
+    future.add_done_callback(lambda f: _mark_failed_if_crashed(analysis_uuid, f))
+    logger.info(f"Submitted analysis {analysis_uuid} for project {project_uuid}")
+    if wait:
+        future.result()
+    return analysis_uuid
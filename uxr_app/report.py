@@ -0,0 +1,140 @@
+import json
+from datetime import datetime
+from utils.prompt_templates import (
+    get_exec_summary_prompt,
+    get_recommendations_prompt,
+    get_findings_prompt,
+    get_demographics_prompt
+)
+from utils.convo_analysis import call_llm
+from utils.concurrency import map_concurrently
+from utils.telemetry import traced
+
+# Sections included when a caller doesn't choose (the batch CLI and the API)
+DEFAULT_REPORT_OPTIONS = {
+    'include_exec_summary': True,
+    'include_background': True,
+    'include_demographics': True,
+    'include_key_findings': True,
+    'include_detailed_analysis': True,
+    'include_recommendations': True,
+    'include_appendix': False,
+}
+
+
+@traced("report.generate")
+def generate_uxr_report(project, personas, interviews, cluster_summaries, report_options, api_key, model_name):
+    """
+    Generate a UX research report based on the provided data and selected sections.
+    
+    Args:
+        project: The project object containing project details
+        personas: List of persona objects
+        interviews: List of interview objects
+        cluster_summaries: Dictionary of cluster summaries
+        report_options: Dictionary with boolean flags for which sections to include and report title
+        api_key: API key for LLM calls
+        
+    Returns:
+        dict: The generated report content by section
+        str: The compiled full report
+    """
+    report_content = {}
+    
+    # Executive Summary
+    if report_options.get('include_exec_summary', False):
+        themes = [summary['theme'] for _, summary in cluster_summaries.items()]
+        exec_summary_prompt = get_exec_summary_prompt(project.product_desc, 
+                                                    project.user_group_desc,
+                                                    themes)
+        report_content['executive_summary'] = call_llm(exec_summary_prompt, api_key, model_name, task="executive_summary")
+    
+    # Research Background
+    if report_options.get('include_background', False):
+        report_content['research_background'] = f"""
+        ## Research Background
+        
+        **Project:** {project.project_name}
+        
+        **Product Description:** {project.product_desc}
+        
+        **Target User Group:** {project.user_group_desc}
+        
+        **Research Methodology:** This research was conducted using simulated interviews with AI-generated personas 
+        representing the target user group. The interviews were designed to explore user needs, pain points, 
+        and potential value propositions related to the product. Since personas were AI-generated, there may be 
+        biases and caveats to the research. Please use these results as directional guidance for product development
+        and validate all findings with customer interviews and product stakeholders.
+        
+        **Research Period:** {datetime.now().strftime("%B %Y")}
+        """
+    
+    # Participant Demographics
+    if report_options.get('include_demographics', False):
+        demographics_text = "## Participant Demographics\n\n"
+        # Extract key demographic information from each persona description, concurrently
+        demo_summaries = map_concurrently(
+            lambda persona: call_llm(get_demographics_prompt(persona.persona_desc), api_key, model_name, task="demographics"),
+            personas
+        )
+        for i, (persona, demo_summary) in enumerate(zip(personas, demo_summaries), 1):
+            demographics_text += f"### Participant {i}: {persona.persona_name}\n\n"
+            demographics_text += f"{demo_summary}\n\n"
+        
+        report_content['demographics'] = demographics_text
+    
+    # Key Findings
+    if report_options.get('include_key_findings', False):
+        findings_prompt = get_findings_prompt(json.dumps([summary for _, summary in cluster_summaries.items()]))
+        report_content['key_findings'] = "## Key Findings\n\n" + call_llm(findings_prompt, api_key, model_name, task="key_findings")
+    
+    # Detailed Analysis
+    if report_options.get('include_detailed_analysis', False):
+        detailed_analysis = "## Detailed Analysis\n\n"
+        for i, (_, summary) in enumerate(cluster_summaries.items(), 1):
+            detailed_analysis += f"### Theme {i}: {summary['theme']}\n\n"
+            detailed_analysis += f"{summary['description']}\n\n"
+            detailed_analysis += "**Supporting Evidence:**\n\n"
+            detailed_analysis += f"{summary['sample_sentences']}\n\n"
+        
+        report_content['detailed_analysis'] = detailed_analysis
+    
+    # Recommendations
+    if report_options.get('include_recommendations', False):
+        recommendations_prompt = get_recommendations_prompt(
+            project.product_desc,
+            project.user_group_desc,
+            json.dumps([summary for _, summary in cluster_summaries.items()])
+        )
+        report_content['recommendations'] = "## Recommendations\n\n" + call_llm(recommendations_prompt, api_key, model_name, task="recommendations")
+    
+    # Appendix
+    if report_options.get('include_appendix', False):
+        appendix = "## Appendix: Raw Interview Data\n\n"
+        for i, interview in enumerate(interviews, 1):
+            persona = next((p for p in personas if p.persona_uuid == interview.persona_uuid), None)
+            if persona:
+                appendix += f"### Interview {i}: Conversation with {persona.persona_name}\n\n"
+                
+                conversation = interview.conversation
+                for j, turn in enumerate(conversation, 1):
+                    appendix += f"**Researcher:** {turn['researcher']}\n\n"
+                    appendix += f"**{persona.persona_name}:** {turn['user']}\n\n"
+                
+                appendix += "---\n\n"
+        
+        report_content['appendix'] = appendix
+    
+    # Compile full report
+    full_report = f"# {report_options.get('report_title', 'UXR Report')}\n\n"
+    
+    if report_options.get('include_exec_summary', False):
+        full_report += "## Executive Summary\n\n"
+        full_report += report_content['executive_summary'] + "\n\n"
+    
+    for section in ['research_background', 'demographics', 'key_findings', 
+                'detailed_analysis', 'recommendations', 'appendix']:
+        if section in report_content:
+            full_report += report_content[section] + "\n\n"
+    
+    return report_content, full_report
@@ -1,18 +1,25 @@
 import hashlib
+import os
+import toml
 import streamlit as st
+from utils.app_config import LLM_MODE
 
-# Placeholder for LLM interaction
-def call_llm(prompt):
-    """
-    Calls an LLM API with the given prompt.
-    Replace this with your actual LLM API call.
-    """
-    # st.write(f"DEBUG: LLM Prompt: {prompt}")  # For debugging
-
-    # --- REPLACE THIS WITH YOUR ACTUAL LLM API CALL ---
-    # Example (using a dummy response):
-    response = "This is a simulated LLM response to: " + prompt
-    return response
+SECRETS_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.streamlit', 'secrets.toml')
+
+def load_secrets(secrets_path=SECRETS_PATH):
+    """Read secrets.toml directly, for worker threads and processes that can't use st.secrets."""
+    with open(secrets_path, 'r') as f:
+        return toml.load(f)
+
+def get_credentials(model_name=None):
+    """(api_key, model_name) for entry points outside Streamlit: UXR_API_KEY or secrets.toml."""
+    try:
+        secrets = load_secrets()
+    except FileNotFoundError:
+        # Offline runs (UXR_LLM_MODE=stub or replay) don't need credentials
+        secrets = {}
+    api_key = os.environ.get("UXR_API_KEY") or secrets.get("api_key") or ("offline" if LLM_MODE in ("stub", "replay") else None)
+    return api_key, model_name or secrets.get("model_name")
 
 def md5_hash(text):
     return hashlib.md5(text.encode()).hexdigest()
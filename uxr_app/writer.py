@@ -0,0 +1,111 @@
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from config import DB_WRITER_ENABLED, DB_WRITER_BATCH_SIZE, DB_WRITER_MAX_DELAY
+from uxr_app.database import SessionLocal, session_scope
+
+logger = logging.getLogger(__name__)
+
+
+class WriteQueue:
+    """
+    A single writer thread that owns all queued database writes.
+
+    Each queued write is a callable taking the session as its first argument. It should add or
+    modify rows but not commit; the writer commits whatever arrived within `max_delay` seconds
+    (up to `batch_size` writes) as one transaction.
+    """
+
+    def __init__(self, session_factory=SessionLocal, batch_size: int=DB_WRITER_BATCH_SIZE,
+                 max_delay: float=DB_WRITER_MAX_DELAY):
+        self._session_factory = session_factory
+        self._batch_size = batch_size
+        self._max_delay = max_delay
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="uxr-db-writer", daemon=True)
+                self._thread.start()
+
+    def submit(self, write_fn, *args, **kwargs) -> Future:
+        future = Future()
+        self.start()
+        self._queue.put((write_fn, args, kwargs, future))
+        return future
+
+    def flush(self, timeout: float=None) -> None:
+        """Block until every write queued before this call has been committed."""
+        self.submit(lambda db: None).result(timeout)
+
+    def _next_batch(self) -> list:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self._max_delay
+        while len(batch) < self._batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._next_batch()
+            try:
+                self._apply_batch(batch)
+            except Exception as e:
+                logger.error(f"Database writer failed to apply batch: {e}", exc_info=True)
+                for *_, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+    def _apply_batch(self, batch: list) -> None:
+        db = self._session_factory()
+        try:
+            results = []
+            for write_fn, args, kwargs, _ in batch:
+                results.append(write_fn(db, *args, **kwargs))
+                db.flush()  # later writes in the batch see earlier ones
+            db.commit()
+        except Exception:
+            db.rollback()
+            db.close()
+            if len(batch) == 1:
+                raise
+            # One bad write shouldn't sink the rest of the group: replay them one at a time
+            for item in batch:
+                try:
+                    self._apply_batch([item])
+                except Exception as e:
+                    # Fire-and-forget callers drop the future, so this log line is the only trace of the failure
+                    logger.error(f"Database write {getattr(item[0], '__name__', item[0])} failed: {e}", exc_info=True)
+                    item[-1].set_exception(e)
+            return
+        db.close()
+        for (*_, future), result in zip(batch, results):
+            future.set_result(result)
+
+
+writer = WriteQueue()
+
+def run_write(write_fn, *args, wait: bool=True, **kwargs):
+    """
+    Apply `write_fn(db, *args, **kwargs)` and commit it. Goes through the shared writer thread
+    when DB_WRITER_ENABLED, otherwise commits on the caller's scoped session.
+    Returns the write's result, or a Future when wait=False and the writer is enabled.
+    """
+    if DB_WRITER_ENABLED:
+        future = writer.submit(write_fn, *args, **kwargs)
+        return future.result() if wait else future
+    with session_scope() as db:
+        result = write_fn(db, *args, **kwargs)
+        db.commit()
+        return result